@@ -32,3 +32,7 @@ python manage.py collectstatic --no-input
 # Apply database migrations
 echo "Applying migrations..."
 python manage.py migrate
+
+# Create the database cache table (no-op if it already exists)
+echo "Creating cache table..."
+python manage.py createcachetable
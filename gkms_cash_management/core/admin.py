@@ -1,9 +1,12 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import (
     AgentProfile, Location, LocationLimit, CashDelivery, 
     CashRequest, EODReport, TellerBalance, Adjustment, DailyAgentData,
-    TellerVariance, DenominationBreakdown
+    TellerVariance, DenominationBreakdown, ImportJob, PayoutAverage, LimitBreach, RequestSample,
+    LocationAlias, CashRollup, PayoutForecast, CashLedgerEntry, CashPosition, CashLedgerCheckpoint, LiveEvent,
+    Notification, NotificationEvent,
 )
+from . import approvals
 
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
@@ -21,7 +24,33 @@ class LocationLimitAdmin(admin.ModelAdmin):
     list_display = ('location', 'insurance_limit', 'eod_vault_limit', 'working_day_limit')
 
 admin.site.register(CashDelivery)
-admin.site.register(CashRequest)
+@admin.register(CashRequest)
+class CashRequestAdmin(admin.ModelAdmin):
+    list_display = ('id', 'location', 'request_date', 'delivery_date', 'request_type', 'status', 'total_jmd', 'total_usd', 'approved_by')
+    list_filter = ('status', 'request_type')
+    search_fields = ('location__name',)
+    list_select_related = ('location', 'approved_by')
+    actions = ['approve_selected', 'reject_selected']
+
+    def _report(self, request, result, verb):
+        self.message_user(request, f"{len(result.decided)} cash request(s) {verb}.", messages.SUCCESS)
+        if result.skipped:
+            self.message_user(
+                request,
+                f"{len(result.skipped)} request(s) skipped: being handled by another user or no longer pending.",
+                messages.WARNING,
+            )
+
+    @admin.action(description="Approve selected pending requests and schedule deliveries")
+    def approve_selected(self, request, queryset):
+        result = approvals.approve_requests(queryset.values_list('id', flat=True), request.user)
+        self._report(request, result, 'approved')
+
+    @admin.action(description="Reject selected pending requests")
+    def reject_selected(self, request, queryset):
+        result = approvals.reject_requests(queryset.values_list('id', flat=True), request.user)
+        self._report(request, result, 'rejected')
+
 
 @admin.register(DailyAgentData)
 class DailyAgentDataAdmin(admin.ModelAdmin):
@@ -69,4 +98,105 @@ class AdjustmentAdmin(admin.ModelAdmin):
 @admin.register(TellerBalance)
 class TellerBalanceAdmin(admin.ModelAdmin):
     list_display = ('eod_report', 'teller_name', 'jmd_amount', 'usd_amount')
-    search_fields = ('teller_name', 'eod_report__location__name')
\ No newline at end of file
+    search_fields = ('teller_name', 'eod_report__location__name')
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'original_filename', 'statement_date', 'rows_processed',
+                    'rows_skipped', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    exclude = ('payload',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+@admin.register(PayoutAverage)
+class PayoutAverageAdmin(admin.ModelAdmin):
+    list_display = ('location', 'window', 'period_start', 'period_end', 'days_observed', 'average_payout', 'updated_at')
+    list_filter = ('window',)
+    search_fields = ('location__name',)
+    date_hierarchy = 'period_end'
+
+@admin.register(PayoutForecast)
+class PayoutForecastAdmin(admin.ModelAdmin):
+    list_display = ('location', 'forecast_date', 'amount', 'generated_for', 'days_observed', 'updated_at')
+    search_fields = ('location__name',)
+    date_hierarchy = 'forecast_date'
+
+@admin.register(LimitBreach)
+class LimitBreachAdmin(admin.ModelAdmin):
+    list_display = ('location', 'date', 'limit_type', 'amount', 'limit', 'detected_at')
+    list_filter = ('limit_type',)
+    search_fields = ('location__name',)
+    date_hierarchy = 'date'
+
+@admin.register(RequestSample)
+class RequestSampleAdmin(admin.ModelAdmin):
+    list_display = ('url_name', 'method', 'status_code', 'wall_ms', 'query_count', 'sql_ms', 'recorded_at')
+    list_filter = ('url_name', 'method')
+    date_hierarchy = 'recorded_at'
+
+@admin.register(LocationAlias)
+class LocationAliasAdmin(admin.ModelAdmin):
+    list_display = ('name', 'source', 'location', 'normalized_name')
+    list_filter = ('source',)
+    search_fields = ('name', 'normalized_name', 'location__name')
+    list_select_related = ('location',)
+
+@admin.register(CashRollup)
+class CashRollupAdmin(admin.ModelAdmin):
+    list_display = ('key', 'grain', 'period_start', 'closing_balance', 'payouts', 'deliveries_jmd', 'updated_at')
+    list_filter = ('scope', 'grain')
+    search_fields = ('key', 'parish', 'location__name')
+    date_hierarchy = 'period_start'
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """For rows only the application writes: the cash ledger (core.ledger), live events (core.live) and the notification outbox."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(CashLedgerEntry)
+class CashLedgerEntryAdmin(ReadOnlyAdmin):
+    list_display = ('location', 'entry_type', 'business_date', 'amount', 'balance_after', 'reference', 'recorded_at')
+    list_filter = ('entry_type',)
+    search_fields = ('location__name', 'reference')
+    date_hierarchy = 'business_date'
+    list_select_related = ('location',)
+
+@admin.register(CashPosition)
+class CashPositionAdmin(ReadOnlyAdmin):
+    list_display = ('location', 'balance', 'closed_through', 'updated_at')
+    search_fields = ('location__name',)
+    list_select_related = ('location',)
+
+@admin.register(CashLedgerCheckpoint)
+class CashLedgerCheckpointAdmin(ReadOnlyAdmin):
+    list_display = ('location', 'business_date', 'balance', 'entry_count', 'created_at')
+    search_fields = ('location__name',)
+    date_hierarchy = 'business_date'
+    list_select_related = ('location',)
+
+@admin.register(LiveEvent)
+class LiveEventAdmin(ReadOnlyAdmin):
+    list_display = ('id', 'kind', 'created_at')
+    list_filter = ('kind',)
+
+@admin.register(NotificationEvent)
+class NotificationEventAdmin(ReadOnlyAdmin):
+    list_display = ('id', 'kind', 'audience', 'location', 'message', 'created_at')
+    list_filter = ('kind', 'audience')
+    list_select_related = ('location',)
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'title', 'event_count', 'is_read', 'email_status', 'created_at')
+    list_filter = ('is_read', 'email_status', 'notification_type')
+    search_fields = ('user__username', 'title')
+    date_hierarchy = 'created_at'
+    list_select_related = ('user',)
+    readonly_fields = ('email_attempts', 'emailed_at', 'created_at')
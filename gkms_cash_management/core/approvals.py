@@ -0,0 +1,104 @@
+"""
+Approving and rejecting cash requests, one or many at a time.
+
+Each call is one transaction. The pending requests are locked with
+``select_for_update(skip_locked=True)``, so two members of the cash team
+working the queue at once never wait on each other: each gets the rows
+nobody else holds, and requests another approver has locked (or already
+decided) are reported back as skipped. Deliveries for approved requests
+are created with one bulk insert, with the amounts kept as Decimal.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .dashboard import invalidate_location
+from .live import cash_request_payload, publish
+from .models import CashDelivery, CashRequest
+from .notifications import cash_request_decided_event, enqueue
+from .tasks import defer
+
+logger = logging.getLogger(__name__)
+
+
+class DecisionResult:
+    """Ids of the requests decided by this call, and of those skipped (locked or no longer pending)."""
+
+    def __init__(self, decided, skipped):
+        self.decided = decided
+        self.skipped = skipped
+
+
+def _lock_pending(request_ids):
+    return list(
+        CashRequest.objects.select_for_update(skip_locked=True)
+        .filter(id__in=request_ids, status='pending')
+        .order_by('id')
+    )
+
+
+def _after_delivery_change(deliveries):
+    # bulk_create sends no post_save, so do what the CashDelivery receivers would
+    location_ids = {delivery.location_id for delivery in deliveries}
+    transaction.on_commit(lambda: invalidate_location(*location_ids))
+    for day in {delivery.date for delivery in deliveries}:
+        defer('rollups', date=day)
+
+
+def approve_requests(request_ids, user, delivery_date=None, amounts=None):
+    """
+    Approve the pending requests among ``request_ids`` and schedule a delivery
+    for each, on ``delivery_date`` or the request's own delivery date.
+    ``amounts`` maps a request id to the approved (JMD, USD) Decimal amounts
+    when they differ from the requested totals. Returns a DecisionResult.
+    """
+    request_ids = set(request_ids)
+    amounts = amounts or {}
+    with transaction.atomic():
+        requests = _lock_pending(request_ids)
+        decided = [cash_request.id for cash_request in requests]
+        now = timezone.now()
+        for cash_request in requests:
+            cash_request.status = 'approved'
+            cash_request.approved_by = user
+            cash_request.approved_date = now
+            if delivery_date:
+                cash_request.delivery_date = delivery_date
+        CashRequest.objects.bulk_update(requests, ['status', 'approved_by', 'approved_date', 'delivery_date'])
+        publish('cash_request', *[cash_request_payload(cash_request) for cash_request in requests])
+        enqueue(*[cash_request_decided_event(cash_request, user) for cash_request in requests])
+
+        deliveries = []
+        for cash_request in requests:
+            jmd_amount, usd_amount = amounts.get(cash_request.id, (cash_request.total_jmd, cash_request.total_usd))
+            deliveries.append(CashDelivery(
+                location_id=cash_request.location_id,
+                cash_request=cash_request,
+                date=cash_request.delivery_date,
+                jmd_amount=jmd_amount,
+                usd_amount=usd_amount,
+            ))
+        CashDelivery.objects.bulk_create(deliveries)
+        _after_delivery_change(deliveries)
+
+    skipped = sorted(request_ids - set(decided))
+    logger.info("%s approved cash requests %s (skipped %s)", user, decided, skipped)
+    return DecisionResult(decided, skipped)
+
+
+def reject_requests(request_ids, user):
+    """Reject the pending requests among ``request_ids``. Returns a DecisionResult."""
+    request_ids = set(request_ids)
+    with transaction.atomic():
+        requests = _lock_pending(request_ids)
+        decided = [cash_request.id for cash_request in requests]
+        CashRequest.objects.filter(id__in=decided).update(status='rejected')
+        publish('cash_request', *[{'id': request_id, 'status': 'rejected'} for request_id in decided])
+        for cash_request in requests:
+            cash_request.status = 'rejected'
+        enqueue(*[cash_request_decided_event(cash_request, user) for cash_request in requests])
+
+    skipped = sorted(request_ids - set(decided))
+    logger.info("%s rejected cash requests %s (skipped %s)", user, decided, skipped)
+    return DecisionResult(decided, skipped)
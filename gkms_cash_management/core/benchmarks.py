@@ -0,0 +1,223 @@
+"""
+Benchmark dataset and baselines for the hot paths of the app.
+
+``seed`` builds a realistic dataset (locations from "GMKS locations.csv",
+agents with a history of EOD reports, EFT and Remote Services statements);
+the run_benchmarks command replays the scenarios against it, and
+``compare`` checks their query counts and latency against the stored
+baselines in benchmark_baselines.json. Used by the seed_benchmark_data and
+run_benchmarks commands and by the benchmark tests in core/tests.py.
+"""
+import csv
+import json
+import random
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .forecasting import refresh_forecasts
+from .ledger import post_payouts, sync_eod_reports
+from .limits import sync_limit_breaches
+from .models import (
+    AgentProfile, CashRequest, DailyAgentData, DenominationBreakdown, EFTData, EODReport,
+    Location, LocationAlias, LocationLimit, RemoteServicesData, TellerBalance,
+)
+from .payouts import refresh_payout_averages
+
+LOCATIONS_CSV = Path(settings.BASE_DIR) / 'GMKS locations.csv'
+BASELINES_FILE = Path(__file__).resolve().parent / 'benchmark_baselines.json'
+
+# Dataset sizes: 'full' mirrors production scale, 'small' keeps the test suite fast
+PROFILES = {
+    'small': {'locations': 30, 'agents': 10, 'days': 30},
+    'full': {'locations': None, 'agents': 120, 'days': 365},
+}
+
+AGENT_PREFIX = 'bench_agent_'
+ADMIN_USERNAME = 'bench_admin'
+PASSWORD = 'benchmark'
+
+BATCH_SIZE = 1000
+
+# Latency may exceed the baseline by this factor plus a fixed allowance before it counts as a regression
+DEFAULT_LATENCY_TOLERANCE = 2.0
+LATENCY_ALLOWANCE_MS = 50
+
+
+def _csv_locations(limit=None):
+    locations = []
+    with open(LOCATIONS_CSV, 'r', encoding='utf-8-sig') as file:
+        for row in csv.DictReader(file):
+            name = row.get('Locations', '').strip()
+            if not name:
+                continue
+            clean = lambda value: '' if value.strip() in ('0', '#N/A') else value.strip()
+            locations.append(Location(
+                name=name,
+                eft_system_name=clean(row.get('EFT Name', '')),
+                remote_services_name=clean(row.get('Remote Services Name', '')),
+                insurance_limit_name=clean(row.get('Insurance Limit Name', '')),
+                address='' if row.get('Address', '').strip() == '#N/A' else row.get('Address', '').strip(),
+            ))
+            if limit and len(locations) >= limit:
+                break
+    return locations
+
+
+def _money(rng, low, high):
+    return Decimal(rng.randrange(low * 100, high * 100)) / 100
+
+
+def seed(profile='full', end=None, random_seed=1, log=None):
+    """
+    Create the benchmark dataset for the given profile, ending yesterday
+    (or on ``end``). Expects an empty Location table; returns a dict of row
+    counts per model.
+    """
+    sizes = PROFILES[profile]
+    rng = random.Random(random_seed)
+    end = end or timezone.now().date() - timedelta(days=1)
+    dates = [end - timedelta(days=offset) for offset in range(sizes['days'] - 1, -1, -1)]
+    log = log or (lambda message: None)
+    counts = {}
+
+    with transaction.atomic():
+        locations = Location.objects.bulk_create(_csv_locations(sizes['locations']), batch_size=BATCH_SIZE)
+        LocationAlias.sync_aliases(locations)
+        counts['locations'] = len(locations)
+        LocationLimit.objects.bulk_create([
+            LocationLimit(
+                location=location,
+                insurance_limit=Decimal(rng.choice([3, 4, 5, 6]) * 1000000),
+                eod_vault_limit=Decimal(rng.choice([2, 3]) * 1000000),
+                working_day_limit=Decimal(rng.choice([1, 2]) * 1000000),
+            )
+            for location in locations
+        ], batch_size=BATCH_SIZE)
+
+        password = make_password(PASSWORD)
+        User.objects.bulk_create([User(username=ADMIN_USERNAME, password=password, is_staff=True)])
+        agent_locations = locations[:sizes['agents']]
+        users = User.objects.bulk_create([
+            User(username=f'{AGENT_PREFIX}{index:03d}', password=password)
+            for index in range(len(agent_locations))
+        ], batch_size=BATCH_SIZE)
+        AgentProfile.objects.bulk_create([
+            AgentProfile(user=user, location=location) for user, location in zip(users, agent_locations)
+        ], batch_size=BATCH_SIZE)
+        counts['agents'] = len(users)
+        log(f"Created {len(locations)} locations and {len(users)} agents")
+
+        eft_locations = [location for location in locations if location.eft_system_name]
+        remote_locations = [location for location in locations if location.remote_services_name]
+        eft_rows, remote_rows, daily_rows = [], [], []
+        balances = {location.id: _money(rng, 500000, 2500000) for location in locations}
+        for day in dates:
+            for location in eft_locations:
+                outbound = _money(rng, 100000, 900000)
+                inbound = _money(rng, 100000, 900000)
+                eft_rows.append(EFTData(
+                    location=location, statement_date=day, balance_bf=balances[location.id],
+                    inbound=inbound, outbound=outbound, intra_sent=_money(rng, 0, 50000),
+                    sc=_money(rng, 0, 5000), fx=_money(rng, 0, 5000),
+                ))
+                balances[location.id] += inbound - outbound
+            for location in remote_locations:
+                for currency, parish_id in (('JMD', 1), ('USD', 1)):
+                    pay = _money(rng, 50000, 600000)
+                    send = _money(rng, 10000, 200000)
+                    remote_rows.append(RemoteServicesData(
+                        location=location, statement_date=day, parish_name='Kingston', parish_id=parish_id,
+                        currency=currency, pay_principal=pay, send_principal=send, total_principal=pay + send,
+                        pay_count=rng.randrange(10, 200), send_count=rng.randrange(1, 50),
+                        total_num_trans=rng.randrange(11, 250), total_payout_for_location_in_upload=pay,
+                    ))
+            for location in locations:
+                daily_rows.append(DailyAgentData(
+                    location=location, date=day, closing_balance=max(balances[location.id], Decimal('0.00')),
+                    previous_day_balance=balances[location.id],
+                ))
+        EFTData.objects.bulk_create(eft_rows, batch_size=BATCH_SIZE)
+        RemoteServicesData.objects.bulk_create(remote_rows, batch_size=BATCH_SIZE)
+        DailyAgentData.objects.bulk_create(daily_rows, batch_size=BATCH_SIZE)
+        counts.update(eft=len(eft_rows), remote_services=len(remote_rows), daily_data=len(daily_rows))
+        log(f"Created {len(eft_rows)} EFT, {len(remote_rows)} Remote Services and {len(daily_rows)} daily rows")
+
+        reports = EODReport.objects.bulk_create([
+            EODReport(
+                agent=user, location=location, processing_date=day,
+                closing_balance=_money(rng, 200000, 3000000), funds_from_bxp_webex=_money(rng, 0, 100000),
+                all_tellers_balanced=rng.random() > 0.1, confirmation=True, submitted=True,
+            )
+            for day in dates
+            for user, location in zip(users, agent_locations)
+        ], batch_size=BATCH_SIZE)
+        tellers, denominations = [], []
+        for report in reports:
+            for teller in range(1, rng.randrange(2, 5)):
+                tellers.append(TellerBalance(
+                    eod_report=report, teller_name=f'Teller {teller}',
+                    jmd_amount=_money(rng, 50000, 500000), usd_amount=_money(rng, 0, 2000),
+                ))
+            denominations.append(DenominationBreakdown(
+                eod_report=report, currency='JMD', denomination_5000_count=rng.randrange(0, 200),
+                denomination_1000_count=rng.randrange(0, 500), coins_amount=_money(rng, 0, 2000),
+            ))
+            denominations.append(DenominationBreakdown(
+                eod_report=report, currency='USD', denomination_100_count=rng.randrange(0, 20),
+                denomination_20_count=rng.randrange(0, 50),
+            ))
+        TellerBalance.objects.bulk_create(tellers, batch_size=BATCH_SIZE)
+        DenominationBreakdown.objects.bulk_create(denominations, batch_size=BATCH_SIZE)
+        counts.update(eod_reports=len(reports), teller_balances=len(tellers))
+        log(f"Created {len(reports)} EOD reports with {len(tellers)} teller balances")
+
+        for location in agent_locations[:max(1, len(agent_locations) // 4)]:
+            CashRequest(location=location, jmd_5000=rng.randrange(10, 200), jmd_1000=rng.randrange(10, 500)).save()
+
+    location_ids = [location.id for location in locations]
+    refresh_payout_averages(location_ids, dates)
+    refresh_forecasts(end + timedelta(days=1), location_ids)
+    sync_limit_breaches([timezone.now().date(), end], location_ids)
+    post_payouts(dates, location_ids)
+    sync_eod_reports(EODReport.objects.filter(location_id__in=location_ids))
+    log("Refreshed payout averages, forecasts, limit breaches and the cash ledger")
+    return counts
+
+
+def load_baselines(profile):
+    if not BASELINES_FILE.exists():
+        return {}
+    return json.loads(BASELINES_FILE.read_text()).get(profile, {})
+
+
+def save_baselines(profile, results):
+    baselines = json.loads(BASELINES_FILE.read_text()) if BASELINES_FILE.exists() else {}
+    baselines[profile] = results
+    BASELINES_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+
+
+def compare(results, baselines, latency_tolerance=DEFAULT_LATENCY_TOLERANCE):
+    """
+    Return a list of regressions: scenarios that ran more queries than their
+    baseline, or whose latency exceeded it by more than the tolerance.
+    Pass latency_tolerance=None to check query counts only.
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        if result['queries'] > baseline['queries']:
+            regressions.append(f"{name}: {result['queries']} queries (baseline {baseline['queries']})")
+        if latency_tolerance is not None:
+            allowed = baseline['ms'] * latency_tolerance + LATENCY_ALLOWANCE_MS
+            if result['ms'] > allowed:
+                regressions.append(f"{name}: {result['ms']} ms (baseline {baseline['ms']} ms, allowed {allowed:.0f} ms)")
+    return regressions
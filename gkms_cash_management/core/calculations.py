@@ -1,7 +1,17 @@
 from datetime import datetime, timedelta
 from decimal import Decimal
-from .models import DailyAgentData, LocationLimit
-from .services import get_eft_balance, get_payout_at_3pm, get_average_payout
+from django.db import transaction
+from django.db.models import Sum
+from .models import CashDelivery, DailyAgentData, Location
+from .dashboard import invalidate_location
+from .services import get_eft_balances, get_payouts_at_3pm, get_expected_payouts
+
+# Fields recomputed from imported/external data; closing_balance and variance come from EOD reports,
+# and the exceeds_* flags are maintained from the closing balance by core.limits
+POSITION_FIELDS = [
+    'previous_day_balance', 'cash_delivered_today', 'payout_at_3pm', 'cash_position_at_3pm',
+    'projected_ending_position', 'projected_next_day_amount',
+]
 
 def update_daily_agent_data(location, date=None):
     """
@@ -9,59 +19,80 @@ def update_daily_agent_data(location, date=None):
     """
     if date is None:
         date = datetime.now().date()
-    
-    # Get previous day's date
-    prev_day = date - timedelta(days=1)
-    
+
+    recompute_daily_positions([date], location_ids=[location.id])
+    return DailyAgentData.objects.get(location=location, date=date)
+
+def recompute_daily_positions(dates, location_ids=None):
+    """
+    Calculate and store DailyAgentData for every location (or the given ones) on each of the
+    given dates. Inputs are loaded set-wise, so the number of queries does not depend on the
+    number of locations or dates. Returns the number of rows written.
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return 0
+    if location_ids is None:
+        location_ids = list(Location.objects.values_list('id', flat=True))
+    location_ids = list(location_ids)
+    if not location_ids:
+        return 0
+
     # Get data from external systems
-    previous_day_balance = get_eft_balance(location.id, prev_day)
-    payout_at_3pm = get_payout_at_3pm(location.id, date)
-    
-    # Get cash delivered today (from our database)
-    from .models import CashDelivery
-    try:
-        delivery = CashDelivery.objects.get(location=location, date=date, verified=True)
-        cash_delivered_today = delivery.verified_jmd_amount
-    except CashDelivery.DoesNotExist:
-        cash_delivered_today = Decimal('0')
-    
-    # Calculate cash position at 3 PM
-    cash_position_at_3pm = previous_day_balance + cash_delivered_today - payout_at_3pm
-    
-    # Calculate projected ending position
-    avg_payout = get_average_payout(location.id, date)
-    projected_ending_position = cash_position_at_3pm - avg_payout
-    
-    # Calculate amount needed tomorrow
-    tomorrow_avg_payout = get_average_payout(location.id, date + timedelta(days=1))
-    projected_next_day_amount = projected_ending_position - tomorrow_avg_payout
-    
-    # Check if limits are exceeded
-    try:
-        limits = LocationLimit.objects.get(location=location)
-        exceeds_insurance_limit = projected_next_day_amount > limits.insurance_limit
-        exceeds_eod_limit = projected_next_day_amount > limits.eod_vault_limit
-        exceeds_working_day_limit = projected_next_day_amount > limits.working_day_limit
-    except LocationLimit.DoesNotExist:
-        exceeds_insurance_limit = False
-        exceeds_eod_limit = False
-        exceeds_working_day_limit = False
-    
-    # Update or create daily data record
-    daily_data, created = DailyAgentData.objects.update_or_create(
-        location=location,
-        date=date,
-        defaults={
-            'previous_day_balance': previous_day_balance,
-            'cash_delivered_today': cash_delivered_today,
-            'payout_at_3pm': payout_at_3pm,
-            'cash_position_at_3pm': cash_position_at_3pm,
-            'projected_ending_position': projected_ending_position,
-            'projected_next_day_amount': projected_next_day_amount,
-            'exceeds_insurance_limit': exceeds_insurance_limit,
-            'exceeds_eod_limit': exceeds_eod_limit,
-            'exceeds_working_day_limit': exceeds_working_day_limit,
-        }
+    previous_day_balances = get_eft_balances(location_ids, [date - timedelta(days=1) for date in dates])
+    # The positions are JMD: USD principal is left out of the payouts (see core.payouts)
+    payouts_at_3pm = get_payouts_at_3pm(location_ids, dates)
+    expected_payouts = get_expected_payouts(
+        location_ids, set(dates) | {date + timedelta(days=1) for date in dates}
     )
-    
-    return daily_data 
\ No newline at end of file
+
+    # Get cash delivered (from our database)
+    deliveries = {
+        (row['location_id'], row['date']): row['total']
+        for row in CashDelivery.objects.filter(
+            location_id__in=location_ids, date__in=dates, verified=True
+        ).values('location_id', 'date').annotate(total=Sum('jmd_amount'))
+    }
+
+    zero = Decimal('0')
+    positions = []
+    for date in dates:
+        prev_day = date - timedelta(days=1)
+        tomorrow = date + timedelta(days=1)
+        for location_id in location_ids:
+            previous_day_balance = previous_day_balances.get((location_id, prev_day), zero)
+            cash_delivered_today = deliveries.get((location_id, date), zero)
+            payout_at_3pm = payouts_at_3pm.get((location_id, date), zero)
+
+            # Calculate cash position at 3 PM
+            cash_position_at_3pm = previous_day_balance + cash_delivered_today - payout_at_3pm
+
+            # Calculate projected ending position
+            projected_ending_position = cash_position_at_3pm - expected_payouts[(location_id, date)]
+
+            # Calculate amount needed tomorrow
+            projected_next_day_amount = projected_ending_position - expected_payouts[(location_id, tomorrow)]
+
+            positions.append(DailyAgentData(
+                location_id=location_id,
+                date=date,
+                previous_day_balance=previous_day_balance,
+                cash_delivered_today=cash_delivered_today,
+                payout_at_3pm=payout_at_3pm,
+                cash_position_at_3pm=cash_position_at_3pm,
+                projected_ending_position=projected_ending_position,
+                projected_next_day_amount=projected_next_day_amount,
+            ))
+
+    # Update or create all daily data records in one statement per batch
+    with transaction.atomic():
+        DailyAgentData.objects.bulk_create(
+            positions,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['location', 'date'],
+            update_fields=POSITION_FIELDS,
+        )
+    invalidate_location(*location_ids)
+
+    return len(positions)
@@ -0,0 +1,237 @@
+"""
+Network-wide cash order plan.
+
+plan_orders works out the next delivery for every location in one batch.
+The inputs are loaded set-wise (a handful of queries in all) into NumPy
+arrays, and the amounts and denomination mixes of all locations are
+computed together:
+
+* opening position: the latest closing balance before the delivery day,
+  or the day's projected ending position if no EOD report is in yet, plus
+  approved deliveries already scheduled for that day;
+* demand: the expected JMD payouts (core.forecasting, falling back to
+  the payout averages, both built from JMD principal only) on the
+  delivery day, plus NEXT_DAY_COVER of the next day's to carry the
+  location until the following delivery;
+* caps: cash on hand after the delivery stays within the insurance and
+  working day limits, and the expected closing balance within the EOD
+  vault limit.
+
+The JMD amount is the shortfall against demand with a SAFETY_MARGIN,
+clipped to the caps and rounded down to whole packets. It is split into
+packets by the target value shares in JMD_MIX, with any remainder topped
+up largest denomination first. USD amounts cover the recent average USD
+payout; there are no USD positions or limits to plan against.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .live import cash_request_payload, publish
+from .models import CashRequest, DailyAgentData, Location, RemoteServicesData
+from .services import get_expected_payouts
+
+logger = logging.getLogger(__name__)
+
+# (CashRequest field, note value, notes per packet, target share of the amount)
+JMD_MIX = [
+    ('jmd_5000', 5000, 100, 0.40),
+    ('jmd_2000', 2000, 100, 0.10),
+    ('jmd_1000', 1000, 100, 0.30),
+    ('jmd_500', 500, 100, 0.12),
+    ('jmd_100', 100, 100, 0.06),
+    ('jmd_50', 50, 100, 0.02),
+]
+USD_MIX = [
+    ('usd_100', 100, 10, 0.50),
+    ('usd_50', 50, 10, 0.20),
+    ('usd_20', 20, 10, 0.20),
+    ('usd_10', 10, 10, 0.10),
+    # $1 notes are only ordered by hand
+    ('usd_1', 1, 10, 0.0),
+]
+
+# Order this much more than the expected payouts
+SAFETY_MARGIN = 0.15
+# Share of the following day's payouts to hold at the close, until the next delivery arrives
+NEXT_DAY_COVER = 0.5
+# Days of USD Remote Services payouts averaged for the USD amount
+USD_HISTORY_DAYS = 28
+# How far back to look for a location's latest position
+POSITION_LOOKBACK_DAYS = 7
+
+
+class PlanLine:
+    """The recommended order for one location."""
+
+    def __init__(self, location, **values):
+        self.location = location
+        self.__dict__.update(values)
+
+    @property
+    def has_order(self):
+        return self.jmd_amount > 0 or self.usd_amount > 0
+
+    @property
+    def denominations(self):
+        """[(label, note count)] of the denominations in the order."""
+        return [
+            (f"{'J$' if field.startswith('jmd') else 'US$'}{value:,}", self.notes[field])
+            for field, value, _, _ in JMD_MIX + USD_MIX
+            if self.notes[field]
+        ]
+
+    def cash_request(self, delivery_date):
+        """An unsaved pending CashRequest for this line, with its totals filled in."""
+        return CashRequest(
+            location=self.location,
+            delivery_date=delivery_date,
+            total_jmd=self.jmd_amount,
+            total_usd=self.usd_amount,
+            **self.notes,
+        )
+
+
+def _decimal(value):
+    return Decimal(str(round(float(value), 2)))
+
+
+def opening_positions(location_ids, delivery_date):
+    """{location_id: position} at the start of ``delivery_date``, from the latest DailyAgentData before it."""
+    positions = {}
+    for location_id, closing_balance, projected in DailyAgentData.objects.filter(
+        location_id__in=location_ids,
+        date__range=(delivery_date - timedelta(days=POSITION_LOOKBACK_DAYS), delivery_date - timedelta(days=1)),
+    ).order_by('date').values_list('location_id', 'closing_balance', 'projected_ending_position'):
+        # No EOD report yet: the projection for the day stands in for the closing balance
+        positions[location_id] = closing_balance or projected
+    return positions
+
+
+def scheduled_deliveries(location_ids, delivery_date):
+    """Approved JMD amounts already due on ``delivery_date``, and the locations with an open request for it."""
+    scheduled, requested = {}, set()
+    for location_id, status, total_jmd in CashRequest.objects.filter(
+        location_id__in=location_ids, delivery_date=delivery_date, status__in=['pending', 'approved'],
+    ).values_list('location_id', 'status', 'total_jmd'):
+        requested.add(location_id)
+        if status == 'approved':
+            scheduled[location_id] = scheduled.get(location_id, Decimal('0.00')) + total_jmd
+    return scheduled, requested
+
+
+def average_usd_payouts(location_ids, before):
+    """{location_id: average daily USD pay principal} over the USD_HISTORY_DAYS before ``before``."""
+    start = before - timedelta(days=USD_HISTORY_DAYS)
+    return {
+        row['location_id']: row['total'] / USD_HISTORY_DAYS
+        for row in RemoteServicesData.objects.filter(
+            location_id__in=location_ids, currency='USD', statement_date__range=(start, before - timedelta(days=1)),
+        ).values('location_id').annotate(total=Sum('pay_principal'))
+    }
+
+
+def packet_mix(amounts, mix):
+    """
+    Split each amount into whole packets (vectorized over the amounts).
+    Returns (notes per denomination as a locations x len(mix) int array, amount covered).
+    """
+    values = np.array([value * notes for _, value, notes, _ in mix], dtype=float)
+    shares = np.array([share for _, _, _, share in mix])
+    packets = np.floor(amounts[:, None] * shares / values)
+    remainder = amounts - packets @ values
+    for column, packet_value in enumerate(values):
+        extra = np.floor(remainder / packet_value)
+        packets[:, column] += extra
+        remainder -= extra * packet_value
+    notes = packets.astype(np.int64) * np.array([notes for _, _, notes, _ in mix])
+    return notes, packets @ values
+
+
+def plan_orders(delivery_date=None, locations=None):
+    """
+    Recommended orders for ``delivery_date`` (tomorrow by default) for every
+    location (or the given queryset). Returns a list of PlanLine, one per location.
+    """
+    delivery_date = delivery_date or timezone.localdate() + timedelta(days=1)
+    locations = list((locations if locations is not None else Location.objects.all()).select_related('locationlimit').order_by('name'))
+    if not locations:
+        return []
+    location_ids = [location.id for location in locations]
+    next_day = delivery_date + timedelta(days=1)
+
+    positions = opening_positions(location_ids, delivery_date)
+    scheduled, requested = scheduled_deliveries(location_ids, delivery_date)
+    # JMD only: USD payouts are covered by the USD line below
+    expected = get_expected_payouts(location_ids, [delivery_date, next_day])
+    usd_payouts = average_usd_payouts(location_ids, delivery_date)
+
+    def column(values):
+        return np.array([float(value) for value in values])
+
+    opening = column(positions.get(location_id, 0) for location_id in location_ids)
+    incoming = column(scheduled.get(location_id, 0) for location_id in location_ids)
+    demand = column(expected[(location_id, delivery_date)] for location_id in location_ids)
+    next_demand = column(expected[(location_id, next_day)] for location_id in location_ids)
+
+    def limit(field):
+        return column(
+            getattr(location.locationlimit, field) if hasattr(location, 'locationlimit') else np.inf
+            for location in locations
+        )
+
+    available = opening + incoming
+    need = np.maximum(demand * (1 + SAFETY_MARGIN) + next_demand * NEXT_DAY_COVER - available, 0)
+    peak_cap = np.minimum(limit('insurance_limit'), limit('working_day_limit')) - available
+    closing_cap = limit('eod_vault_limit') - (available - demand)
+    cap = np.maximum(np.minimum(peak_cap, closing_cap), 0)
+    jmd_notes, jmd_amounts = packet_mix(np.minimum(need, cap), JMD_MIX)
+
+    usd_need = column(usd_payouts.get(location_id, 0) for location_id in location_ids) * (1 + SAFETY_MARGIN)
+    usd_notes, usd_amounts = packet_mix(np.ceil(usd_need / 100) * 100, USD_MIX)
+
+    fields = [field for field, _, _, _ in JMD_MIX + USD_MIX]
+    notes = np.hstack([jmd_notes, usd_notes])
+    lines = []
+    for row, location in enumerate(locations):
+        lines.append(PlanLine(
+            location,
+            opening_position=_decimal(opening[row]),
+            scheduled=_decimal(incoming[row]),
+            expected_payout=_decimal(demand[row]),
+            next_day_payout=_decimal(next_demand[row]),
+            headroom=_decimal(cap[row]) if np.isfinite(cap[row]) else None,
+            jmd_amount=_decimal(jmd_amounts[row]),
+            usd_amount=_decimal(usd_amounts[row]),
+            notes=dict(zip(fields, (int(count) for count in notes[row]))),
+            shortfall=_decimal(max(need[row] - jmd_amounts[row], 0)),
+            has_request=location.id in requested,
+        ))
+    return lines
+
+
+def create_requests(lines, delivery_date, location_ids=None):
+    """
+    Create pending CashRequests for the plan lines with an order (only the
+    given locations, if any), skipping locations that already have an open
+    request for ``delivery_date``. Returns the created requests.
+    """
+    selected = [
+        line for line in lines
+        if line.has_order and not line.has_request and (location_ids is None or line.location.id in location_ids)
+    ]
+    with transaction.atomic():
+        # Requests raised since the plan was built (another user, or the agent) win
+        _, requested = scheduled_deliveries([line.location.id for line in selected], delivery_date)
+        # bulk_create skips CashRequest.save(), so the totals are set on each line's request
+        requests = CashRequest.objects.bulk_create([
+            line.cash_request(delivery_date) for line in selected if line.location.id not in requested
+        ])
+        publish('cash_request', *[cash_request_payload(cash_request) for cash_request in requests])
+    logger.info("Created %s planned cash requests for %s", len(requests), delivery_date)
+    return requests
@@ -0,0 +1,82 @@
+"""
+Agent dashboard data.
+
+Location data for the dashboard (today's DailyAgentData and the recent EOD
+reports) and each agent's emergency access state are cached, so a refresh
+costs the profile and settings lookups only. The receivers in models.py,
+and the bulk writers that bypass signals, invalidate the entries when
+deliveries, daily data, EOD reports or emergency requests change.
+"""
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DailyAgentData, EmergencyAccessRequest, EODReport
+
+LOCATION_KEY = 'agent_dashboard:location:{location_id}'
+EMERGENCY_KEY = 'agent_dashboard:emergency:{user_id}'
+
+# Safety net; entries are normally dropped by invalidation long before this
+CACHE_TIMEOUT = 5 * 60
+
+RECENT_REPORTS = 5
+
+
+def location_dashboard_data(location, today=None):
+    """
+    Today's DailyAgentData for the location (an unsaved zero row if none has
+    been recorded yet), its most recent EOD reports and today's report.
+    """
+    today = today or timezone.now().date()
+    key = LOCATION_KEY.format(location_id=location.id)
+    data = cache.get(key)
+    if data is None or data['date'] != today:
+        daily_data = DailyAgentData.objects.filter(location=location, date=today).first()
+        if daily_data is None:
+            daily_data = DailyAgentData(location=location, date=today)
+        recent_reports = list(
+            EODReport.objects.filter(location=location).order_by('-processing_date')[:RECENT_REPORTS]
+        )
+        eod_report = next((report for report in recent_reports if report.processing_date == today), None)
+        if eod_report is None:
+            eod_report = EODReport.objects.filter(location=location, processing_date=today).first()
+        data = {
+            'date': today,
+            'daily_data': daily_data,
+            'recent_reports': recent_reports,
+            'eod_report': eod_report,
+        }
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def emergency_access_state(user):
+    """
+    ``(access_granted_until, has_pending_request)`` for the agent, where
+    access_granted_until is the end of the latest approved access that had
+    not expired when the state was loaded (or None). Callers compare it with
+    the current time, so a cached grant lapses on its own.
+    """
+    key = EMERGENCY_KEY.format(user_id=user.id)
+    state = cache.get(key)
+    if state is None:
+        granted_until = None
+        pending = False
+        for status, until in EmergencyAccessRequest.objects.filter(
+            Q(status='pending') | Q(status='approved', access_granted_until__gt=timezone.now()), agent=user
+        ).values_list('status', 'access_granted_until'):
+            if status == 'pending':
+                pending = True
+            elif granted_until is None or until > granted_until:
+                granted_until = until
+        state = (granted_until, pending)
+        cache.set(key, state, CACHE_TIMEOUT)
+    return state
+
+
+def invalidate_location(*location_ids):
+    cache.delete_many([LOCATION_KEY.format(location_id=location_id) for location_id in location_ids if location_id])
+
+
+def invalidate_agent(*user_ids):
+    cache.delete_many([EMERGENCY_KEY.format(user_id=user_id) for user_id in user_ids if user_id])
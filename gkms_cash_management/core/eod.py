@@ -0,0 +1,214 @@
+"""
+EOD report persistence.
+
+save_eod_report writes a whole submission (report, denomination breakdowns,
+teller balances and variances, and today's closing balance) in one
+transaction. Child rows are diffed against what is already stored and only
+the differences are written, with one bulk statement per kind of change, so
+a submission costs the same handful of queries however many tellers it has.
+"""
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import DailyAgentData, DenominationBreakdown, EODReport, TellerBalance, TellerVariance
+from .notifications import enqueue, eod_report_event
+
+logger = logging.getLogger(__name__)
+
+# EODReportForm field -> DenominationBreakdown field, per currency
+DENOMINATION_FIELDS = {
+    'JMD': {
+        'jmd_5000_count': 'denomination_5000_count',
+        'jmd_1000_count': 'denomination_1000_count',
+        'jmd_500_count': 'denomination_500_count',
+        'jmd_100_count': 'denomination_100_count',
+        'jmd_50_count': 'denomination_50_count',
+        'jmd_coins_amount': 'coins_amount',
+    },
+    'USD': {
+        'usd_100_count': 'denomination_100_count',
+        'usd_50_count': 'denomination_50_count',
+        'usd_20_count': 'denomination_20_count',
+        'usd_10_count': 'denomination_10_count',
+        'usd_small_amount': 'small_bills_coins_amount',
+    },
+}
+
+
+def to_amount(value):
+    """Parse a submitted amount; blank is 0. Raises ValueError for anything else that isn't a finite number."""
+    if value is None or str(value).strip() == '':
+        return Decimal('0.00')
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount '{value}'.")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount '{value}'.")
+    return amount
+
+
+def parse_tellers(names, jmd_amounts, usd_amounts):
+    """Submitted teller rows as (name, jmd, usd); rows without a name are dropped."""
+    return [
+        (name.strip(), to_amount(jmd), to_amount(usd))
+        for name, jmd, usd in zip(names, jmd_amounts, usd_amounts)
+        if name.strip()
+    ]
+
+
+def parse_variances(numbers, amounts):
+    """Submitted teller variances as (teller_number, variance); rows without a number are dropped."""
+    return [
+        (number.strip(), to_amount(amount))
+        for number, amount in zip(numbers, amounts)
+        if number.strip()
+    ]
+
+
+def _sync_children(report, existing, submitted, key_field, value_fields, model):
+    """
+    Diff submitted rows (tuples of key then values) against the existing
+    children and bulk-apply the creates, updates and deletes.
+    Existing rows are matched by key, oldest first.
+    """
+    unmatched = {}
+    for child in sorted(existing, key=lambda child: child.pk):
+        unmatched.setdefault(getattr(child, key_field), []).append(child)
+
+    to_create, to_update = [], []
+    for key, *values in submitted:
+        candidates = unmatched.get(key)
+        if not candidates:
+            to_create.append(model(eod_report=report, **{key_field: key}, **dict(zip(value_fields, values))))
+            continue
+        child = candidates.pop(0)
+        if any(getattr(child, field) != value for field, value in zip(value_fields, values)):
+            for field, value in zip(value_fields, values):
+                setattr(child, field, value)
+            to_update.append(child)
+
+    to_delete = [child.pk for children in unmatched.values() for child in children]
+    if to_delete:
+        model.objects.filter(pk__in=to_delete).delete()
+    if to_update:
+        # bulk_update does not apply auto_now
+        if any(field.name == 'updated_at' for field in model._meta.fields):
+            now = timezone.now()
+            for child in to_update:
+                child.updated_at = now
+            value_fields = value_fields + ['updated_at']
+        model.objects.bulk_update(to_update, value_fields)
+    if to_create:
+        model.objects.bulk_create(to_create)
+
+
+def _sync_denominations(report, existing, cleaned_data):
+    existing = {breakdown.currency: breakdown for breakdown in existing}
+    to_create, to_update, update_fields = [], [], set()
+    for currency, fields in DENOMINATION_FIELDS.items():
+        values = {field: cleaned_data.get(form_field) or 0 for form_field, field in fields.items()}
+        breakdown = existing.get(currency)
+        if breakdown is None:
+            to_create.append(DenominationBreakdown(eod_report=report, currency=currency, **values))
+        elif any(getattr(breakdown, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(breakdown, field, value)
+            breakdown.updated_at = timezone.now()
+            to_update.append(breakdown)
+            update_fields.update(values)
+    if to_update:
+        DenominationBreakdown.objects.bulk_update(to_update, sorted(update_fields | {'updated_at'}))
+    if to_create:
+        DenominationBreakdown.objects.bulk_create(to_create)
+
+
+def _locked_report(agent, location, processing_date):
+    return (
+        EODReport.objects.select_for_update()
+        .filter(agent=agent, location=location, processing_date=processing_date)
+        .prefetch_related('denomination_breakdowns', 'teller_balances', 'teller_variances')
+        .first()
+    )
+
+
+def save_eod_report(agent, location, cleaned_data, tellers, variances, daily_data=None):
+    """
+    Create or update the agent's EOD report for the submitted processing date
+    from validated EODReportForm data plus the parsed teller balances and
+    variances (see parse_tellers / parse_variances). Variances only apply when
+    not all tellers balanced; otherwise any stored variances are removed.
+    If ``daily_data`` is given, its closing balance is updated too (for an
+    unsaved instance, the location's row for that date is created or
+    updated).
+
+    Returns ``(report, created)``.
+    """
+    processing_date = cleaned_data['processing_date']
+    courier = cleaned_data['cash_sent_to_courier']
+    balanced = cleaned_data['all_tellers_balanced']
+    if balanced:
+        variances = []
+
+    values = {
+        'closing_balance': cleaned_data['closing_balance'],
+        'funds_from_bxp_webex': cleaned_data['funds_from_bxp_webex'] or 0,
+        'cash_sent_to_courier': courier,
+        'courier_usd_amount': cleaned_data['courier_usd_amount'] if courier else None,
+        'courier_usd_receipt': cleaned_data['courier_usd_receipt'] if courier else None,
+        'courier_jmd_amount': cleaned_data['courier_jmd_amount'] if courier else None,
+        'courier_jmd_receipt': cleaned_data['courier_jmd_receipt'] if courier else None,
+        'all_tellers_balanced': balanced,
+        'total_variance': sum((variance for _, variance in variances), Decimal('0.00')),
+        'notes': cleaned_data['notes'],
+        'confirmation': cleaned_data['confirmation'],
+        'submitted': True,
+    }
+
+    with transaction.atomic():
+        report = _locked_report(agent, location, processing_date)
+        created = report is None
+        if created:
+            try:
+                with transaction.atomic():
+                    report = EODReport.objects.create(
+                        agent=agent, location=location, processing_date=processing_date, **values
+                    )
+                existing_denominations = existing_tellers = existing_variances = []
+            except IntegrityError:
+                # A concurrent submission created it since the lookup: update that one instead
+                report = _locked_report(agent, location, processing_date)
+                created = False
+        if not created:
+            # Already loaded: spares the receivers and the notification a query each
+            report.location = location
+            report.agent = agent
+            for field, value in values.items():
+                setattr(report, field, value)
+            report.save(update_fields=list(values) + ['updated_at'])
+            existing_denominations = report.denomination_breakdowns.all()
+            existing_tellers = report.teller_balances.all()
+            existing_variances = report.teller_variances.all()
+
+        _sync_denominations(report, existing_denominations, cleaned_data)
+        _sync_children(report, existing_tellers, tellers, 'teller_name', ['jmd_amount', 'usd_amount'], TellerBalance)
+        _sync_children(report, existing_variances, variances, 'teller_number', ['variance'], TellerVariance)
+
+        if daily_data is not None:
+            if daily_data.pk is None:
+                # Another submission may have created the row since it was looked up
+                DailyAgentData.objects.update_or_create(
+                    location=daily_data.location, date=daily_data.date,
+                    defaults={'closing_balance': cleaned_data['closing_balance']},
+                )
+            else:
+                daily_data.closing_balance = cleaned_data['closing_balance']
+                daily_data.save(update_fields=['closing_balance'])
+
+        enqueue(eod_report_event(report, created))
+
+    logger.info("EOD report %s for %s on %s", 'created' if created else 'updated', location, processing_date)
+    return report, created
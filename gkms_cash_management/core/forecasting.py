@@ -0,0 +1,215 @@
+"""
+Per-location payout forecasts.
+
+The payout history of every location (see core.payouts.daily_payouts) is
+loaded into one locations x days NumPy array, and a multiplicative model is
+fitted to all locations in a single vectorized pass:
+
+    payout = level x weekday factor x month-end factor x holiday factor x season factor
+
+Weekday factors are the weekday means relative to the overall mean; the
+other factors compare days with and without the feature after removing the
+weekday effect. Each factor is shrunk towards 1 by SHRINKAGE pseudo-days,
+so a feature seen once or twice cannot swing a forecast. The level is a
+recency-weighted mean of the adjusted history. Days without a statement
+(closed, or not imported yet) are left out of the fit rather than counted
+as zero, and a weekday with no statements at all is forecast as closed.
+
+refresh_forecasts stores the next HORIZON_DAYS days per location in
+PayoutForecast; get_forecast_payouts reads them back for the daily position
+recompute.
+"""
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Location, PayoutForecast
+from .payouts import daily_payouts, easter_sunday, season_for, season_windows
+
+logger = logging.getLogger(__name__)
+
+# 53 weeks, so last year's seasonal window is always in the history
+HISTORY_DAYS = 371
+HORIZON_DAYS = 14
+# Locations with fewer statement days are left to the payout averages
+MIN_OBSERVED_DAYS = 14
+# Pseudo-days at the neutral value added to every factor estimate
+SHRINKAGE = 4.0
+# Half-life of the recency weights of the level, in days
+LEVEL_HALF_LIFE = 28.0
+# Days at the end of a month (and start of the next) that count as month end
+MONTH_END_DAYS = 3
+MONTH_START_DAYS = 2
+
+FEATURES = ['month_end', 'holiday'] + list(season_windows(2000))
+
+
+def _observed(day):
+    # Holidays falling on a Sunday are observed on the Monday
+    return day + timedelta(days=1) if day.weekday() == 6 else day
+
+
+def public_holidays(year):
+    """Jamaican public holidays of the year, as observed."""
+    easter = easter_sunday(year)
+    october_first = date(year, 10, 1)
+    christmas = _observed(date(year, 12, 25))
+    boxing_day = _observed(date(year, 12, 26))
+    if boxing_day == christmas:
+        boxing_day += timedelta(days=1)
+    return {
+        _observed(date(year, 1, 1)),
+        easter - timedelta(days=46),  # Ash Wednesday
+        easter - timedelta(days=2),  # Good Friday
+        easter + timedelta(days=1),  # Easter Monday
+        _observed(date(year, 5, 23)),  # Labour Day
+        _observed(date(year, 8, 1)),  # Emancipation Day
+        _observed(date(year, 8, 6)),  # Independence Day
+        october_first + timedelta(days=-october_first.weekday() % 7 + 14),  # National Heroes Day, third Monday
+        christmas,
+        boxing_day,
+    }
+
+
+def calendar_features(days):
+    """(weekday index, days x FEATURES 0/1 matrix) for a sequence of dates."""
+    holidays = set()
+    for year in {day.year for day in days}:
+        holidays |= public_holidays(year)
+    weekdays = np.array([day.weekday() for day in days], dtype=np.intp)
+    features = np.zeros((len(days), len(FEATURES)))
+    for row, day in enumerate(days):
+        next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        if (next_month - day).days <= MONTH_END_DAYS or day.day <= MONTH_START_DAYS:
+            features[row, FEATURES.index('month_end')] = 1
+        if day in holidays:
+            features[row, FEATURES.index('holiday')] = 1
+        season = season_for(day)
+        if season is not None:
+            features[row, FEATURES.index(season[0])] = 1
+    return weekdays, features
+
+
+def load_history(location_ids, start, end):
+    """
+    (payouts, observed) arrays of shape (locations, days) for start..end,
+    in the order of ``location_ids``; ``observed`` marks days with a statement.
+    """
+    index = {location_id: row for row, location_id in enumerate(location_ids)}
+    rows, columns, values = [], [], []
+    for location_id, by_date in daily_payouts(location_ids, start, end).items():
+        for day, payout in by_date.items():
+            rows.append(index[location_id])
+            columns.append((day - start).days)
+            values.append(float(payout))
+    shape = (len(location_ids), (end - start).days + 1)
+    payouts = np.zeros(shape)
+    observed = np.zeros(shape, dtype=bool)
+    payouts[rows, columns] = values
+    observed[rows, columns] = True
+    return payouts, observed
+
+
+def _ratio(numerator, denominator, default=1.0):
+    return np.divide(numerator, denominator, out=np.full(np.shape(numerator), default), where=denominator > 0)
+
+
+def fit(payouts, observed, weekdays, features):
+    """
+    Fit the model to every location at once. Returns (level, weekday factors
+    (locations x 7), feature factors (locations x FEATURES), days observed).
+    """
+    mask = observed.astype(float)
+    values = payouts * mask
+    counts = mask.sum(axis=1)
+    mean = _ratio(values.sum(axis=1), counts, default=0.0)
+
+    one_hot = np.eye(7)[weekdays]
+    weekday_count = mask @ one_hot
+    weekday_mean = (values @ one_hot + SHRINKAGE * mean[:, None]) / (weekday_count + SHRINKAGE)
+    weekday_factors = _ratio(weekday_mean, mean[:, None])
+    # A weekday without a single statement in the history is a day the location is closed
+    weekday_factors[(weekday_count == 0) & (counts[:, None] > 0)] = 0.0
+
+    adjusted = _ratio(payouts, weekday_factors[:, weekdays], default=0.0) * mask
+    with_sum, with_count = adjusted @ features, mask @ features
+    without_mean = _ratio(
+        adjusted.sum(axis=1)[:, None] - with_sum, counts[:, None] - with_count, default=0.0
+    )
+    feature_factors = _ratio((with_sum + SHRINKAGE * without_mean) / (with_count + SHRINKAGE), without_mean)
+
+    multipliers = weekday_factors[:, weekdays] * np.exp(np.log(feature_factors) @ features.T)
+    weights = 0.5 ** (np.arange(payouts.shape[1])[::-1] / LEVEL_HALF_LIFE) * mask
+    level = _ratio((_ratio(payouts, multipliers, default=0.0) * weights).sum(axis=1), weights.sum(axis=1), default=0.0)
+    return level, weekday_factors, feature_factors, counts
+
+
+def forecast(location_ids, first_day, horizon=HORIZON_DAYS):
+    """
+    Forecast payouts for ``first_day`` and the following days from the
+    history before it. Returns (forecast days, locations x days array,
+    days observed per location).
+    """
+    history_end = first_day - timedelta(days=1)
+    history_start = history_end - timedelta(days=HISTORY_DAYS - 1)
+    history_days = [history_start + timedelta(days=offset) for offset in range(HISTORY_DAYS)]
+    payouts, observed = load_history(location_ids, history_start, history_end)
+
+    level, weekday_factors, feature_factors, counts = fit(payouts, observed, *calendar_features(history_days))
+
+    days = [first_day + timedelta(days=offset) for offset in range(horizon)]
+    weekdays, features = calendar_features(days)
+    forecasts = level[:, None] * weekday_factors[:, weekdays] * np.exp(np.log(feature_factors) @ features.T)
+    return days, forecasts, counts
+
+
+def refresh_forecasts(first_day=None, location_ids=None):
+    """
+    Store forecasts for the next HORIZON_DAYS days (from today by default)
+    for every location (or the given ones) with enough history. Returns the
+    number of rows written.
+    """
+    first_day = first_day or timezone.localdate()
+    if location_ids is None:
+        location_ids = list(Location.objects.values_list('id', flat=True))
+    location_ids = list(location_ids)
+    if not location_ids:
+        return 0
+
+    days, forecasts, counts = forecast(location_ids, first_day)
+    rows = [
+        PayoutForecast(
+            location_id=location_id,
+            forecast_date=day,
+            amount=Decimal(str(round(max(forecasts[row, column], 0.0), 2))),
+            generated_for=first_day,
+            days_observed=int(counts[row]),
+        )
+        for row, location_id in enumerate(location_ids)
+        if counts[row] >= MIN_OBSERVED_DAYS
+        for column, day in enumerate(days)
+    ]
+    with transaction.atomic():
+        PayoutForecast.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['location', 'forecast_date'],
+            update_fields=['amount', 'generated_for', 'days_observed', 'updated_at'],
+        )
+    logger.info("Stored %s payout forecasts from %s for %s locations", len(rows), first_day, len(location_ids))
+    return len(rows)
+
+
+def get_forecast_payouts(location_ids, days):
+    """Stored forecasts as {(location_id, day): amount}, in one query; missing pairs are left out."""
+    return {
+        (location_id, day): amount
+        for location_id, day, amount in PayoutForecast.objects.filter(
+            location_id__in=list(location_ids), forecast_date__in=list(days)
+        ).values_list('location_id', 'forecast_date', 'amount')
+    }
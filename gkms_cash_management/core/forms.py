@@ -1,5 +1,6 @@
 from django import forms
 from .models import CashRequest, EODReport, CashDelivery, TellerBalance, Adjustment, EmergencyAccessRequest, Location, EFTData
+from .reports import DATASETS
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -454,6 +455,10 @@ class UploadEFTStatementForm(forms.Form):
             'accept': '.xlsx, .xls'
         })
     )
+    import_again = forms.BooleanField(
+        label='Import again, even if this file was already imported',
+        required=False,
+    )
 
 class EFTDataEditForm(forms.ModelForm):
     class Meta:
@@ -501,4 +506,55 @@ class UploadRemoteServicesStatementForm(forms.Form):
             'class': 'form-control',
             'accept': '.xlsx, .xls' 
         })
-    ) 
\ No newline at end of file
+    )
+    import_again = forms.BooleanField(
+        label='Import again, even if this file was already imported',
+        required=False,
+    )
+
+
+class ReportExportForm(forms.Form):
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (.xlsx)'),
+    )
+
+    dataset = forms.ChoiceField(
+        label='Report',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    start_date = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+    end_date = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+    locations = forms.ModelMultipleChoiceField(
+        queryset=Location.objects.order_by('name'),
+        required=False,
+        help_text='Leave empty to include all locations.',
+        widget=forms.SelectMultiple(attrs={'class': 'form-select', 'size': 8})
+    )
+    format = forms.ChoiceField(
+        choices=FORMAT_CHOICES,
+        initial='csv',
+        widget=forms.RadioSelect
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['dataset'].choices = [(key, dataset.label) for key, dataset in DATASETS.items()]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and start_date > end_date:
+            raise forms.ValidationError("The start date must be on or before the end date.")
+        return cleaned_data
+
+
+class CashPlanForm(forms.Form):
+    delivery_date = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
@@ -0,0 +1,174 @@
+"""
+Registry of the hot-path querysets.
+
+Each entry builds the queryset a view, job or cache loader actually runs
+(calling the view's own helper in core.queries where it has one),
+with parameters taken from the data in the database (see
+HotQueryContext). explain() runs EXPLAIN on them and reports sequential
+scans, so a missing or unused index shows up against the seeded
+benchmark data (seed_benchmark_data) before it shows up in production.
+Used by the explain_hot_queries command.
+"""
+import re
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import connection
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from . import queries
+from .models import (
+    AgentProfile, CashLedgerEntry, CashPosition, CashRequest, CashRollup, DailyAgentData, EFTData,
+    EmergencyAccessRequest, EODReport, ImportJob, LimitBreach, LiveEvent, Notification, PayoutForecast,
+    RemoteServicesData,
+)
+
+# Full scans in EXPLAIN output: "Seq Scan on core_x" on PostgreSQL, "SCAN core_x" on
+# SQLite (which also reports walking a whole index in order as "SCAN core_x USING INDEX i")
+SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)()'),
+    'sqlite': re.compile(r'\bSCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?'),
+}
+
+
+class HotQueryContext:
+    """Sample parameters for the registry: an agent, their location and the latest day with data."""
+
+    def __init__(self):
+        profile = AgentProfile.objects.select_related('user', 'location').order_by('id').first()
+        if profile is None or profile.location is None:
+            raise LookupError('No agent with a location found.')
+        self.agent = profile.user
+        self.location = profile.location
+        latest = DailyAgentData.objects.order_by('-date').values_list('date', flat=True).first()
+        self.date = latest or timezone.now().date()
+        self.dates = [self.date - timedelta(days=offset) for offset in range(7)]
+        self.location_ids = list(
+            AgentProfile.objects.exclude(location=None).values_list('location_id', flat=True)
+        )
+
+
+HOT_QUERIES = {
+    # Admin dashboard
+    'pending_cash_requests': lambda context: queries.pending_cash_requests(),
+    'limit_breaches_for_date': lambda context: (
+        LimitBreach.objects.filter(date=context.date).select_related('location')
+    ),
+    # Agent dashboard and location pages
+    'location_daily_data': lambda context: (
+        DailyAgentData.objects.filter(location=context.location, date=context.date)
+    ),
+    'location_recent_eod_reports': lambda context: (
+        EODReport.objects.filter(location=context.location).order_by('-processing_date')[:5]
+    ),
+    'location_cash_requests': lambda context: (
+        CashRequest.objects.filter(location=context.location).order_by('-request_date')[:10]
+    ),
+    'location_latest_remote_services': lambda context: queries.latest_remote_services(context.location)[:1],
+    'location_remote_services': lambda context: queries.location_remote_services(context.location, context.date),
+    'emergency_access_state': lambda context: (
+        EmergencyAccessRequest.objects.filter(
+            Q(status='pending') | Q(status='approved', access_granted_until__gt=timezone.now()),
+            agent=context.agent,
+        ).values_list('status', 'access_granted_until')
+    ),
+    'pending_emergency_requests': lambda context: queries.pending_emergency_requests(),
+    # Keyset-paginated listings, as run for a page after the first (bounded on the leading field)
+    'eod_report_listing': lambda context: (
+        EODReport.objects.select_related('agent', 'location')
+        .filter(processing_date__lte=context.date)
+        .order_by('-processing_date', '-id')[:21]
+    ),
+    'remote_services_listing': lambda context: (
+        RemoteServicesData.objects.select_related('location')
+        .filter(statement_date__lte=context.date)
+        .order_by('-statement_date', 'location__name', 'currency', 'id')[:51]
+    ),
+    # Daily position recompute and payout averages
+    'eft_balances': lambda context: (
+        EFTData.objects.filter(location_id__in=context.location_ids, statement_date__in=context.dates)
+        .values_list('location_id', 'statement_date', 'balance_bf')
+    ),
+    'remote_services_payouts': lambda context: (
+        RemoteServicesData.objects.filter(
+            location_id__in=context.location_ids, currency='JMD', statement_date__in=context.dates,
+        ).values('location_id', 'statement_date').annotate(total=Sum('pay_principal'))
+    ),
+    'payout_forecasts': lambda context: (
+        PayoutForecast.objects.filter(location_id__in=context.location_ids, forecast_date__in=context.dates)
+        .values_list('location_id', 'forecast_date', 'amount')
+    ),
+    # Cash analytics charts
+    'network_cash_rollups': lambda context: (
+        CashRollup.objects.filter(
+            key='network', grain='day', period_start__range=(context.date - timedelta(days=29), context.date)
+        ).order_by('period_start')
+    ),
+    'parish_cash_composition': lambda context: (
+        CashRollup.objects.filter(grain='day', period_start=context.date, scope__in=['parish', 'network'])
+    ),
+    # Cash ledger
+    'ledger_current_position': lambda context: (
+        CashPosition.objects.filter(location=context.location)
+    ),
+    'ledger_position_as_of': lambda context: (
+        CashLedgerEntry.objects.filter(location=context.location, recorded_at__lte=timezone.now())
+        .order_by('-recorded_at', '-id')[:1]
+    ),
+    # Admin dashboard live updates
+    'live_events_after': lambda context: (
+        LiveEvent.objects.filter(id__gt=0).order_by('id')[:200]
+    ),
+    # Notifications (dashboards, then the dispatcher's email pass)
+    'recent_notifications': lambda context: (
+        Notification.objects.filter(user=context.agent)[:5]
+    ),
+    'pending_notification_emails': lambda context: (
+        Notification.objects.filter(email_status='pending').order_by('id')[:200]
+    ),
+    # Import worker
+    'queued_import_jobs': lambda context: (
+        ImportJob.objects.filter(status='queued').order_by('created_at')[:1]
+    ),
+}
+
+# Scans that are expected: tables that stay small enough for the planner to prefer reading them whole
+ALLOWED_SCANS = {'core_location', 'core_agentprofile'}
+
+
+def _partial_indexes():
+    return {
+        index.name
+        for model in apps.get_app_config('core').get_models()
+        for index in model._meta.indexes
+        if index.condition is not None
+    }
+
+
+def sequential_scans(plan, vendor=None):
+    """
+    Tables read with a full scan in an EXPLAIN plan, minus ALLOWED_SCANS.
+    Walking a partial index only reads the rows it covers, so it does not count.
+    """
+    pattern = SCAN_PATTERNS.get(vendor or connection.vendor)
+    if pattern is None:
+        return []
+    partial = _partial_indexes()
+    return sorted({
+        table for table, index in pattern.findall(plan)
+        if table not in ALLOWED_SCANS and index not in partial
+    })
+
+
+def explain(names=None, context=None):
+    """
+    EXPLAIN each registered query (or the named ones). Returns
+    {name: {'plan': plan text, 'scans': [table, ...]}}.
+    """
+    context = context or HotQueryContext()
+    results = {}
+    for name in names or HOT_QUERIES:
+        plan = HOT_QUERIES[name](context).explain()
+        results[name] = {'plan': plan, 'scans': sequential_scans(plan)}
+    return results
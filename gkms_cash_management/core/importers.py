@@ -0,0 +1,351 @@
+"""
+Bulk import engines for statement uploads (EFT, Remote Services).
+
+Each engine resolves locations through an in-memory name index built from
+LocationAlias with a single query and writes all rows of a sheet in one
+transaction, instead of issuing a lookup and an update_or_create per
+spreadsheet row.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import EFTData, LocationAlias, RemoteServicesData, normalize_location_name
+from .payouts import refresh_payout_averages
+from .spreadsheets import Column, SheetSchema, RowError, to_date, to_decimal, to_int
+
+logger = logging.getLogger(__name__)
+
+# EFT sheet columns after "Location" and "Date", in sheet order
+EFT_VALUE_FIELDS = [
+    'balance_bf', 'inbound', 'intra_sent', 'outbound', 'loan', 'received_from_gk',
+    'adjusted', 'bx', 'sc', 'fx', 'due_to_gk', 'due_from_gk',
+]
+
+EFT_SCHEMA = SheetSchema([
+    Column("Location", 'location_name', required=True),
+    Column("Date", 'statement_date', to_date, required=True),
+    Column("Balance B/F", 'balance_bf', to_decimal),
+    Column("Inbound", 'inbound', to_decimal),
+    Column("Intra-Sent", 'intra_sent', to_decimal),
+    Column("Outbound", 'outbound', to_decimal),
+    Column("Loan", 'loan', to_decimal),
+    Column("Rec'd Fr. GK", 'received_from_gk', to_decimal),
+    Column("Adjusted", 'adjusted', to_decimal),
+    Column("BX", 'bx', to_decimal),
+    Column("SC", 'sc', to_decimal),
+    Column("FX", 'fx', to_decimal),
+    Column("Due To GK", 'due_to_gk', to_decimal),
+    Column("Due From GK", 'due_from_gk', to_decimal),
+])
+
+# Headers are in row 3, data starts in row 4
+REMOTE_SERVICES_SCHEMA = SheetSchema([
+    Column("LOC NAME", 'location_name', required=True),
+    Column("PARISH NAME", 'parish_name'),
+    Column("PARISH ID", 'parish_id', to_int),
+    Column("Currency", 'currency'),
+    Column("Pay Principal", 'pay_principal', to_decimal),
+    Column("Send Principal", 'send_principal', to_decimal),
+    Column("Total Princial", 'total_principal', to_decimal),  # "Princial" typo matches the export
+    Column(None),  # Column H is blank
+    Column("PayCount", 'pay_count', to_int, default=0),
+    Column("SendCount", 'send_count', to_int, default=0),
+    Column("Total Num Trans", 'total_num_trans', to_int, default=0),
+], header_row=3, key_columns=7)
+
+REMOTE_SERVICES_VALUE_FIELDS = [
+    'parish_name', 'parish_id', 'currency', 'pay_principal', 'send_principal',
+    'total_principal', 'pay_count', 'send_count', 'total_num_trans',
+]
+
+BULK_BATCH_SIZE = 500
+
+
+def trigrams(name):
+    """Character trigrams of each word, padded like pg_trgm ("  w", " wo", ..., "rd ")."""
+    grams = set()
+    for word in ''.join(ch if ch.isalnum() else ' ' for ch in name).split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a, b):
+    """Jaccard similarity of two trigram sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class LocationNameIndex:
+    """
+    Normalized name -> location id map for one LocationAlias source (e.g.
+    'eft'), loaded with a single query. Names that do not match get
+    suggestions ranked by trigram similarity against every alias of every
+    location.
+    """
+
+    SUGGESTION_THRESHOLD = 0.3
+    MAX_SUGGESTIONS = 3
+
+    def __init__(self, source):
+        self.source = source
+        self._ids = {}
+        self._ambiguous = set()
+        for location_id, key in LocationAlias.objects.filter(source=source).values_list('location_id', 'normalized_name'):
+            if key in self._ids and self._ids[key] != location_id:
+                self._ambiguous.add(key)
+            self._ids[key] = location_id
+        self._candidates = None
+        self._suggestions = {}
+
+    normalize = staticmethod(normalize_location_name)
+
+    def resolve(self, name):
+        """Return the location id for name, or raise RowError if it is unknown or ambiguous."""
+        key = self.normalize(name)
+        if key in self._ambiguous:
+            raise RowError(f"Multiple locations found with name '{name}'. Please ensure names are unique.")
+        try:
+            return self._ids[key]
+        except KeyError:
+            message = f"Location with name '{name}' not found."
+            suggestions = self.suggest(name)
+            if suggestions:
+                message += f" Did you mean: {', '.join(suggestions)}?"
+            raise RowError(message)
+
+    def suggest(self, name):
+        """Names of the locations whose aliases are most similar to name, best first."""
+        key = self.normalize(name)
+        if key not in self._suggestions:
+            if self._candidates is None:
+                # Trigram sets for every alias, built once per import on the first miss
+                self._candidates = [
+                    (location_name, trigrams(alias))
+                    for location_name, alias in LocationAlias.objects.values_list('location__name', 'normalized_name')
+                ]
+            target = trigrams(key)
+            best = {}
+            for location_name, grams in self._candidates:
+                score = similarity(target, grams)
+                if score >= self.SUGGESTION_THRESHOLD and score > best.get(location_name, 0):
+                    best[location_name] = score
+            ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+            self._suggestions[key] = [location_name for location_name, _ in ranked[:self.MAX_SUGGESTIONS]]
+        return self._suggestions[key]
+
+
+class ImportResult:
+    """Per-row outcome of an import run."""
+
+    CREATED = 'created'
+    UPDATED = 'updated'
+    UNCHANGED = 'unchanged'
+    SKIPPED = 'skipped'
+
+    def __init__(self):
+        self.rows = []
+        # Statement dates written by the import, for downstream recomputation
+        self.statement_dates = set()
+        # Stored rows the upload no longer has
+        self.deleted = 0
+
+    def add(self, row_number, status, message='', location_id=None):
+        self.rows.append({
+            'row': row_number,
+            'status': status,
+            'message': message,
+            'location_id': location_id,
+        })
+
+    def count(self, status):
+        return sum(1 for row in self.rows if row['status'] == status)
+
+    @property
+    def created(self):
+        return self.count(self.CREATED)
+
+    @property
+    def updated(self):
+        return self.count(self.UPDATED)
+
+    @property
+    def unchanged(self):
+        return self.count(self.UNCHANGED)
+
+    @property
+    def skipped(self):
+        return self.count(self.SKIPPED)
+
+    @property
+    def skipped_rows(self):
+        return [row for row in self.rows if row['status'] == self.SKIPPED]
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def import_eft_rows(rows):
+    """
+    Upsert EFT statement rows.
+
+    ``rows`` is an iterable of ``(row_number, values)`` as yielded by
+    spreadsheets.read_rows with EFT_SCHEMA; values is a RowError for rows that
+    failed parsing. Locations are resolved through one name-index query, existing entries are
+    detected with one query, and all rows are written with a single
+    bulk_create(update_conflicts=True) on (location, statement_date).
+    """
+    result = ImportResult()
+    index = LocationNameIndex('eft')
+
+    # (location_id, statement_date) -> (row_number, EFTData); later rows win
+    pending = {}
+    for row_number, values in rows:
+        if isinstance(values, RowError):
+            result.add(row_number, ImportResult.SKIPPED, str(values))
+            continue
+        try:
+            location_id = index.resolve(values['location_name'])
+        except RowError as e:
+            result.add(row_number, ImportResult.SKIPPED, str(e))
+            continue
+
+        key = (location_id, values['statement_date'])
+        if key in pending:
+            earlier_row, _ = pending[key]
+            result.add(earlier_row, ImportResult.SKIPPED,
+                       f"Superseded by row {row_number} for the same location and date.", location_id)
+        pending[key] = (row_number, EFTData(
+            location_id=location_id,
+            statement_date=values['statement_date'],
+            **{field: values[field] for field in EFT_VALUE_FIELDS}
+        ))
+
+    if not pending:
+        return result
+
+    location_ids = {location_id for location_id, _ in pending}
+    statement_dates = {statement_date for _, statement_date in pending}
+    existing = set(
+        EFTData.objects.filter(
+            location_id__in=location_ids, statement_date__in=statement_dates
+        ).values_list('location_id', 'statement_date')
+    )
+
+    with transaction.atomic():
+        EFTData.objects.bulk_create(
+            [entry for _, entry in pending.values()],
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['location', 'statement_date'],
+            update_fields=EFT_VALUE_FIELDS,
+        )
+        refresh_payout_averages(location_ids, statement_dates)
+    result.statement_dates = statement_dates
+
+    for key, (row_number, entry) in pending.items():
+        status = ImportResult.UPDATED if key in existing else ImportResult.CREATED
+        result.add(row_number, status, location_id=entry.location_id)
+    result.rows.sort(key=lambda row: row['row'])
+
+    logger.info("EFT import: %s created, %s updated, %s skipped",
+                result.created, result.updated, result.skipped)
+    return result
+
+
+def import_remote_services_rows(rows, statement_date):
+    """
+    Upsert Remote Services rows for one statement date.
+
+    ``rows`` is an iterable of ``(row_number, values)`` as yielded by
+    spreadsheets.read_rows with REMOTE_SERVICES_SCHEMA. Rows are matched on
+    the natural key (location, statement_date, currency, parish_id): new keys
+    are bulk-created, changed rows are bulk-updated and identical rows are left
+    alone, so importing the same sheet twice writes nothing. Rows stored for
+    the date of a location in the upload that the upload no longer has are
+    deleted. Each entry also records the total Pay Principal of its location
+    across the whole upload.
+    """
+    result = ImportResult()
+    index = LocationNameIndex('remote_services')
+
+    # (location_id, currency, parish_id) -> (row_number, values); later rows win
+    pending = {}
+    for row_number, values in rows:
+        if isinstance(values, RowError):
+            result.add(row_number, ImportResult.SKIPPED, str(values))
+            continue
+        try:
+            location_id = index.resolve(values['location_name'])
+        except RowError as e:
+            result.add(row_number, ImportResult.SKIPPED, str(e))
+            continue
+
+        key = (location_id, values['currency'], values['parish_id'])
+        if key in pending:
+            earlier_row, _ = pending[key]
+            result.add(earlier_row, ImportResult.SKIPPED,
+                       f"Superseded by row {row_number} for the same location, currency and parish.", location_id)
+        pending[key] = (row_number, values)
+
+    if not pending:
+        return result
+
+    location_total_payouts = {}
+    for (location_id, _, _), (_, values) in pending.items():
+        location_total_payouts[location_id] = (
+            location_total_payouts.get(location_id, Decimal('0.00')) + values['pay_principal']
+        )
+
+    fields = REMOTE_SERVICES_VALUE_FIELDS + ['total_payout_for_location_in_upload']
+    existing = {}
+    stale = []
+    for entry in RemoteServicesData.objects.filter(
+        statement_date=statement_date, location_id__in=location_total_payouts.keys()
+    ).only('id', 'location_id', *fields).order_by('id'):
+        key = (entry.location_id, entry.currency, entry.parish_id)
+        if key not in pending:
+            stale.append(entry)
+        else:
+            if key in existing:
+                # Duplicated before the natural key covered a missing parish: keep the latest
+                stale.append(existing[key])
+            existing[key] = entry
+
+    to_create = []
+    to_update = []
+    for key, (row_number, values) in pending.items():
+        location_id = key[0]
+        new_values = {field: values[field] for field in REMOTE_SERVICES_VALUE_FIELDS}
+        new_values['total_payout_for_location_in_upload'] = location_total_payouts[location_id]
+
+        entry = existing.get(key)
+        if entry is None:
+            to_create.append(RemoteServicesData(location_id=location_id, statement_date=statement_date, **new_values))
+            result.add(row_number, ImportResult.CREATED, location_id=location_id)
+        elif any(getattr(entry, field) != value for field, value in new_values.items()):
+            for field, value in new_values.items():
+                setattr(entry, field, value)
+            to_update.append(entry)
+            result.add(row_number, ImportResult.UPDATED, location_id=location_id)
+        else:
+            result.add(row_number, ImportResult.UNCHANGED, location_id=location_id)
+
+    if to_create or to_update or stale:
+        with transaction.atomic():
+            RemoteServicesData.objects.filter(id__in=[entry.id for entry in stale]).delete()
+            RemoteServicesData.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+            RemoteServicesData.objects.bulk_update(to_update, fields, batch_size=BULK_BATCH_SIZE)
+            refresh_payout_averages(
+                {entry.location_id for entry in to_create + to_update + stale}, [statement_date]
+            )
+        result.deleted = len(stale)
+        result.statement_dates = {statement_date}
+    result.rows.sort(key=lambda row: row['row'])
+
+    logger.info("Remote Services import for %s: %s created, %s updated, %s unchanged, %s skipped, %s deleted",
+                statement_date, result.created, result.updated, result.unchanged, result.skipped, result.deleted)
+    return result
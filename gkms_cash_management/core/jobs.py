@@ -0,0 +1,175 @@
+"""
+Database-backed queue for statement imports.
+
+Upload views store the file in an ImportJob row and return straight away;
+the ``run_import_worker`` management command claims queued jobs and runs
+them through the import engines, writing progress back to the job row so the
+browser can poll it.
+"""
+import hashlib
+import io
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .calculations import recompute_daily_positions
+from .forecasting import refresh_forecasts
+from .importers import EFT_SCHEMA, REMOTE_SERVICES_SCHEMA, import_eft_rows, import_remote_services_rows
+from .ledger import post_payouts
+from .models import ImportJob
+from .rollups import refresh_rollups
+from .spreadsheets import RowError, SheetError, check_upload_size, read_rows
+
+logger = logging.getLogger(__name__)
+
+# How often (in rows) the worker writes progress back to the job
+PROGRESS_EVERY = 250
+
+# Per-row errors stored on the job; the rest are only counted
+MAX_STORED_ERRORS = 500
+
+
+def enqueue_import(kind, uploaded_file, user=None, statement_date=None, force=False):
+    """
+    Store an uploaded statement as a queued ImportJob.
+
+    Returns ``(job, created)``. If the same file (by SHA-256 of its contents)
+    was already imported for the same kind and statement date by a job that
+    created or updated rows, that job is returned with created=False and
+    nothing new is queued, unless ``force`` is set (to import it again, e.g.
+    after the rows were edited or deleted).
+    """
+    check_upload_size(uploaded_file)
+    digest = hashlib.sha256()
+    chunks = []
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+        chunks.append(chunk)
+    content_sha256 = digest.hexdigest()
+
+    duplicate = None if force else (
+        ImportJob.objects.defer('payload')
+        .filter(kind=kind, content_sha256=content_sha256, statement_date=statement_date, status='completed')
+        .filter(Q(rows_created__gt=0) | Q(rows_updated__gt=0))
+        .order_by('-created_at')
+        .first()
+    )
+    if duplicate is not None:
+        logger.info("Upload matches import job #%s; not queueing it again", duplicate.pk)
+        return duplicate, False
+
+    job = ImportJob.objects.create(
+        kind=kind,
+        payload=b''.join(chunks),
+        content_sha256=content_sha256,
+        original_filename=getattr(uploaded_file, 'name', '') or '',
+        statement_date=statement_date,
+        created_by=user,
+    )
+    return job, True
+
+
+def claim_next_job():
+    """
+    Mark the oldest queued job as running and return it, or None if the queue
+    is empty. Rows locked by another worker are skipped.
+    """
+    with transaction.atomic():
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(status='queued')
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def fail_stale_jobs(older_than=timedelta(hours=1)):
+    """Fail jobs left 'running' by a worker that died mid-import."""
+    return ImportJob.objects.filter(
+        status='running', started_at__lt=timezone.now() - older_than
+    ).update(
+        status='failed',
+        finished_at=timezone.now(),
+        error_message="The import worker stopped before this job finished. Please upload the file again.",
+    )
+
+
+def _tracked(job, rows):
+    """Pass rows through, periodically saving rows processed/skipped to the job."""
+    processed = skipped = 0
+    for row_number, values in rows:
+        processed += 1
+        if isinstance(values, RowError):
+            skipped += 1
+        if processed % PROGRESS_EVERY == 0:
+            ImportJob.objects.filter(pk=job.pk).update(rows_processed=processed, rows_skipped=skipped)
+        yield row_number, values
+    job.rows_processed = processed
+
+
+def run_job(job):
+    """Run a claimed job through its import engine and record the outcome."""
+    rows = read_rows(io.BytesIO(bytes(job.payload)), EFT_SCHEMA if job.kind == 'eft' else REMOTE_SERVICES_SCHEMA)
+    try:
+        if job.kind == 'eft':
+            result = import_eft_rows(_tracked(job, rows))
+        elif job.kind == 'remote_services':
+            result = import_remote_services_rows(_tracked(job, rows), job.statement_date)
+        else:
+            raise SheetError(f"Unknown import type '{job.kind}'.")
+    except SheetError as e:
+        _finish(job, 'failed', error_message=str(e))
+        return job
+    except Exception as e:
+        logger.error(f"Import job #{job.pk} failed: {str(e)}", exc_info=True)
+        _finish(job, 'failed', error_message=f"An unexpected error occurred: {str(e)}")
+        return job
+
+    _finish(job, 'completed', result=result)
+    _recompute_positions(job, result)
+    return job
+
+
+def _recompute_positions(job, result):
+    """Bring payout forecasts, DailyAgentData, the cash rollups and the ledger's payouts up to date with the statement dates the job wrote."""
+    if not result.statement_dates:
+        return
+    dates = result.statement_dates | {timezone.localdate()}
+    try:
+        refresh_forecasts()
+        recompute_daily_positions(dates)
+        refresh_rollups(dates)
+        post_payouts(result.statement_dates)
+    except Exception as e:
+        # The import itself succeeded; positions are recomputed again on the next import or run
+        logger.error(f"Recomputing daily positions after import job #{job.pk} failed: {str(e)}", exc_info=True)
+
+
+def _finish(job, status, result=None, error_message=''):
+    job.status = status
+    job.finished_at = timezone.now()
+    job.error_message = error_message
+    fields = ['status', 'finished_at', 'error_message', 'rows_processed']
+    if result is not None:
+        job.rows_processed = len(result)
+        job.rows_created = result.created
+        job.rows_updated = result.updated
+        job.rows_skipped = result.skipped
+        job.errors = [
+            {'row': row['row'], 'message': row['message']}
+            for row in result.skipped_rows[:MAX_STORED_ERRORS]
+        ]
+        # The workbook is no longer needed once it has been imported
+        job.payload = b''
+        fields += ['rows_created', 'rows_updated', 'rows_skipped', 'errors', 'payload']
+    job.save(update_fields=fields)
+    logger.info("Import job #%s %s", job.pk, status)
@@ -0,0 +1,366 @@
+"""
+Append-only cash ledger.
+
+Every cash movement at a location is a CashLedgerEntry: verified
+deliveries, payouts (from the imported statements), courier pickups,
+adjustments and EOD counts. Each entry carries a reference to the record
+it posts, and posting a record appends only the difference between what
+its entries should add up to now and what they already add up to. Edits,
+re-imports, unverified deliveries and deletions therefore post
+corrections; no entry is ever updated or removed.
+
+Appending locks the locations' CashPosition rows, so entries for one
+location are serialized: each records the running balance after it, and
+CashPosition keeps the current balance. current_position and
+position_as_of are single indexed reads.
+
+An EOD report's count is the reference point for a location's cash: its
+close entry brings the balance to the reported closing balance. Movements
+dated on or before the latest count (payouts imported the morning after,
+an adjustment added later) are already in the count, so each gets a
+reconciling close entry alongside it and leaves the balance unchanged. A
+count older than the location's latest is recorded without moving the
+balance.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Adjustment, CashLedgerCheckpoint, CashLedgerEntry, CashPosition, EODReport, Location
+from .payouts import daily_payouts
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+
+# Adjustment type -> sign of its effect on the cash held (denomination changes net to nothing)
+ADJUSTMENT_SIGNS = {'overage': 1, 'shortage': -1}
+
+
+def _amount(value):
+    # Unsaved instances can still hold a float default or a string
+    return Decimal(str(value or 0))
+
+
+class Movement:
+    """What the entries of one type against one reference should add up to."""
+
+    def __init__(self, location_id, entry_type, business_date, reference, target):
+        self.location_id = location_id
+        self.entry_type = entry_type
+        self.business_date = business_date
+        self.reference = reference
+        self.target = target
+
+
+def delivery_reference(delivery_id):
+    return f'delivery:{delivery_id}'
+
+
+def payout_reference(location_id, day):
+    return f'payout:{location_id}:{day.isoformat()}'
+
+
+def report_reference(report_id):
+    return f'eod:{report_id}'
+
+
+def _posted_totals(references):
+    """{(reference, entry type): total} of the entries already posted against ``references``."""
+    return {
+        (row['reference'], row['entry_type']): row['total']
+        for row in CashLedgerEntry.objects.filter(reference__in=set(references))
+        .values('reference', 'entry_type').annotate(total=Sum('amount'))
+    }
+
+
+class _Batch:
+    """Entries appended in one transaction, with the locked positions of their locations."""
+
+    def __init__(self, location_ids):
+        location_ids = sorted(set(location_ids))
+        positions = CashPosition.objects.select_for_update().filter(location_id__in=location_ids).order_by('location_id')
+        self.positions = {position.location_id: position for position in positions}
+        missing = [location_id for location_id in location_ids if location_id not in self.positions]
+        if missing:
+            CashPosition.objects.bulk_create(
+                [CashPosition(location_id=location_id) for location_id in missing], ignore_conflicts=True,
+            )
+            self.positions = {position.location_id: position for position in positions.all()}
+        # Keep recorded_at in step with the chain even if the clock has stepped back
+        self.now = max([timezone.now()] + [position.updated_at for position in self.positions.values()])
+        self.entries = []
+        self.changed = set()
+
+    def append(self, location_id, entry_type, business_date, reference, amount):
+        position = self.positions[location_id]
+        position.balance += amount
+        self.entries.append(CashLedgerEntry(
+            location_id=location_id,
+            entry_type=entry_type,
+            reference=reference,
+            business_date=business_date,
+            amount=amount,
+            balance_after=position.balance,
+            recorded_at=self.now,
+        ))
+        self.changed.add(location_id)
+
+    def post(self, movements, posted):
+        for movement in movements:
+            key = (movement.reference, movement.entry_type)
+            delta = movement.target - posted.get(key, ZERO)
+            if not delta:
+                continue
+            posted[key] = movement.target
+            self.append(movement.location_id, movement.entry_type, movement.business_date, movement.reference, delta)
+            closed_through = self.positions[movement.location_id].closed_through
+            if closed_through and movement.business_date <= closed_through:
+                # Already in the latest count
+                self.append(movement.location_id, 'eod_close', closed_through, movement.reference, -delta)
+
+    def save(self):
+        """Insert the entries and update the positions they moved."""
+        CashLedgerEntry.objects.bulk_create(self.entries, batch_size=500)
+        for entry in self.entries:
+            self.positions[entry.location_id].last_entry = entry
+        positions = [self.positions[location_id] for location_id in self.changed]
+        for position in positions:
+            position.updated_at = self.now
+        CashPosition.objects.bulk_update(positions, ['balance', 'last_entry', 'closed_through', 'updated_at'])
+
+
+def post(movements):
+    """
+    Append the entries that bring each movement's reference to its target.
+    Returns the number of entries appended.
+    """
+    movements = list(movements)
+    if not movements:
+        return 0
+    with transaction.atomic(savepoint=False):
+        posted = _posted_totals(movement.reference for movement in movements)
+        movements = [
+            movement for movement in movements
+            if movement.target != posted.get((movement.reference, movement.entry_type), ZERO)
+        ]
+        if not movements:
+            return 0
+        batch = _Batch(movement.location_id for movement in movements)
+        # Re-read under the locks: another posting may have got there first
+        batch.post(movements, _posted_totals(movement.reference for movement in movements))
+        appended = len(batch.entries)
+        batch.save()
+    return appended
+
+
+def post_deliveries(deliveries, deleted=False):
+    """Post the deliveries' JMD amounts once verified, and reverse them if unverified or ``deleted``."""
+    return post(
+        Movement(
+            delivery.location_id, 'delivery', delivery.date, delivery_reference(delivery.pk),
+            _amount(delivery.jmd_amount) if delivery.verified and not deleted else ZERO,
+        )
+        for delivery in deliveries
+        if delivery.location_id is not None
+    )
+
+
+def post_payouts(dates, location_ids=None):
+    """Post the JMD payouts of the given statement dates (see core.payouts.daily_payouts)."""
+    dates = set(dates)
+    if not dates:
+        return 0
+    if location_ids is None:
+        location_ids = list(Location.objects.values_list('id', flat=True))
+    movements = {}
+    for location_id, by_date in daily_payouts(location_ids, min(dates), max(dates), currency='JMD').items():
+        for day, payout in by_date.items():
+            if day in dates:
+                reference = payout_reference(location_id, day)
+                movements[reference] = Movement(location_id, 'payout', day, reference, -payout)
+    # Payouts posted before that a re-imported statement no longer has
+    for location_id, day, reference in CashLedgerEntry.objects.filter(
+        entry_type='payout', business_date__in=dates, location_id__in=location_ids,
+    ).values_list('location_id', 'business_date', 'reference').distinct():
+        movements.setdefault(reference, Movement(location_id, 'payout', day, reference, ZERO))
+    return post(movements.values())
+
+
+def post_adjustment(adjustment, deleted=False):
+    """Post a JMD overage or shortage recorded on an EOD report."""
+    report = EODReport.objects.filter(pk=adjustment.eod_report_id).values_list('location_id', 'processing_date').first()
+    if report is None:
+        # Deleted along with its report, which reverses it (see sync_eod_reports)
+        return 0
+    return post(_adjustment_movements(adjustment.eod_report_id, *report, [] if deleted else [adjustment]))
+
+
+def _adjustment_movements(report_id, location_id, processing_date, adjustments):
+    return [
+        Movement(
+            location_id, 'adjustment', processing_date, f'{report_reference(report_id)}:adjustment:{adjustment.pk}',
+            _amount(adjustment.amount) * ADJUSTMENT_SIGNS.get(adjustment.type, 0) if adjustment.currency == 'JMD' else ZERO,
+        )
+        for adjustment in adjustments
+    ]
+
+
+def _dated_totals(location_ids, since):
+    """{(location_id, business_date, reference, entry type): total} of the locations' entries dated ``since`` or later."""
+    return {
+        (row['location_id'], row['business_date'], row['reference'], row['entry_type']): row['total']
+        for row in CashLedgerEntry.objects.filter(location_id__in=set(location_ids), business_date__gte=since)
+        .values('location_id', 'business_date', 'reference', 'entry_type').annotate(total=Sum('amount'))
+    }
+
+
+def _report_movements(reports, deleted, posted):
+    """Courier pickups and adjustments of the reports, and zero targets for posted entries whose source has gone."""
+    adjustments = defaultdict(list)
+    if not deleted:
+        for adjustment in Adjustment.objects.filter(eod_report__in=[report.pk for report in reports]):
+            adjustments[adjustment.eod_report_id].append(adjustment)
+
+    movements = {}
+    for report in reports:
+        courier = _amount(report.courier_jmd_amount) if report.cash_sent_to_courier and not deleted else ZERO
+        reference = f'{report_reference(report.pk)}:courier'
+        movements[reference] = Movement(report.location_id, 'courier_pickup', report.processing_date, reference, -courier)
+        for movement in _adjustment_movements(report.pk, report.location_id, report.processing_date, adjustments[report.pk]):
+            movements[movement.reference] = movement
+
+    prefixes = {f'{report_reference(report.pk)}:': report for report in reports}
+    for reference, entry_type in posted:
+        report = prefixes.get(':'.join(reference.split(':')[:2]) + ':')
+        if report is not None and entry_type != 'eod_close' and reference not in movements:
+            movements[reference] = Movement(report.location_id, entry_type, report.processing_date, reference, ZERO)
+    return list(movements.values())
+
+
+def sync_eod_reports(reports, deleted=False):
+    """
+    Post the courier pickups, adjustments and counts of EOD reports (all
+    reversed, except the count, if the reports were ``deleted``). Returns
+    the number of entries appended.
+    """
+    reports = sorted(reports, key=lambda report: (report.processing_date, report.pk))
+    if not reports:
+        return 0
+    location_ids = {report.location_id for report in reports}
+    since = reports[0].processing_date
+    if deleted:
+        posted = {(reference, entry_type) for _, _, reference, entry_type in _dated_totals(location_ids, since)}
+        return post(_report_movements(reports, deleted, posted))
+
+    with transaction.atomic(savepoint=False):
+        batch = _Batch(location_ids)
+        # One read under the locks gives both what each report has posted and what is dated after it
+        dated = _dated_totals(location_ids, since)
+        posted = defaultdict(Decimal)
+        for (_, _, reference, entry_type), total in dated.items():
+            posted[(reference, entry_type)] += total
+        posted = dict(posted)
+        batch.post(_report_movements(reports, deleted, posted), posted)
+
+        # Movements dated after a count are not in it
+        by_day = defaultdict(lambda: defaultdict(Decimal))
+        for (location_id, day, _, _), total in dated.items():
+            by_day[location_id][day] += total
+        for entry in batch.entries:
+            by_day[entry.location_id][entry.business_date] += entry.amount
+
+        for report in reports:
+            position = batch.positions[report.location_id]
+            reference = report_reference(report.pk)
+            if position.closed_through and report.processing_date < position.closed_through:
+                # Superseded by a later count
+                amount = ZERO
+            else:
+                after = sum((total for day, total in by_day[report.location_id].items() if day > report.processing_date), ZERO)
+                amount = _amount(report.closing_balance) - (position.balance - after)
+                position.closed_through = report.processing_date
+            if amount or (reference, 'eod_close') not in posted:
+                batch.append(report.location_id, 'eod_close', report.processing_date, reference, amount)
+                posted[(reference, 'eod_close')] = amount
+        appended = len(batch.entries)
+        batch.save()
+    return appended
+
+
+def current_position(location_id):
+    """The location's ledger balance (zero before its first entry)."""
+    balance = CashPosition.objects.filter(location_id=location_id).values_list('balance', flat=True).first()
+    return balance if balance is not None else ZERO
+
+
+def position_as_of(location_id, moment):
+    """The location's ledger balance at ``moment``: the balance after its latest entry recorded by then."""
+    balance = (
+        CashLedgerEntry.objects.filter(location_id=location_id, recorded_at__lte=moment)
+        .order_by('-recorded_at', '-id')
+        .values_list('balance_after', flat=True)
+        .first()
+    )
+    return balance if balance is not None else ZERO
+
+
+def write_checkpoints(business_date):
+    """
+    Check each location's chain of entries since its previous checkpoint
+    (every amount carries the running balance on to the next ``balance_after``
+    and the chain ends at the CashPosition) and store the balance as the
+    checkpoint for ``business_date``. Returns (checkpoints written, ids of
+    the locations whose chain does not add up, which get no checkpoint).
+    """
+    positions = {position.location_id: position for position in CashPosition.objects.all()}
+    previous = {}
+    for checkpoint in CashLedgerCheckpoint.objects.filter(business_date__lt=business_date).order_by('business_date'):
+        previous[checkpoint.location_id] = checkpoint
+
+    running = {location_id: checkpoint.balance for location_id, checkpoint in previous.items()}
+    last_checked = {location_id: checkpoint.last_entry_id or 0 for location_id, checkpoint in previous.items()}
+    # Entries appended after the positions were read are left to the next checkpoint
+    through = {location_id: position.last_entry_id or 0 for location_id, position in positions.items()}
+    counts = defaultdict(int)
+    broken = set()
+    for location_id, entry_id, amount, balance_after in CashLedgerEntry.objects.filter(
+        id__gt=min((last_checked.get(location_id, 0) for location_id in positions), default=0),
+    ).order_by('location_id', 'id').values_list('location_id', 'id', 'amount', 'balance_after').iterator():
+        if not last_checked.get(location_id, 0) < entry_id <= through.get(location_id, 0) or location_id in broken:
+            continue
+        running[location_id] = running.get(location_id, ZERO) + amount
+        counts[location_id] += 1
+        last_checked[location_id] = entry_id
+        if running[location_id] != balance_after:
+            logger.error("Cash ledger entry #%s of location %s breaks the running balance", entry_id, location_id)
+            broken.add(location_id)
+
+    checkpoints = []
+    for location_id, position in positions.items():
+        if location_id in broken:
+            continue
+        if running.get(location_id, ZERO) != position.balance or (position.last_entry_id or 0) != last_checked.get(location_id, 0):
+            logger.error("Cash position of location %s does not match its ledger entries", location_id)
+            broken.add(location_id)
+            continue
+        checkpoints.append(CashLedgerCheckpoint(
+            location_id=location_id,
+            business_date=business_date,
+            balance=position.balance,
+            last_entry_id=position.last_entry_id,
+            entry_count=counts[location_id],
+        ))
+    CashLedgerCheckpoint.objects.bulk_create(
+        checkpoints,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['location', 'business_date'],
+        update_fields=['balance', 'last_entry', 'entry_count'],
+    )
+    logger.info("Wrote %s cash ledger checkpoints for %s (%s broken)", len(checkpoints), business_date, len(broken))
+    return len(checkpoints), sorted(broken)
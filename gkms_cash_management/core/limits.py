@@ -0,0 +1,151 @@
+"""
+Location limit checks for DailyAgentData.
+
+Limits are joined onto the daily rows and compared against the closing
+balance in SQL. The result is materialized in LimitBreach whenever
+DailyAgentData or LocationLimit changes (see the receivers in models.py),
+and the breaches for a date are cached until the next write, so the
+dashboard never recomputes them.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from .live import limit_breach_payload, publish
+from .models import DailyAgentData, LimitBreach
+
+logger = logging.getLogger(__name__)
+
+# (LimitBreach.limit_type, flag field, LocationLimit field)
+LIMIT_CHECKS = [
+    ('insurance', 'exceeds_insurance_limit', 'insurance_limit'),
+    ('eod_vault', 'exceeds_eod_limit', 'eod_vault_limit'),
+    ('working_day', 'exceeds_working_day_limit', 'working_day_limit'),
+]
+
+LIMIT_FLAGS = [flag for _, flag, _ in LIMIT_CHECKS]
+
+# Cached breaches for a date; deleted whenever that date's breaches are rewritten
+CACHE_KEY = 'limit_breaches:{date}'
+CACHE_TIMEOUT = 60 * 60
+
+
+def daily_data_with_limits(dates=None, location_ids=None):
+    """
+    DailyAgentData annotated with its location's name, each limit as ``limit_<field>`` and each
+    comparison with the closing balance as ``over_<field>``. ``dates`` and
+    ``location_ids`` narrow the rows; None means all.
+    """
+    annotations = {'location_name': F('location__name')}
+    for _, _, limit_field in LIMIT_CHECKS:
+        annotations[f'limit_{limit_field}'] = F(f'location__locationlimit__{limit_field}')
+        annotations[f'over_{limit_field}'] = ExpressionWrapper(
+            Q(closing_balance__gt=F(f'location__locationlimit__{limit_field}')),
+            output_field=BooleanField(),
+        )
+    queryset = DailyAgentData.objects.annotate(**annotations)
+    if dates is not None:
+        queryset = queryset.filter(date__in=dates)
+    if location_ids is not None:
+        queryset = queryset.filter(location_id__in=location_ids)
+    return queryset
+
+
+def sync_limit_breaches(dates=None, location_ids=None):
+    """
+    Recompute limit flags and LimitBreach rows for the given dates and
+    locations (None means all) and drop the cached breaches of every date
+    touched. Locations without a LocationLimit have no breaches.
+    """
+    breaches = []
+    changed = []
+    names = {}
+    touched_dates = set(dates or [])
+    for data in daily_data_with_limits(dates, location_ids):
+        touched_dates.add(data.date)
+        names[data.location_id] = data.location_name
+        dirty = False
+        for limit_type, flag, limit_field in LIMIT_CHECKS:
+            exceeded = bool(getattr(data, f'over_{limit_field}'))
+            if getattr(data, flag) != exceeded:
+                setattr(data, flag, exceeded)
+                dirty = True
+            if exceeded:
+                breaches.append(LimitBreach(
+                    location_id=data.location_id,
+                    date=data.date,
+                    limit_type=limit_type,
+                    amount=data.closing_balance,
+                    limit=getattr(data, f'limit_{limit_field}'),
+                ))
+        if dirty:
+            changed.append(data)
+
+    stale = LimitBreach.objects.all()
+    if dates is not None:
+        stale = stale.filter(date__in=dates)
+    if location_ids is not None:
+        stale = stale.filter(location_id__in=location_ids)
+    current = {(breach.location_id, breach.date, breach.limit_type) for breach in breaches}
+    existing = {tuple(key): breach_id for breach_id, *key in stale.values_list('id', 'location_id', 'date', 'limit_type')}
+    stale_ids = [breach_id for key, breach_id in existing.items() if key not in current]
+
+    with transaction.atomic():
+        DailyAgentData.objects.bulk_update(changed, LIMIT_FLAGS, batch_size=500)
+        LimitBreach.objects.filter(id__in=stale_ids).delete()
+        LimitBreach.objects.bulk_create(
+            breaches,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['location', 'date', 'limit_type'],
+            update_fields=['amount', 'limit', 'updated_at'],
+        )
+    cache.delete_many([CACHE_KEY.format(date=date) for date in touched_dates])
+    _publish_changes(current - set(existing), set(existing) - current, names)
+
+    logger.info("Synced %s limit breaches (%s removed, %s flag updates)",
+                len(breaches), len(stale_ids), len(changed))
+    return len(breaches)
+
+
+def _publish_changes(found, cleared, names):
+    """Push today's breaches found and cleared to the admin dashboards (which show today's only)."""
+    today = timezone.now().date()
+    changes = sorted(key for key in found | cleared if key[1] == today)
+    if not changes:
+        return
+    labels = dict(LimitBreach.LIMIT_TYPE_CHOICES)
+    publish('limit_breach', *[
+        limit_breach_payload(
+            location_id, names.get(location_id, ''), date, limit_type, labels[limit_type],
+            cleared=(location_id, date, limit_type) in cleared,
+        )
+        for location_id, date, limit_type in changes
+    ])
+
+
+def get_limit_breaches(date):
+    """
+    The date's limit breaches as dicts of location, type, amount, limit and
+    the exceeded flag, served from the cache when possible.
+    """
+    key = CACHE_KEY.format(date=date)
+    warnings = cache.get(key)
+    if warnings is None:
+        flags = {limit_type: flag for limit_type, flag, _ in LIMIT_CHECKS}
+        warnings = [
+            {
+                'location': breach.location,
+                'limit_type': breach.limit_type,
+                'type': breach.get_limit_type_display(),
+                'amount': breach.amount,
+                'limit': breach.limit,
+                flags[breach.limit_type]: True,
+            }
+            for breach in LimitBreach.objects.filter(date=date).select_related('location')
+        ]
+        cache.set(key, warnings, CACHE_TIMEOUT)
+    return warnings
@@ -0,0 +1,206 @@
+"""
+Live updates for the admin dashboard.
+
+Changes admins watch for (cash requests raised or decided, EOD reports
+submitted, limit breaches found or cleared, emergency access requests) are
+published as small LiveEvent rows once their transaction commits. Requests,
+the import worker and management commands run in separate processes, so the
+table is what they share.
+
+Each ASGI server process runs one Broadcaster while anyone is connected:
+it reads the new rows every POLL_INTERVAL seconds and hands the batch to
+every connected dashboard, so ten admins watching cost one indexed query
+per interval between them. admin_live_events streams the batches as
+Server-Sent Events; a browser that reconnects sends the last id it saw and
+is sent what it missed first.
+"""
+import asyncio
+import json
+import logging
+import weakref
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import LiveEvent
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 2.0
+# Comment lines sent on a quiet stream keep proxies from closing it
+KEEPALIVE_INTERVAL = 20.0
+# Browsers wait this long (ms) before reconnecting
+RETRY_MS = 3000
+BATCH_SIZE = 200
+# Batches a slow connection may fall behind by before it is closed (it reconnects and catches up)
+QUEUE_SIZE = 50
+RETENTION = timedelta(days=1)
+PRUNE_INTERVAL = timedelta(hours=1)
+
+
+def publish(kind, *payloads):
+    """Write events of ``kind`` for the dashboards once the current transaction commits."""
+    events = [LiveEvent(kind=kind, payload=payload) for payload in payloads]
+    if events:
+        transaction.on_commit(lambda: LiveEvent.objects.bulk_create(events))
+
+
+def cash_request_payload(cash_request, deleted=False):
+    payload = {'id': cash_request.pk, 'status': 'deleted' if deleted else cash_request.status}
+    if payload['status'] == 'pending':
+        payload.update(
+            location=cash_request.location.name,
+            total_jmd=cash_request.total_jmd,
+            total_usd=cash_request.total_usd,
+            request_date=cash_request.request_date,
+            delivery_date=cash_request.delivery_date,
+        )
+    return payload
+
+
+def eod_report_payload(report, created):
+    return {
+        'id': report.pk,
+        'location': report.location.name,
+        'processing_date': report.processing_date,
+        'closing_balance': report.closing_balance,
+        'created': created,
+    }
+
+
+def limit_breach_payload(location_id, location_name, date, limit_type, label, cleared=False):
+    return {
+        'location_id': location_id,
+        'location': location_name,
+        'date': date,
+        'limit_type': limit_type,
+        'label': label,
+        'cleared': cleared,
+    }
+
+
+def emergency_access_payload(access_request):
+    return {
+        'id': access_request.pk,
+        'agent': access_request.agent.username,
+        'location': access_request.location.name,
+        'status': access_request.status,
+    }
+
+
+def events_after(last_id, limit=BATCH_SIZE):
+    """Up to ``limit`` events after ``last_id``, oldest first, as (id, kind, payload)."""
+    return list(
+        LiveEvent.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'kind', 'payload')[:limit]
+    )
+
+
+def latest_event_id():
+    return LiveEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def prune_events():
+    deleted, _ = LiveEvent.objects.filter(created_at__lt=timezone.now() - RETENTION).delete()
+    return deleted
+
+
+class Broadcaster:
+    """Polls for new events on behalf of every stream connected to this process and fans them out."""
+
+    def __init__(self):
+        self.queues = set()
+        self.last_id = None
+        self.task = None
+        self.pruned_at = None
+        self.lock = asyncio.Lock()
+
+    async def subscribe(self):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        async with self.lock:
+            if self.task is None or self.task.done():
+                # Start from now; streams that resume catch up on their own
+                self.last_id = await sync_to_async(latest_event_id)()
+                self.task = asyncio.create_task(self.run())
+            self.queues.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.queues.discard(queue)
+
+    async def run(self):
+        while self.queues:
+            try:
+                # Like a request would: drop a connection that broke or outlived CONN_MAX_AGE
+                await sync_to_async(close_old_connections)()
+                await self.poll()
+            except Exception:
+                logger.exception("Polling live events failed")
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def poll(self):
+        events = await sync_to_async(events_after)(self.last_id)
+        while events:
+            self.last_id = events[-1][0]
+            for queue in list(self.queues):
+                try:
+                    queue.put_nowait(events)
+                except asyncio.QueueFull:
+                    # Too far behind: close it, and the browser resumes from its last id
+                    self.queues.discard(queue)
+                    queue.get_nowait()
+                    queue.put_nowait(None)
+            events = await sync_to_async(events_after)(self.last_id) if len(events) == BATCH_SIZE else []
+        if self.pruned_at is None or timezone.now() - self.pruned_at > PRUNE_INTERVAL:
+            self.pruned_at = timezone.now()
+            await sync_to_async(prune_events)()
+
+
+# One broadcaster per event loop (one per server process; tests get a loop each)
+_broadcasters = weakref.WeakKeyDictionary()
+
+
+def get_broadcaster():
+    loop = asyncio.get_running_loop()
+    if loop not in _broadcasters:
+        _broadcasters[loop] = Broadcaster()
+    return _broadcasters[loop]
+
+
+def format_event(event_id, kind, payload):
+    return f'id: {event_id}\nevent: {kind}\ndata: {json.dumps(payload, cls=DjangoJSONEncoder)}\n\n'
+
+
+async def stream(last_event_id=None):
+    """
+    Server-Sent Events for one dashboard: the events after ``last_event_id``
+    (when resuming), then every batch the broadcaster polls, until the client
+    disconnects.
+    """
+    broadcaster = get_broadcaster()
+    queue = await broadcaster.subscribe()
+    sent = broadcaster.last_id
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        if last_event_id is not None:
+            # Subscribed first, so nothing written from here on is missed
+            missed = await sync_to_async(events_after)(last_event_id, limit=None)
+            for event in missed:
+                yield format_event(*event)
+            sent = max([last_event_id] + [event[0] for event in missed])
+        while True:
+            try:
+                events = await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if events is None:
+                return
+            for event in events:
+                if event[0] > sent:
+                    yield format_event(*event)
+                    sent = event[0]
+    finally:
+        broadcaster.unsubscribe(queue)
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.ledger import write_checkpoints
+
+
+class Command(BaseCommand):
+    help = (
+        'Checks every location\'s cash ledger entries since its previous checkpoint and records its '
+        'current balance as the checkpoint for the business date'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, help='Business date of the checkpoint (YYYY-MM-DD); defaults to today')
+
+    def handle(self, *args, **options):
+        business_date = timezone.localdate()
+        if options['date']:
+            try:
+                business_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--date must be a date in YYYY-MM-DD format')
+
+        written, broken = write_checkpoints(business_date)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} cash ledger checkpoints for {business_date}.'))
+        if broken:
+            raise CommandError(
+                f'The ledger of {len(broken)} location(s) does not add up (ids {", ".join(map(str, broken))}); '
+                'no checkpoint was written for them.'
+            )
@@ -0,0 +1,31 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.notifications import DIGEST_WINDOW, dispatch, send_emails
+
+
+class Command(BaseCommand):
+    help = 'Sends queued notifications as per-user digests, in the app and by email'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Make one pass, then exit')
+        parser.add_argument('--flush', action='store_true', help='Send everything queued now instead of waiting for the digest window')
+        parser.add_argument('--poll-interval', type=float, default=30.0, help='Seconds between passes')
+
+    def handle(self, *args, **options):
+        window = timedelta(0) if options['flush'] else DIGEST_WINDOW
+        self.stdout.write(self.style.SUCCESS('Notification dispatcher started.'))
+        while True:
+            notifications = dispatch(window=window)
+            if notifications:
+                self.stdout.write(f'Created {len(notifications)} digests.')
+            sent, failed = send_emails()
+            if sent:
+                self.stdout.write(self.style.SUCCESS(f'Emailed {sent} digests.'))
+            if failed:
+                self.stdout.write(self.style.ERROR(f'Gave up emailing {failed} digests.'))
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
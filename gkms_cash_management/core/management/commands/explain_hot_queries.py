@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import hot_queries
+
+
+class Command(BaseCommand):
+    help = 'Runs EXPLAIN on the hot-path querysets and flags the ones that read a table with a sequential scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--query', action='append', choices=sorted(hot_queries.HOT_QUERIES),
+                            help='Only explain this query (repeatable)')
+        parser.add_argument('--plans', action='store_true', help='Print the full plan of every query')
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help='Exit with an error if any query uses a sequential scan')
+
+    def handle(self, *args, **options):
+        try:
+            context = hot_queries.HotQueryContext()
+        except LookupError as e:
+            raise CommandError(f'{e} Run seed_benchmark_data first.')
+
+        results = hot_queries.explain(options['query'], context)
+        flagged = []
+        for name, result in results.items():
+            if result['scans']:
+                flagged.append(name)
+                self.stdout.write(self.style.WARNING(f'{name}: sequential scan on {", ".join(result["scans"])}'))
+            else:
+                self.stdout.write(f'{name}: ok')
+            if options['plans'] or result['scans']:
+                for line in result['plan'].splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if flagged and options['fail_on_scan']:
+            raise CommandError(f'{len(flagged)} of {len(results)} queries use sequential scans: {", ".join(flagged)}')
+        if flagged:
+            self.stdout.write(self.style.WARNING(f'{len(flagged)} of {len(results)} queries use sequential scans.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'All {len(results)} queries use indexes.'))
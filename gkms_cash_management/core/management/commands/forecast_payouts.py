@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.calculations import recompute_daily_positions
+from core.forecasting import HORIZON_DAYS, refresh_forecasts
+
+
+class Command(BaseCommand):
+    help = (
+        f'Forecasts the next {HORIZON_DAYS} days of payouts for every location and recalculates '
+        'the projected positions in DailyAgentData from them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='first_day', type=str, help='First forecast day (YYYY-MM-DD); defaults to today')
+        parser.add_argument('--no-recompute', action='store_true', help='Only store the forecasts')
+
+    def handle(self, *args, **options):
+        first_day = timezone.localdate()
+        if options['first_day']:
+            try:
+                first_day = datetime.strptime(options['first_day'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--from must be a date in YYYY-MM-DD format')
+
+        count = refresh_forecasts(first_day)
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} payout forecasts from {first_day}.'))
+        if not options['no_recompute']:
+            positions = recompute_daily_positions([first_day])
+            self.stdout.write(self.style.SUCCESS(f'Recalculated {positions} daily positions for {first_day}.'))
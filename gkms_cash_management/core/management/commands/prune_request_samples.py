@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.metrics import prune_samples
+
+
+class Command(BaseCommand):
+    help = 'Deletes stored request metrics samples older than REQUEST_METRICS_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        deleted = prune_samples()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} request samples.'))
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from core.models import EFTData, Location, RemoteServicesData
+from core.payouts import refresh_payout_averages
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the precomputed rolling and seasonal payout averages from imported statements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=str, help='Only rebuild averages for statements on or after this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        eft_range = EFTData.objects.aggregate(first=Min('statement_date'), last=Max('statement_date'))
+        remote_range = RemoteServicesData.objects.aggregate(first=Min('statement_date'), last=Max('statement_date'))
+        firsts = [d for d in (eft_range['first'], remote_range['first']) if d]
+        lasts = [d for d in (eft_range['last'], remote_range['last']) if d]
+        if not firsts:
+            self.stdout.write(self.style.WARNING('No imported statements found.'))
+            return
+
+        first, last = min(firsts), max(lasts)
+        if options['since']:
+            try:
+                first = max(first, datetime.strptime(options['since'], '%Y-%m-%d').date())
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+        location_ids = list(Location.objects.values_list('id', flat=True))
+        statement_dates = set(
+            EFTData.objects.filter(statement_date__range=(first, last)).values_list('statement_date', flat=True).distinct()
+        ) | set(
+            RemoteServicesData.objects.filter(statement_date__range=(first, last)).values_list('statement_date', flat=True).distinct()
+        )
+
+        count = refresh_payout_averages(location_ids, statement_dates)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {count} payout averages for {len(location_ids)} locations ({first} to {last}).'
+        ))
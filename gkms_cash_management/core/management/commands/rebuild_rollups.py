@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from core.models import DailyAgentData, EFTData, RemoteServicesData
+from core.rollups import period_end, refresh_rollups
+
+
+def _parse_date(value, option):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'{option} must be a date in YYYY-MM-DD format')
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the daily, weekly and monthly cash rollups from daily positions, statements, '
+        'deliveries and EOD reports'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=str, help='First date to rebuild (YYYY-MM-DD); defaults to the earliest data')
+        parser.add_argument('--end', type=str, help='Last date to rebuild (YYYY-MM-DD); defaults to today')
+
+    def handle(self, *args, **options):
+        end = _parse_date(options['end'], '--end') if options['end'] else timezone.localdate()
+        if options['start']:
+            start = _parse_date(options['start'], '--start')
+        else:
+            earliest = [
+                DailyAgentData.objects.aggregate(first=Min('date'))['first'],
+                EFTData.objects.aggregate(first=Min('statement_date'))['first'],
+                RemoteServicesData.objects.aggregate(first=Min('statement_date'))['first'],
+            ]
+            start = min([day for day in earliest if day], default=end)
+        if end < start:
+            raise CommandError('--end must not be before --start')
+
+        # One calendar month per batch keeps memory bounded and derives each monthly rollup once
+        total = 0
+        batch_start = start
+        while batch_start <= end:
+            batch_end = min(period_end(batch_start.replace(day=1), 'month'), end)
+            total += refresh_rollups([batch_start + timedelta(days=offset) for offset in range((batch_end - batch_start).days + 1)])
+            batch_start = batch_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} cash rollups ({start} to {end}).'))
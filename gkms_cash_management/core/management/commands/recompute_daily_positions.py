@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.calculations import recompute_daily_positions
+
+
+def _parse_date(value, option):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'{option} must be a date in YYYY-MM-DD format')
+
+
+class Command(BaseCommand):
+    help = 'Recalculates DailyAgentData (cash position and projections) for all locations; limit breaches are kept by sync_limit_breaches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, help='Recalculate a single date (YYYY-MM-DD); defaults to today')
+        parser.add_argument('--start', type=str, help='First date of a range to recalculate (YYYY-MM-DD)')
+        parser.add_argument('--end', type=str, help='Last date of the range (YYYY-MM-DD); defaults to today')
+
+    def handle(self, *args, **options):
+        if options['start']:
+            start = _parse_date(options['start'], '--start')
+            end = _parse_date(options['end'], '--end') if options['end'] else timezone.localdate()
+            if end < start:
+                raise CommandError('--end must not be before --start')
+            dates = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        elif options['date']:
+            dates = [_parse_date(options['date'], '--date')]
+        else:
+            dates = [timezone.localdate()]
+
+        count = recompute_daily_positions(dates)
+        self.stdout.write(self.style.SUCCESS(
+            f'Recalculated {count} daily positions ({dates[0]} to {dates[-1]}).'
+        ))
@@ -0,0 +1,185 @@
+"""
+Benchmark scenarios for the hot paths, replayed with the Django test client
+against the dataset from seed_benchmark_data (see core.benchmarks for the
+dataset and the baselines).
+"""
+import io
+import statistics
+import time
+
+import openpyxl
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import benchmarks
+from core.importers import EFT_SCHEMA, REMOTE_SERVICES_SCHEMA
+from core.jobs import run_job
+from core.models import ImportJob, Location, SystemSettings
+
+
+def _statement_workbook(schema, rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for _ in range(schema.header_row - 1):
+        sheet.append([])
+    sheet.append(schema.headers)
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+class BenchmarkContext:
+    """Logged-in clients and fixtures shared by the scenarios."""
+
+    def __init__(self):
+        self.admin = User.objects.get(username=benchmarks.ADMIN_USERNAME)
+        self.agent = User.objects.filter(username__startswith=benchmarks.AGENT_PREFIX).order_by('username').first()
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        self.agent_client = Client()
+        self.agent_client.force_login(self.agent)
+        self.today = timezone.now().date()
+        # Created on first use; otherwise every rolled-back run creates it and invalidates its cache
+        SystemSettings.get_settings()
+
+        locations = list(Location.objects.order_by('id').values('eft_system_name', 'remote_services_name'))
+        self.eft_workbook = _statement_workbook(EFT_SCHEMA, [
+            [location['eft_system_name'], self.today.isoformat(), 1000000, 500000, 0, 400000, 0, 0, 0, 0, 0, 0, 0, 0]
+            for location in locations if location['eft_system_name']
+        ])
+        self.remote_services_workbook = _statement_workbook(REMOTE_SERVICES_SCHEMA, [
+            [location['remote_services_name'], 'Kingston', 1, currency, 250000, 50000, 300000, None, 40, 10, 50]
+            for location in locations if location['remote_services_name']
+            for currency in ('JMD', 'USD')
+        ])
+
+    def eod_post_data(self):
+        return {
+            # Today's report also sets today's closing balance in DailyAgentData
+            'processing_date': self.today.isoformat(),
+            'closing_balance': '1250000.00',
+            'funds_from_bxp_webex': '15000.00',
+            'all_tellers_balanced': 'on',
+            'confirmation': 'on',
+            'jmd_5000_count': '100',
+            'usd_100_count': '5',
+            'teller_name[]': ['Teller 1', 'Teller 2', 'Teller 3'],
+            'teller_jmd[]': ['400000', '450000', '400000'],
+            'teller_usd[]': ['500', '0', '0'],
+        }
+
+
+def _get(client_attr, url_name, expected_status=200):
+    def scenario(context):
+        response = getattr(context, client_attr).get(reverse(url_name))
+        assert response.status_code == expected_status, f"{url_name} returned {response.status_code}"
+    return scenario
+
+
+def _submit_eod_report(context):
+    response = context.agent_client.post(reverse('submit_eod_report'), context.eod_post_data())
+    assert response.status_code == 302, f"submit_eod_report returned {response.status_code}"
+
+
+def _import_job(kind, workbook_attr):
+    """Run a claimed import job as the worker would, positions, rollups and ledger included."""
+    def scenario(context):
+        job = ImportJob.objects.create(
+            kind=kind, payload=getattr(context, workbook_attr), status='running', started_at=timezone.now(),
+            statement_date=context.today if kind == 'remote_services' else None, created_by=context.admin,
+        )
+        run_job(job)
+        assert job.status == 'completed', job.error_message
+        assert not job.rows_skipped, job.errors[:3]
+    return scenario
+
+
+SCENARIOS = {
+    'admin_dashboard': _get('admin_client', 'admin_dashboard'),
+    'agent_dashboard': _get('agent_client', 'agent_dashboard'),
+    'submit_eod_report_form': _get('agent_client', 'submit_eod_report'),
+    'submit_eod_report': _submit_eod_report,
+    'admin_view_eod_reports': _get('admin_client', 'admin_view_eod_reports'),
+    'view_eft_statements': _get('admin_client', 'view_eft_statements'),
+    'view_remote_services_statements': _get('admin_client', 'view_remote_services_statements'),
+    'manage_locations': _get('admin_client', 'manage_locations'),
+    'import_eft_statement': _import_job('eft', 'eft_workbook'),
+    'import_remote_services_statement': _import_job('remote_services', 'remote_services_workbook'),
+}
+
+
+def run(names=None, repeat=5, log=None):
+    """
+    Run each scenario ``repeat`` times (after one warm-up run), rolling back
+    its writes every time. Its on_commit callbacks run (and are measured)
+    before the rollback. Returns {name: {'queries': max query count,
+    'ms': median wall time in milliseconds}}.
+    """
+    log = log or (lambda message: None)
+    results = {}
+    with override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver'],
+                           REQUEST_METRICS_ENABLED=False):
+        context = BenchmarkContext()
+        for name in names or SCENARIOS:
+            scenario = SCENARIOS[name]
+            timings, queries = [], []
+            for attempt in range(repeat + 1):
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as captured:
+                        start = time.perf_counter()
+                        with TestCase.captureOnCommitCallbacks(execute=True):
+                            scenario(context)
+                        elapsed = (time.perf_counter() - start) * 1000
+                    transaction.set_rollback(True)
+                if attempt:
+                    timings.append(elapsed)
+                    queries.append(len(captured.captured_queries))
+            results[name] = {'queries': max(queries), 'ms': round(statistics.median(timings), 2)}
+            log(f"{name}: {results[name]['queries']} queries, {results[name]['ms']} ms")
+    return results
+
+
+class Command(BaseCommand):
+    help = 'Measures query counts and latency of the hot paths against the seeded dataset and checks them against the stored baselines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=sorted(benchmarks.PROFILES), default='full',
+                            help='Baseline set to compare against; should match the seeded profile (default: full)')
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                            help='Only run this scenario (repeatable)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per scenario (default: 5)')
+        parser.add_argument('--latency-tolerance', type=float, default=benchmarks.DEFAULT_LATENCY_TOLERANCE,
+                            help='Allowed latency as a multiple of the baseline (default: %(default)s)')
+        parser.add_argument('--queries-only', action='store_true', help='Only fail on query count regressions')
+        parser.add_argument('--update-baselines', action='store_true', help='Store these results as the new baselines')
+
+    def handle(self, *args, **options):
+        if not User.objects.filter(username=benchmarks.ADMIN_USERNAME).exists():
+            raise CommandError('No benchmark dataset found. Run seed_benchmark_data first.')
+
+        results = run(options['scenario'], repeat=options['repeat'], log=self.stdout.write)
+
+        if options['update_baselines']:
+            baselines = benchmarks.load_baselines(options['profile'])
+            baselines.update(results)
+            benchmarks.save_baselines(options['profile'], baselines)
+            self.stdout.write(self.style.SUCCESS(f'Updated the {options["profile"]} baselines.'))
+            return
+
+        baselines = benchmarks.load_baselines(options['profile'])
+        missing = sorted(set(results) - set(baselines))
+        if missing:
+            self.stdout.write(self.style.WARNING(f'No baseline for: {", ".join(missing)}'))
+        tolerance = None if options['queries_only'] else options['latency_tolerance']
+        regressions = benchmarks.compare(results, baselines, tolerance)
+        if regressions:
+            raise CommandError('Benchmark regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'All {len(results)} scenarios are within their baselines.'))
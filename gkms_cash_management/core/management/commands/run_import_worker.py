@@ -0,0 +1,43 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import claim_next_job, fail_stale_jobs, run_job
+from core.tasks import run_deferred_tasks
+
+
+class Command(BaseCommand):
+    help = 'Processes queued EFT and Remote Services statement imports and the deferred ledger, rollup and limit tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the jobs currently queued, then exit')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--stale-minutes', type=int, default=60, help='Fail running jobs older than this on startup')
+
+    def handle(self, *args, **options):
+        stale = fail_stale_jobs(timedelta(minutes=options['stale_minutes']))
+        if stale:
+            self.stdout.write(self.style.WARNING(f'Marked {stale} stale running jobs as failed.'))
+
+        self.stdout.write(self.style.SUCCESS('Import worker started.'))
+        while True:
+            ran = run_deferred_tasks()
+            if ran:
+                self.stdout.write(f'Ran {ran} deferred tasks.')
+
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Running {job}...')
+            run_job(job)
+            if job.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(
+                    f'Job #{job.pk} completed: {job.rows_created} created, {job.rows_updated} updated, {job.rows_skipped} skipped.'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f'Job #{job.pk} failed: {job.error_message}'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmarks
+from core.models import Location
+
+
+class Command(BaseCommand):
+    help = 'Seeds a realistic dataset (locations from the CSV, agents, a year of statements and EOD reports) for run_benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=sorted(benchmarks.PROFILES), default='full', help='Dataset size (default: full)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+        parser.add_argument('--force', action='store_true', help='Delete all existing locations (and their data) first')
+
+    def handle(self, *args, **options):
+        if Location.objects.exists():
+            if not options['force']:
+                raise CommandError('The database already has locations. Use --force to delete them and seed anyway.')
+            self.stdout.write(self.style.WARNING('Deleting all existing locations and benchmark users...'))
+            Location.objects.all().delete()
+            benchmarks.User.objects.filter(username__startswith=benchmarks.AGENT_PREFIX).delete()
+            benchmarks.User.objects.filter(username=benchmarks.ADMIN_USERNAME).delete()
+
+        counts = benchmarks.seed(options['profile'], random_seed=options['seed'], log=self.stdout.write)
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Seeded the {options["profile"]} benchmark dataset: {summary}.'))
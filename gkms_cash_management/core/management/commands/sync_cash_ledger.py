@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from core.ledger import post_deliveries, post_payouts, sync_eod_reports
+from core.models import CashDelivery, EFTData, EODReport, RemoteServicesData
+
+
+def _parse_date(value, option):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'{option} must be a date in YYYY-MM-DD format')
+
+
+class Command(BaseCommand):
+    help = (
+        'Posts verified deliveries, payouts, courier pickups, adjustments and EOD counts to the cash ledger, '
+        'day by day; records already posted only get corrections, so it is safe to re-run'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=str, help='First date to post (YYYY-MM-DD); defaults to the earliest data')
+        parser.add_argument('--end', type=str, help='Last date to post (YYYY-MM-DD); defaults to today')
+
+    def handle(self, *args, **options):
+        end = _parse_date(options['end'], '--end') if options['end'] else timezone.localdate()
+        if options['start']:
+            start = _parse_date(options['start'], '--start')
+        else:
+            earliest = [
+                CashDelivery.objects.aggregate(first=Min('date'))['first'],
+                EODReport.objects.aggregate(first=Min('processing_date'))['first'],
+                EFTData.objects.aggregate(first=Min('statement_date'))['first'],
+                RemoteServicesData.objects.aggregate(first=Min('statement_date'))['first'],
+            ]
+            start = min([day for day in earliest if day], default=end)
+        if end < start:
+            raise CommandError('--end must not be before --start')
+
+        # In business order, so each day's count comes after the day's movements
+        total = 0
+        day = start
+        while day <= end:
+            # Unverified deliveries only matter if they were posted while verified
+            total += post_deliveries(CashDelivery.objects.filter(Q(verified=True) | Q(verification_date__isnull=False), date=day))
+            total += post_payouts([day])
+            total += sync_eod_reports(EODReport.objects.filter(processing_date=day))
+            day += timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Appended {total} cash ledger entries ({start} to {end}).'))
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.limits import sync_limit_breaches
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the LimitBreach table (and exceeds_* flags) from DailyAgentData and LocationLimit'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, help='Only rebuild breaches for this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        dates = None
+        if options['date']:
+            try:
+                dates = [datetime.strptime(options['date'], '%Y-%m-%d').date()]
+            except ValueError:
+                raise CommandError('--date must be a date in YYYY-MM-DD format')
+
+        count = sync_limit_breaches(dates)
+        self.stdout.write(self.style.SUCCESS(f'Synced {count} limit breaches.'))
@@ -0,0 +1,147 @@
+"""
+Per-view request metrics.
+
+RequestMetricsMiddleware (core/middleware.py) records one sample per
+request: wall time, SQL query count, SQL time and the most repeated SQL
+statements. Samples are kept per URL name in an in-process ring buffer and,
+with REQUEST_METRICS_PERSIST on, also written to RequestSample in batches so
+the report can cover every worker process. The report reads at most
+REQUEST_METRICS_REPORT_SAMPLES of the latest stored samples, and
+prune_request_samples deletes those past the retention period.
+"""
+import threading
+from collections import Counter, deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+# Defaults; override in settings
+DEFAULT_BUFFER_SIZE = 500
+DEFAULT_PERSIST_BATCH = 25
+DEFAULT_RETENTION_DAYS = 14
+DEFAULT_REPORT_SAMPLES = 20000
+
+# Duplicated statements kept per sample and shown per view in the report
+TOP_DUPLICATES = 5
+
+_lock = threading.Lock()
+_buffers = {}
+_unsaved = []
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def record(sample):
+    """Add a sample to the ring buffer of its URL name and queue it for persistence."""
+    size = _setting('REQUEST_METRICS_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+    to_save = None
+    with _lock:
+        buffer = _buffers.get(sample['url_name'])
+        if buffer is None or buffer.maxlen != size:
+            buffer = _buffers[sample['url_name']] = deque(buffer or (), maxlen=size)
+        buffer.append(sample)
+        if _setting('REQUEST_METRICS_PERSIST', False):
+            _unsaved.append(sample)
+            if len(_unsaved) >= _setting('REQUEST_METRICS_PERSIST_BATCH', DEFAULT_PERSIST_BATCH):
+                to_save = _unsaved[:]
+                _unsaved.clear()
+    if to_save:
+        _save(to_save)
+
+
+def _save(samples):
+    from .models import RequestSample
+    RequestSample.objects.bulk_create([
+        RequestSample(
+            url_name=sample['url_name'],
+            method=sample['method'],
+            status_code=sample['status_code'],
+            wall_ms=sample['wall_ms'],
+            query_count=sample['query_count'],
+            sql_ms=sample['sql_ms'],
+            duplicate_queries=sample['duplicate_queries'],
+            recorded_at=sample['recorded_at'],
+        )
+        for sample in samples
+    ])
+
+
+def prune_samples():
+    """Delete persisted samples older than REQUEST_METRICS_RETENTION_DAYS. Returns the number deleted."""
+    from .models import RequestSample
+    retention = timedelta(days=_setting('REQUEST_METRICS_RETENTION_DAYS', DEFAULT_RETENTION_DAYS))
+    deleted, _ = RequestSample.objects.filter(recorded_at__lt=timezone.now() - retention).delete()
+    return deleted
+
+
+def report_sample_limit():
+    return _setting('REQUEST_METRICS_REPORT_SAMPLES', DEFAULT_REPORT_SAMPLES)
+
+
+def stored_samples(since):
+    """
+    The latest persisted samples (from every process) recorded since the
+    given time, at most report_sample_limit() of them.
+    """
+    from .models import RequestSample
+    return list(
+        RequestSample.objects.filter(recorded_at__gte=since).order_by('-recorded_at')
+        .values('url_name', 'wall_ms', 'query_count', 'sql_ms', 'duplicate_queries')[:report_sample_limit()]
+    )
+
+
+def buffered_samples():
+    """Samples currently held in this process's ring buffers."""
+    with _lock:
+        return [sample for buffer in _buffers.values() for sample in buffer]
+
+
+def clear():
+    with _lock:
+        _buffers.clear()
+        _unsaved.clear()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not values:
+        return 0
+    values = sorted(values)
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+
+def rollup(samples):
+    """
+    Summarize samples per URL name: request count, p50/p95/p99 wall time,
+    p95 SQL time, mean and max query count, and the statements most often
+    repeated within a single request. Sorted slowest (p95) first.
+    """
+    by_name = {}
+    for sample in samples:
+        by_name.setdefault(sample['url_name'], []).append(sample)
+
+    rows = []
+    for url_name, group in by_name.items():
+        wall = [sample['wall_ms'] for sample in group]
+        queries = [sample['query_count'] for sample in group]
+        duplicates = Counter()
+        for sample in group:
+            for sql, count in sample['duplicate_queries']:
+                duplicates[sql] = max(duplicates[sql], count)
+        rows.append({
+            'url_name': url_name,
+            'requests': len(group),
+            'p50_ms': percentile(wall, 50),
+            'p95_ms': percentile(wall, 95),
+            'p99_ms': percentile(wall, 99),
+            'p95_sql_ms': percentile([sample['sql_ms'] for sample in group], 95),
+            'avg_queries': sum(queries) / len(queries),
+            'max_queries': max(queries),
+            'top_duplicates': duplicates.most_common(TOP_DUPLICATES),
+        })
+    rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return rows
@@ -0,0 +1,135 @@
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics
+
+
+class QueryCollector:
+    """connection.execute_wrapper hook counting and timing every SQL statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        return [
+            [sql, count]
+            for sql, count in self.statements.most_common(metrics.TOP_DUPLICATES)
+            if count > 1
+        ]
+
+
+class RequestMetricsMiddleware:
+    """
+    Record wall time, SQL query count, SQL time and repeated SQL statements
+    for each request to a named URL (see core.metrics). Disable with
+    REQUEST_METRICS_ENABLED = False.
+
+    Runs natively in both the sync (WSGI) and async (ASGI) middleware chains,
+    so under ASGI the request only enters a thread for its sync code.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        collector = QueryCollector()
+        start = time.perf_counter()
+        with connection.execute_wrapper(collector):
+            response = self.get_response(request)
+        sample = self._sample(request, response, collector, start)
+        if sample:
+            metrics.record(sample)
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return await self.get_response(request)
+
+        # Connections are per thread: hook the one in the thread that runs
+        # this request's sync code (views and ORM calls alike)
+        wrappers = await sync_to_async(lambda: connection.execute_wrappers)()
+        collector = QueryCollector()
+        wrappers.append(collector)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrappers.remove(collector)
+        sample = self._sample(request, response, collector, start)
+        if sample:
+            if getattr(settings, 'REQUEST_METRICS_PERSIST', False):
+                # May write a batch to the database
+                await sync_to_async(metrics.record)(sample)
+            else:
+                metrics.record(sample)
+        return response
+
+    def _sample(self, request, response, collector, start):
+        match = getattr(request, 'resolver_match', None)
+        if match is None or not match.url_name:
+            return None
+        return {
+            'url_name': match.url_name,
+            'method': request.method,
+            'status_code': response.status_code,
+            'wall_ms': round((time.perf_counter() - start) * 1000, 2),
+            'query_count': collector.count,
+            'sql_ms': round(collector.seconds * 1000, 2),
+            'duplicate_queries': collector.duplicates(),
+            'recorded_at': timezone.now(),
+        }
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise for an async middleware chain. WhiteNoise itself is sync-only,
+    and as the outermost middleware it would push every request through a
+    thread; here only static files are served in one.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-17 01:19
+
+from django.db import migrations, models
+
+
+def remove_duplicate_remote_services_rows(apps, schema_editor):
+    """Keep only the most recently uploaded row for each natural key."""
+    RemoteServicesData = apps.get_model('core', 'RemoteServicesData')
+    seen = set()
+    duplicate_ids = []
+    rows = RemoteServicesData.objects.order_by('-uploaded_at', '-id').values_list(
+        'id', 'location_id', 'statement_date', 'currency', 'parish_id'
+    )
+    for row_id, *key in rows.iterator():
+        key = tuple(key)
+        if key in seen:
+            duplicate_ids.append(row_id)
+        else:
+            seen.add(key)
+    for start in range(0, len(duplicate_ids), 500):
+        RemoteServicesData.objects.filter(id__in=duplicate_ids[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='content_sha256',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Hash of the uploaded file, used to detect re-uploads', max_length=64),
+        ),
+        migrations.RunPython(remove_duplicate_remote_services_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='remoteservicesdata',
+            constraint=models.UniqueConstraint(fields=('location', 'statement_date', 'currency', 'parish_id'), name='core_remoteservicesdata_natural_key'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-17 01:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_remote_services_natural_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutAverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('rolling_90', 'Rolling 90 Days'), ('christmas', 'Christmas'), ('easter', 'Easter'), ('back_to_school', 'Back to School'), ('mothers_day', "Mother's Day")], max_length=20)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('days_observed', models.IntegerField(default=0)),
+                ('total_payout', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('average_payout', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payout_averages', to='core.location')),
+            ],
+            options={
+                'verbose_name': 'Payout Average',
+                'verbose_name_plural': 'Payout Averages',
+                'unique_together': {('location', 'window', 'period_end')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-17 01:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_payoutaverage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LimitBreach',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('limit_type', models.CharField(choices=[('insurance', 'Insurance Limit Exceeded'), ('eod_vault', 'EOD Vault Limit Exceeded'), ('working_day', 'Working Day Limit Exceeded')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('limit', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='limit_breaches', to='core.location')),
+            ],
+            options={
+                'verbose_name': 'Limit Breach',
+                'verbose_name_plural': 'Limit Breaches',
+                'ordering': ['date', 'location__name', 'limit_type'],
+                'unique_together': {('location', 'date', 'limit_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-17 01:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_limitbreach'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_name', models.CharField(max_length=100)),
+                ('method', models.CharField(max_length=10)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('wall_ms', models.FloatField()),
+                ('query_count', models.PositiveIntegerField()),
+                ('sql_ms', models.FloatField()),
+                ('duplicate_queries', models.JSONField(blank=True, default=list)),
+                ('recorded_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Request Sample',
+                'verbose_name_plural': 'Request Samples',
+                'indexes': [models.Index(fields=['url_name', 'recorded_at'], name='core_reqsample_name_idx')],
+            },
+        ),
+    ]
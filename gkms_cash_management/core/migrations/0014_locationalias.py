@@ -0,0 +1,53 @@
+# Generated by Django 5.1.6 on 2026-10-17 01:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SOURCE_FIELDS = {
+    'name': 'name',
+    'eft': 'eft_system_name',
+    'remote_services': 'remote_services_name',
+    'insurance_limit': 'insurance_limit_name',
+}
+
+
+def create_location_aliases(apps, schema_editor):
+    Location = apps.get_model('core', 'Location')
+    LocationAlias = apps.get_model('core', 'LocationAlias')
+    aliases = []
+    for location in Location.objects.all():
+        for source, field in SOURCE_FIELDS.items():
+            name = getattr(location, field).strip()
+            if name:
+                aliases.append(LocationAlias(
+                    location=location, source=source, name=name,
+                    normalized_name=' '.join(name.split()).casefold(),
+                ))
+    LocationAlias.objects.bulk_create(aliases, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_requestsample'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('name', 'Location Name'), ('eft', 'EFT System'), ('remote_services', 'Remote Services'), ('insurance_limit', 'Insurance Limit')], max_length=20)),
+                ('name', models.CharField(max_length=255)),
+                ('normalized_name', models.CharField(max_length=255)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='core.location')),
+            ],
+            options={
+                'verbose_name': 'Location Alias',
+                'verbose_name_plural': 'Location Aliases',
+                'indexes': [models.Index(fields=['source', 'normalized_name'], name='core_locationalias_name_idx')],
+                'unique_together': {('location', 'source')},
+            },
+        ),
+        migrations.RunPython(create_location_aliases, migrations.RunPython.noop),
+    ]
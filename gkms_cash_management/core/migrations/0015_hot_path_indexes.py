@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-17 01:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_locationalias'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cashrequest',
+            index=models.Index(fields=['status', '-request_date'], name='core_cashrequest_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cashrequest',
+            index=models.Index(fields=['location', '-request_date'], name='core_cashrequest_loc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyagentdata',
+            index=models.Index(condition=models.Q(('exceeds_insurance_limit', True), ('exceeds_eod_limit', True), ('exceeds_working_day_limit', True), _connector='OR'), fields=['date'], name='core_dailydata_over_limit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emergencyaccessrequest',
+            index=models.Index(fields=['agent', 'status', 'access_granted_until'], name='core_emergency_agent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emergencyaccessrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-requested_at'], name='core_emergency_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='limitbreach',
+            index=models.Index(fields=['date'], name='core_limitbreach_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='remoteservicesdata',
+            index=models.Index(fields=['statement_date'], name='core_rsdata_date_idx'),
+        ),
+    ]
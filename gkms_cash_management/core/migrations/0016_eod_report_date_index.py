@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-17 01:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eodreport',
+            index=models.Index(fields=['-processing_date', '-id'], name='core_eodreport_date_idx'),
+        ),
+    ]
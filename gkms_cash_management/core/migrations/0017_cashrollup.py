@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-17 01:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_eod_report_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CashRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('scope', models.CharField(choices=[('location', 'Location'), ('parish', 'Parish'), ('network', 'Network')], max_length=10)),
+                ('parish', models.CharField(blank=True, default='', max_length=255)),
+                ('grain', models.CharField(choices=[('day', 'Day')], default='day', max_length=10)),
+                ('period_start', models.DateField()),
+                ('closing_balance', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('closing_balance_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('closing_balance_count', models.PositiveIntegerField(default=0)),
+                ('eft_inbound', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('eft_outbound', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('payouts', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('payout_count', models.PositiveIntegerField(default=0)),
+                ('deliveries_jmd', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('deliveries_usd', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('delivery_count', models.PositiveIntegerField(default=0)),
+                ('variance', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('eod_report_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cash_rollups', to='core.location')),
+            ],
+            options={
+                'verbose_name': 'Cash Rollup',
+                'verbose_name_plural': 'Cash Rollups',
+                'indexes': [models.Index(fields=['grain', 'period_start', 'scope'], name='core_cashrollup_period_idx')],
+                'unique_together': {('key', 'grain', 'period_start')},
+            },
+        ),
+    ]
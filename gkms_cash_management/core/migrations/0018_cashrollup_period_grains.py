@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_cashrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cashrollup',
+            name='grain',
+            field=models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], default='day', max_length=10),
+        ),
+    ]
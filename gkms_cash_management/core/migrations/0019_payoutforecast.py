@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-17 01:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_cashrollup_period_grains'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('forecast_date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('generated_for', models.DateField()),
+                ('days_observed', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payout_forecasts', to='core.location')),
+            ],
+            options={
+                'verbose_name': 'Payout Forecast',
+                'verbose_name_plural': 'Payout Forecasts',
+                'unique_together': {('location', 'forecast_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_payoutforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CashLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('delivery', 'Delivery Verified'), ('payout', 'Payout'), ('courier_pickup', 'Courier Pickup'), ('eod_close', 'EOD Close'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('reference', models.CharField(db_index=True, max_length=100)),
+                ('business_date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('recorded_at', models.DateTimeField()),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='core.location')),
+            ],
+            options={
+                'verbose_name': 'Cash Ledger Entry',
+                'verbose_name_plural': 'Cash Ledger Entries',
+            },
+        ),
+        migrations.CreateModel(
+            name='CashLedgerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_date', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_checkpoints', to='core.location')),
+                ('last_entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.cashledgerentry')),
+            ],
+            options={
+                'verbose_name': 'Cash Ledger Checkpoint',
+                'verbose_name_plural': 'Cash Ledger Checkpoints',
+            },
+        ),
+        migrations.CreateModel(
+            name='CashPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('closed_through', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.cashledgerentry')),
+                ('location', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cash_position', to='core.location')),
+            ],
+            options={
+                'verbose_name': 'Cash Position',
+                'verbose_name_plural': 'Cash Positions',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cashledgerentry',
+            index=models.Index(fields=['location', 'recorded_at', 'id'], name='core_ledger_recorded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cashledgerentry',
+            index=models.Index(fields=['location', 'business_date'], name='core_ledger_business_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='cashledgercheckpoint',
+            unique_together={('location', 'business_date')},
+        ),
+    ]
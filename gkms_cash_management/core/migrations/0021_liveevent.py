@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:14
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_cash_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiveEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('cash_request', 'Cash Request'), ('eod_report', 'EOD Report'), ('limit_breach', 'Limit Breach'), ('emergency_access', 'Emergency Access Request')], max_length=20)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Live Event',
+                'verbose_name_plural': 'Live Events',
+            },
+        ),
+    ]
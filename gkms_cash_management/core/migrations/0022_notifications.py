@@ -0,0 +1,54 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_liveevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('eod_report', 'EOD Report Submitted'), ('cash_request', 'Cash Request Submitted'), ('delivery_verified', 'Cash Delivery Verified'), ('emergency_access', 'Emergency Access Requested'), ('cash_request_decided', 'Cash Request Decided'), ('emergency_access_decided', 'Emergency Access Decided')], max_length=30)),
+                ('audience', models.CharField(choices=[('admins', 'Administrators'), ('location', 'Location Agents')], default='admins', max_length=10)),
+                ('message', models.CharField(max_length=255)),
+                ('related_url', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.location')),
+            ],
+            options={
+                'verbose_name': 'Notification Event',
+                'verbose_name_plural': 'Notification Events',
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('notification_type', models.CharField(choices=[('info', 'Information'), ('success', 'Success'), ('warning', 'Warning'), ('danger', 'Danger')], default='info', max_length=10)),
+                ('related_url', models.CharField(blank=True, max_length=255)),
+                ('event_count', models.PositiveIntegerField(default=1)),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('email_status', models.CharField(choices=[('none', 'Not Emailed'), ('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='none', max_length=10)),
+                ('email_attempts', models.PositiveSmallIntegerField(default=0)),
+                ('emailed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='core_notification_user_idx'), models.Index(condition=models.Q(('email_status', 'pending')), fields=['id'], name='core_notification_email_idx')],
+            },
+        ),
+    ]
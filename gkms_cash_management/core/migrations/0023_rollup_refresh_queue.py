@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Rollup Refresh',
+                'verbose_name_plural': 'Rollup Refreshes',
+            },
+        ),
+    ]
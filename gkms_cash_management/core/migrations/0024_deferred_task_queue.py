@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:49
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_rollup_refresh_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeferredTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('eod_ledger', 'EOD Report Ledger Postings'), ('rollups', 'Cash Rollup Refresh'), ('limits', 'Limit Breach Check')], max_length=20)),
+                ('args', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Deferred Task',
+                'verbose_name_plural': 'Deferred Tasks',
+            },
+        ),
+        migrations.DeleteModel(
+            name='RollupRefresh',
+        ),
+    ]
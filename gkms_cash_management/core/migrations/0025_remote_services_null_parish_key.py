@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:53
+
+from django.db import migrations, models
+
+
+def remove_duplicate_rows_without_parish(apps, schema_editor):
+    """Keep only the most recently uploaded row for each natural key without a parish_id."""
+    RemoteServicesData = apps.get_model('core', 'RemoteServicesData')
+    seen = set()
+    duplicate_ids = []
+    rows = RemoteServicesData.objects.filter(parish_id__isnull=True).order_by('-uploaded_at', '-id').values_list(
+        'id', 'location_id', 'statement_date', 'currency'
+    )
+    for row_id, *key in rows.iterator():
+        key = tuple(key)
+        if key in seen:
+            duplicate_ids.append(row_id)
+        else:
+            seen.add(key)
+    for start in range(0, len(duplicate_ids), 500):
+        RemoteServicesData.objects.filter(id__in=duplicate_ids[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_deferred_task_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_rows_without_parish, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='remoteservicesdata',
+            constraint=models.UniqueConstraint(condition=models.Q(('parish_id__isnull', True)), fields=('location', 'statement_date', 'currency'), name='core_remoteservicesdata_no_parish_key'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:54
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_remote_services_null_parish_key'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='dailyagentdata',
+            name='core_dailydata_over_limit_idx',
+        ),
+    ]
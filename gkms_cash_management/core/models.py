@@ -1,8 +1,15 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.contrib.auth.models import User
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from datetime import datetime, timedelta
 from decimal import Decimal
 from django.utils import timezone
+import copy
+import time
+import uuid
 
 def yesterday():
     return datetime.now().date() - timedelta(days=1)
@@ -127,6 +134,14 @@ class CashRequest(models.Model):
         
         super().save(*args, **kwargs)
 
+    class Meta:
+        indexes = [
+            # Pending queue on the admin dashboard, newest first
+            models.Index(fields=['status', '-request_date'], name='core_cashrequest_status_idx'),
+            # A location's request history
+            models.Index(fields=['location', '-request_date'], name='core_cashrequest_loc_idx'),
+        ]
+
 class EODReport(models.Model):
     agent = models.ForeignKey(User, on_delete=models.CASCADE, related_name='eod_reports')
     location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='eod_reports')
@@ -154,6 +169,10 @@ class EODReport(models.Model):
     class Meta:
         unique_together = ['agent', 'location', 'processing_date']
         ordering = ['-processing_date']
+        indexes = [
+            # Admin EOD report listing (keyset pagination on processing date, id)
+            models.Index(fields=['-processing_date', '-id'], name='core_eodreport_date_idx'),
+        ]
 
     def __str__(self):
         return f"EOD Report {self.location.name} - {self.processing_date}"
@@ -307,6 +326,12 @@ class EmergencyAccessRequest(models.Model):
     
     class Meta:
         ordering = ['-requested_at']
+        indexes = [
+            # An agent's pending requests and unexpired grants (agent dashboard)
+            models.Index(fields=['agent', 'status', 'access_granted_until'], name='core_emergency_agent_idx'),
+            # Review queue
+            models.Index(fields=['-requested_at'], condition=Q(status='pending'), name='core_emergency_pending_idx'),
+        ]
 
 class SystemSettings(models.Model):
     """Global system settings"""
@@ -326,11 +351,40 @@ class SystemSettings(models.Model):
     def __str__(self):
         return "System Settings"
 
+    # Settings are cached in each process and reloaded when the version stamp in the
+    # shared cache changes; the stamp is checked at most every SYSTEM_SETTINGS_CHECK_SECONDS
+    VERSION_KEY = 'system_settings:version'
+    _cached = None
+    _cached_version = None
+    _checked_at = None
+
     @classmethod
     def get_settings(cls):
-        """Get or create system settings"""
-        settings, created = cls.objects.get_or_create(pk=1)
-        return settings
+        """Get or create system settings (a copy of the process-wide cached instance)"""
+        now = time.monotonic()
+        interval = getattr(django_settings, 'SYSTEM_SETTINGS_CHECK_SECONDS', 5)
+        if cls._cached is None or cls._checked_at is None or now - cls._checked_at >= interval:
+            version = cache.get(cls.VERSION_KEY)
+            if version is None:
+                version = uuid.uuid4().hex
+                # Another process may have stamped a version meanwhile; use whichever won
+                if not cache.add(cls.VERSION_KEY, version, timeout=None):
+                    version = cache.get(cls.VERSION_KEY, version)
+            if cls._cached is None or version != cls._cached_version:
+                cls._cached, created = cls.objects.get_or_create(pk=1)
+                cls._cached_version = version
+            cls._checked_at = now
+        return copy.copy(cls._cached)
+
+    @classmethod
+    def invalidate(cls):
+        """Make every process reload the settings on its next version check."""
+        cache.set(cls.VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        cls._cached = None
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        transaction.on_commit(type(self).invalidate)
 
 class EFTData(models.Model):
     location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='eft_data')
@@ -358,7 +412,7 @@ class EFTData(models.Model):
     def __str__(self):
         return f"EFT Data for {self.location.name} - {self.statement_date}"
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 @receiver(post_save, sender=User)
@@ -398,7 +452,639 @@ class RemoteServicesData(models.Model):
         verbose_name = "Remote Services Data"
         verbose_name_plural = "Remote Services Data Entries"
         ordering = ['-statement_date', 'location__name', '-uploaded_at']
-        # unique_together = ['location', 'statement_date', 'currency'] # Consider if a combination should be unique per row from Excel
+        # Natural key of a sheet row; re-imports update these rows instead of duplicating them.
+        # Databases treat NULLs as distinct, so rows without a parish_id get their own key
+        # (nulls_distinct=False would do, but SQLite drops such a constraint altogether).
+        constraints = [
+            models.UniqueConstraint(
+                fields=['location', 'statement_date', 'currency', 'parish_id'],
+                name='core_remoteservicesdata_natural_key',
+            ),
+            models.UniqueConstraint(
+                fields=['location', 'statement_date', 'currency'],
+                condition=Q(parish_id__isnull=True),
+                name='core_remoteservicesdata_no_parish_key',
+            ),
+        ]
+        # (location, statement_date) lookups use the natural key's leading columns
+        indexes = [
+            models.Index(fields=['statement_date'], name='core_rsdata_date_idx'),
+        ]
 
     def __str__(self):
-        return f"Remote Services for {self.location.name} - {self.statement_date} ({self.currency})"
\ No newline at end of file
+        return f"Remote Services for {self.location.name} - {self.statement_date} ({self.currency})"
+
+
+class ImportJob(models.Model):
+    """A statement upload waiting for (or processed by) the import worker."""
+    KIND_CHOICES = (
+        ('eft', 'EFT Statement'),
+        ('remote_services', 'Remote Services Statement'),
+    )
+
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    # The uploaded workbook is kept in the database so the worker does not need shared disk with the web process
+    payload = models.BinaryField(default=b'')
+    original_filename = models.CharField(max_length=255, blank=True, default='')
+    content_sha256 = models.CharField(max_length=64, blank=True, default='', db_index=True, help_text="Hash of the uploaded file, used to detect re-uploads")
+    statement_date = models.DateField(null=True, blank=True, help_text="Statement date chosen on upload (Remote Services only)")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    rows_processed = models.IntegerField(default=0)
+    rows_created = models.IntegerField(default=0)
+    rows_updated = models.IntegerField(default=0)
+    rows_skipped = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text="Per-row problems reported by the importer")
+    error_message = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='core_importjob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Import Job #{self.id} ({self.get_kind_display()}, {self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'filename': self.original_filename,
+            'statement_date': self.statement_date.isoformat() if self.statement_date else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'rows_processed': self.rows_processed,
+            'rows_created': self.rows_created,
+            'rows_updated': self.rows_updated,
+            'rows_skipped': self.rows_skipped,
+            'errors': self.errors,
+            'error_message': self.error_message,
+            'finished': self.is_finished,
+        }
+
+class PayoutAverage(models.Model):
+    """
+    Precomputed average daily payout for a location over a window ending on
+    period_end: either the rolling 90 days up to a statement date, or one of
+    the seasonal windows (Christmas, Easter, ...) of a given year.
+    Maintained by core.payouts.refresh_payout_averages on each statement import.
+    """
+    WINDOW_CHOICES = (
+        ('rolling_90', 'Rolling 90 Days'),
+        ('christmas', 'Christmas'),
+        ('easter', 'Easter'),
+        ('back_to_school', 'Back to School'),
+        ('mothers_day', "Mother's Day"),
+    )
+
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='payout_averages')
+    window = models.CharField(max_length=20, choices=WINDOW_CHOICES)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    days_observed = models.IntegerField(default=0)
+    total_payout = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    average_payout = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Payout Average"
+        verbose_name_plural = "Payout Averages"
+        unique_together = ['location', 'window', 'period_end']
+
+    def __str__(self):
+        return f"{self.location.name} - {self.get_window_display()} to {self.period_end}: {self.average_payout}"
+
+
+class PayoutForecast(models.Model):
+    """
+    Forecast payout for a location on a future day, fitted by core.forecasting
+    from the payout history up to the day before ``generated_for``.
+    Drives the projected positions in DailyAgentData; days without a
+    forecast fall back to PayoutAverage.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='payout_forecasts')
+    forecast_date = models.DateField()
+    amount = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    # First forecast day of the run that produced this row
+    generated_for = models.DateField()
+    days_observed = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Payout Forecast"
+        verbose_name_plural = "Payout Forecasts"
+        unique_together = ['location', 'forecast_date']
+
+    def __str__(self):
+        return f"{self.location.name} - {self.forecast_date}: {self.amount}"
+
+
+class LimitBreach(models.Model):
+    """
+    A location's closing balance over one of its limits on a given date.
+    Maintained by core.limits.sync_limit_breaches whenever DailyAgentData or
+    LocationLimit changes, so the dashboard reads breaches instead of
+    recomputing them.
+    """
+    LIMIT_TYPE_CHOICES = (
+        ('insurance', 'Insurance Limit Exceeded'),
+        ('eod_vault', 'EOD Vault Limit Exceeded'),
+        ('working_day', 'Working Day Limit Exceeded'),
+    )
+
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='limit_breaches')
+    date = models.DateField()
+    limit_type = models.CharField(max_length=20, choices=LIMIT_TYPE_CHOICES)
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    limit = models.DecimalField(max_digits=15, decimal_places=2)
+    detected_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Limit Breach"
+        verbose_name_plural = "Limit Breaches"
+        unique_together = ['location', 'date', 'limit_type']
+        ordering = ['date', 'location__name', 'limit_type']
+        indexes = [
+            models.Index(fields=['date'], name='core_limitbreach_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.location.name} - {self.date}: {self.get_limit_type_display()}"
+
+
+@receiver(post_save, sender=DailyAgentData)
+@receiver(post_delete, sender=DailyAgentData)
+def daily_agent_data_changed(sender, instance, **kwargs):
+    """Have the worker re-evaluate the location's limit breaches for the day."""
+    from .tasks import defer
+    defer('limits', date=instance.date, location_id=instance.location_id)
+
+
+@receiver(post_save, sender=LocationLimit)
+@receiver(post_delete, sender=LocationLimit)
+def location_limit_changed(sender, instance, **kwargs):
+    """Have the worker re-evaluate every day recorded for the location against its new limits."""
+    from .tasks import defer
+    defer('limits', date=None, location_id=instance.location_id)
+
+
+class RequestSample(models.Model):
+    """
+    Timing and SQL counts for one request, persisted by core.metrics when
+    REQUEST_METRICS_PERSIST is on.
+    """
+    url_name = models.CharField(max_length=100)
+    method = models.CharField(max_length=10)
+    status_code = models.PositiveSmallIntegerField()
+    wall_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    sql_ms = models.FloatField()
+    duplicate_queries = models.JSONField(default=list, blank=True)
+    recorded_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Request Sample"
+        verbose_name_plural = "Request Samples"
+        indexes = [
+            models.Index(fields=['url_name', 'recorded_at'], name='core_reqsample_name_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.url_name} {self.method} {self.wall_ms:.0f}ms ({self.query_count} queries)"
+
+
+@receiver(post_save, sender=DailyAgentData)
+@receiver(post_delete, sender=DailyAgentData)
+@receiver(post_save, sender=EODReport)
+@receiver(post_delete, sender=EODReport)
+@receiver(post_save, sender=CashDelivery)
+@receiver(post_delete, sender=CashDelivery)
+def location_dashboard_changed(sender, instance, **kwargs):
+    """Drop the location's cached agent dashboard data."""
+    from .dashboard import invalidate_location
+    transaction.on_commit(lambda: invalidate_location(instance.location_id))
+
+
+@receiver(post_save, sender=EmergencyAccessRequest)
+@receiver(post_delete, sender=EmergencyAccessRequest)
+def emergency_access_changed(sender, instance, **kwargs):
+    """Drop the agent's cached emergency access state."""
+    from .dashboard import invalidate_agent
+    transaction.on_commit(lambda: invalidate_agent(instance.agent_id))
+
+
+def normalize_location_name(name):
+    """Case-folded, whitespace-collapsed form used to match location names from statements."""
+    return ' '.join(str(name).split()).casefold()
+
+
+class LocationAlias(models.Model):
+    """
+    A name a location is known by in one of the source systems, stored in
+    normalized form so statement imports can match names with one indexed
+    lookup. Kept in sync with the Location name fields by sync_aliases.
+    """
+    SOURCE_FIELDS = {
+        'name': 'name',
+        'eft': 'eft_system_name',
+        'remote_services': 'remote_services_name',
+        'insurance_limit': 'insurance_limit_name',
+    }
+    SOURCE_CHOICES = (
+        ('name', 'Location Name'),
+        ('eft', 'EFT System'),
+        ('remote_services', 'Remote Services'),
+        ('insurance_limit', 'Insurance Limit'),
+    )
+
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='aliases')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    name = models.CharField(max_length=255)
+    normalized_name = models.CharField(max_length=255)
+
+    class Meta:
+        verbose_name = "Location Alias"
+        verbose_name_plural = "Location Aliases"
+        unique_together = ['location', 'source']
+        indexes = [
+            models.Index(fields=['source', 'normalized_name'], name='core_locationalias_name_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_source_display()}) -> {self.location.name}"
+
+    @classmethod
+    def sync_aliases(cls, locations):
+        """Rewrite the aliases of the given locations from their name fields."""
+        locations = list(locations)
+        aliases = [
+            cls(location=location, source=source, name=getattr(location, field).strip(),
+                normalized_name=normalize_location_name(getattr(location, field)))
+            for location in locations
+            for source, field in cls.SOURCE_FIELDS.items()
+            if getattr(location, field).strip()
+        ]
+        with transaction.atomic():
+            cls.objects.filter(location__in=locations).delete()
+            cls.objects.bulk_create(aliases, batch_size=500)
+
+
+@receiver(post_save, sender=Location)
+def location_saved(sender, instance, **kwargs):
+    """Keep the location's aliases in step with its name fields."""
+    LocationAlias.sync_aliases([instance])
+
+
+class CashRollup(models.Model):
+    """
+    Pre-aggregated cash figures for one location, parish or the whole network
+    over one period, maintained by core.rollups from daily positions,
+    statements, deliveries and EOD reports. Rows are addressed by ``key``
+    ('location:<id>', 'parish:<name>' or 'network') so a chart series is a
+    single indexed range read.
+    """
+    SCOPE_CHOICES = (
+        ('location', 'Location'),
+        ('parish', 'Parish'),
+        ('network', 'Network'),
+    )
+    GRAIN_CHOICES = (
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    )
+
+    key = models.CharField(max_length=100)
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, null=True, blank=True, related_name='cash_rollups')
+    parish = models.CharField(max_length=255, blank=True, default='')
+    grain = models.CharField(max_length=10, choices=GRAIN_CHOICES, default='day')
+    period_start = models.DateField()
+    # Closing balance on the last day of the period that has one, and the total and count
+    # of daily closing balances in it (their average is the period's average balance)
+    closing_balance = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    closing_balance_sum = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    closing_balance_count = models.PositiveIntegerField(default=0)
+    eft_inbound = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    eft_outbound = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    # Remote Services pay principal, or EFT outbound on days without Remote Services figures
+    payouts = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    payout_count = models.PositiveIntegerField(default=0)
+    deliveries_jmd = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    deliveries_usd = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    delivery_count = models.PositiveIntegerField(default=0)
+    variance = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    eod_report_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Cash Rollup"
+        verbose_name_plural = "Cash Rollups"
+        unique_together = ['key', 'grain', 'period_start']
+        indexes = [
+            # Composition charts: every location or parish row of one period
+            models.Index(fields=['grain', 'period_start', 'scope'], name='core_cashrollup_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} {self.grain} {self.period_start}"
+
+
+class DeferredTask(models.Model):
+    """
+    Follow-up work of a change (ledger postings, rollup refreshes, limit
+    checks) queued when it commits and run by the import worker, so the
+    request that made the change does not wait for it (see core.tasks).
+    """
+    KIND_CHOICES = (
+        ('eod_ledger', 'EOD Report Ledger Postings'),
+        ('rollups', 'Cash Rollup Refresh'),
+        ('limits', 'Limit Breach Check'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    args = models.JSONField(encoder=DjangoJSONEncoder)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Deferred Task"
+        verbose_name_plural = "Deferred Tasks"
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} {self.args}"
+
+
+class CashLedgerEntry(models.Model):
+    """
+    One cash movement at a location, in JMD. Entries are only ever appended
+    (see core.ledger): a correction is a further entry against the same
+    reference, and ``balance_after`` is the location's running balance once
+    the entry was recorded, so the position at any moment is one indexed read.
+    """
+    ENTRY_TYPE_CHOICES = (
+        ('delivery', 'Delivery Verified'),
+        ('payout', 'Payout'),
+        ('courier_pickup', 'Courier Pickup'),
+        ('eod_close', 'EOD Close'),
+        ('adjustment', 'Adjustment'),
+    )
+
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='ledger_entries')
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE_CHOICES)
+    # Record the entry posts, e.g. "delivery:12" or "eod:7:courier"
+    reference = models.CharField(max_length=100, db_index=True)
+    business_date = models.DateField()
+    amount = models.DecimalField(max_digits=18, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=18, decimal_places=2)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Cash Ledger Entry"
+        verbose_name_plural = "Cash Ledger Entries"
+        indexes = [
+            # Position as of a moment: the location's latest entry recorded by then
+            models.Index(fields=['location', 'recorded_at', 'id'], name='core_ledger_recorded_idx'),
+            models.Index(fields=['location', 'business_date'], name='core_ledger_business_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Cash ledger entries are append-only.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.location.name} {self.get_entry_type_display()} {self.amount} ({self.reference})"
+
+
+class CashPosition(models.Model):
+    """
+    A location's running ledger balance, updated with every entry appended.
+    The row is locked while entries are appended, so postings for one
+    location are serialized and ``balance_after`` forms an unbroken chain.
+    """
+    location = models.OneToOneField(Location, on_delete=models.CASCADE, related_name='cash_position')
+    balance = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    last_entry = models.ForeignKey(CashLedgerEntry, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Processing date of the latest EOD count; movements dated up to it are reconciled to the count
+    closed_through = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Cash Position"
+        verbose_name_plural = "Cash Positions"
+
+    def __str__(self):
+        return f"{self.location.name}: {self.balance}"
+
+
+class CashLedgerCheckpoint(models.Model):
+    """
+    A location's verified ledger balance at the end of a business day,
+    written by the checkpoint_cash_ledger command once the entries since
+    the previous checkpoint add up.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='ledger_checkpoints')
+    business_date = models.DateField()
+    balance = models.DecimalField(max_digits=18, decimal_places=2)
+    last_entry = models.ForeignKey(CashLedgerEntry, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    entry_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Cash Ledger Checkpoint"
+        verbose_name_plural = "Cash Ledger Checkpoints"
+        unique_together = ['location', 'business_date']
+
+    def __str__(self):
+        return f"{self.location.name} {self.business_date}: {self.balance}"
+
+
+@receiver(post_save, sender=DailyAgentData)
+@receiver(post_delete, sender=DailyAgentData)
+@receiver(post_save, sender=CashDelivery)
+@receiver(post_delete, sender=CashDelivery)
+@receiver(post_save, sender=EODReport)
+@receiver(post_delete, sender=EODReport)
+def cash_rollup_source_changed(sender, instance, **kwargs):
+    """Have the worker refresh the rollups of the record's date."""
+    from .tasks import defer
+    defer('rollups', date=instance.processing_date if sender is EODReport else instance.date)
+
+
+class LiveEvent(models.Model):
+    """
+    A change pushed to the admins watching the dashboard (see core.live).
+    Rows are written once the change commits and pruned after a day; the
+    id is the Server-Sent Events id browsers resume from.
+    """
+    KIND_CHOICES = (
+        ('cash_request', 'Cash Request'),
+        ('eod_report', 'EOD Report'),
+        ('limit_breach', 'Limit Breach'),
+        ('emergency_access', 'Emergency Access Request'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Live Event"
+        verbose_name_plural = "Live Events"
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind}"
+
+
+class NotificationEvent(models.Model):
+    """
+    Outbox of things users are told about (see core.notifications). Rows
+    are written when the change commits; the dispatcher turns them into
+    per-recipient digests and deletes them.
+    """
+    KIND_CHOICES = (
+        ('eod_report', 'EOD Report Submitted'),
+        ('cash_request', 'Cash Request Submitted'),
+        ('delivery_verified', 'Cash Delivery Verified'),
+        ('emergency_access', 'Emergency Access Requested'),
+        ('cash_request_decided', 'Cash Request Decided'),
+        ('emergency_access_decided', 'Emergency Access Decided'),
+    )
+    AUDIENCE_CHOICES = (
+        ('admins', 'Administrators'),
+        ('location', 'Location Agents'),
+    )
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    audience = models.CharField(max_length=10, choices=AUDIENCE_CHOICES, default='admins')
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, null=True, blank=True)
+    # Not told about their own submissions
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    message = models.CharField(max_length=255)
+    related_url = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Notification Event"
+        verbose_name_plural = "Notification Events"
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.message}"
+
+
+class Notification(models.Model):
+    """A digest of notification events for one user, shown in the app and emailed if they have an address."""
+    TYPE_CHOICES = (
+        ('info', 'Information'),
+        ('success', 'Success'),
+        ('warning', 'Warning'),
+        ('danger', 'Danger'),
+    )
+    EMAIL_STATUS_CHOICES = (
+        ('none', 'Not Emailed'),
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=10, choices=TYPE_CHOICES, default='info')
+    related_url = models.CharField(max_length=255, blank=True)
+    event_count = models.PositiveIntegerField(default=1)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    email_status = models.CharField(max_length=10, choices=EMAIL_STATUS_CHOICES, default='none')
+    email_attempts = models.PositiveSmallIntegerField(default=0)
+    emailed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='core_notification_user_idx'),
+            models.Index(fields=['id'], condition=Q(email_status='pending'), name='core_notification_email_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.title}"
+
+
+@receiver(post_save, sender=CashRequest)
+@receiver(post_delete, sender=CashRequest)
+def cash_request_live(sender, instance, **kwargs):
+    """Push the new or updated request to the admin dashboards."""
+    from .live import cash_request_payload, publish
+    publish('cash_request', cash_request_payload(instance, deleted=kwargs.get('signal') is post_delete))
+
+
+@receiver(post_save, sender=EODReport)
+def eod_report_live(sender, instance, created, **kwargs):
+    """Push the submitted report to the admin dashboards."""
+    from .live import eod_report_payload, publish
+    publish('eod_report', eod_report_payload(instance, created))
+
+
+@receiver(post_save, sender=EmergencyAccessRequest)
+def emergency_access_live(sender, instance, **kwargs):
+    """Push the new or reviewed emergency access request to the admin dashboards."""
+    from .live import emergency_access_payload, publish
+    publish('emergency_access', emergency_access_payload(instance))
+
+
+def _location_deleted(origin):
+    # The location's ledger goes with it: nothing to reverse
+    model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    return model is Location
+
+
+@receiver(post_save, sender=CashDelivery)
+@receiver(post_delete, sender=CashDelivery)
+def cash_delivery_ledger(sender, instance, **kwargs):
+    """Post the delivery to the cash ledger once verified (and reverse it if unverified or deleted)."""
+    from .ledger import post_deliveries
+    if not _location_deleted(kwargs.get('origin')):
+        post_deliveries([instance], deleted=kwargs.get('signal') is post_delete)
+
+
+@receiver(post_save, sender=EODReport)
+@receiver(post_delete, sender=EODReport)
+def eod_report_ledger(sender, instance, **kwargs):
+    """
+    Have the worker post the report's courier pickup, adjustments and EOD
+    count to the cash ledger, or reverse them now if it is deleted.
+    """
+    from .ledger import sync_eod_reports
+    from .tasks import defer
+    if kwargs.get('signal') is post_save:
+        defer('eod_ledger', report_id=instance.pk)
+    elif not _location_deleted(kwargs.get('origin')):
+        sync_eod_reports([instance], deleted=True)
+
+
+@receiver(post_save, sender=Adjustment)
+@receiver(post_delete, sender=Adjustment)
+def adjustment_ledger(sender, instance, **kwargs):
+    """Post the adjustment to the cash ledger (and reverse it if deleted)."""
+    from .ledger import post_adjustment
+    if not _location_deleted(kwargs.get('origin')):
+        post_adjustment(instance, deleted=kwargs.get('signal') is post_delete)
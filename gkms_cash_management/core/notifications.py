@@ -0,0 +1,278 @@
+"""
+Notifications: admins hear about agent submissions (EOD reports, cash
+requests, verified deliveries, emergency access requests) and agents about
+decisions on their location's requests.
+
+The code making a change only queues a NotificationEvent once its
+transaction commits (one insert); nothing is sent while the agent waits.
+The dispatch_notifications worker collects the queued events, and once the
+oldest has waited DIGEST_WINDOW it sends each recipient one digest of
+everything queued for them: an in-app Notification, and an email if the
+user has an address. A burst of 100 EOD submissions in ten minutes becomes
+two or three digests per admin rather than 100 emails each. Emails go out
+over one SMTP connection per pass and are retried up to MAX_EMAIL_ATTEMPTS
+times.
+"""
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import AgentProfile, Notification, NotificationEvent
+
+logger = logging.getLogger(__name__)
+
+DIGEST_WINDOW = timedelta(minutes=5)
+# Events taken per pass; the rest wait for the next one
+MAX_EVENTS = 2000
+# Events listed in a digest's message
+DIGEST_LINES = 20
+EMAIL_BATCH_SIZE = 200
+MAX_EMAIL_ATTEMPTS = 5
+
+# kind: (one, many) as counted in digest titles
+SUMMARY_LABELS = {
+    'eod_report': ('EOD report submitted', 'EOD reports submitted'),
+    'cash_request': ('cash request submitted', 'cash requests submitted'),
+    'delivery_verified': ('delivery verified', 'deliveries verified'),
+    'emergency_access': ('emergency access request', 'emergency access requests'),
+    'cash_request_decided': ('cash request decided', 'cash requests decided'),
+    'emergency_access_decided': ('emergency access decision', 'emergency access decisions'),
+}
+WARNING_KINDS = {'emergency_access'}
+
+
+def enqueue(*events):
+    """Queue unsaved NotificationEvents for the dispatcher once the current transaction commits."""
+    if events:
+        transaction.on_commit(lambda: NotificationEvent.objects.bulk_create(events))
+
+
+def _event(kind, message, **fields):
+    return NotificationEvent(kind=kind, message=message[:255], **fields)
+
+
+def eod_report_event(report, created):
+    return _event(
+        'eod_report',
+        f"{report.location.name}: EOD report for {report.processing_date:%d %b %Y} "
+        f"{'submitted' if created else 'resubmitted'} by {report.agent.username}, "
+        f"closing balance J${report.closing_balance:,.2f}",
+        location=report.location,
+        actor=report.agent,
+        related_url=reverse('review_eod_report', args=[report.pk]),
+    )
+
+
+def cash_request_event(cash_request, agent):
+    return _event(
+        'cash_request',
+        f"{cash_request.location.name}: cash request for J${cash_request.total_jmd:,.2f} / "
+        f"US${cash_request.total_usd:,.2f}, delivery {cash_request.delivery_date:%d %b %Y}",
+        location=cash_request.location,
+        actor=agent,
+        related_url=reverse('approve_cash_request', args=[cash_request.pk]),
+    )
+
+
+def delivery_verified_event(delivery, agent):
+    return _event(
+        'delivery_verified',
+        f"{delivery.location.name}: delivery of J${delivery.jmd_amount:,.2f} / US${delivery.usd_amount:,.2f} "
+        f"for {delivery.date:%d %b %Y} verified by {agent.username}",
+        location=delivery.location,
+        actor=agent,
+        related_url=reverse('location_detail', args=[delivery.location_id]),
+    )
+
+
+def emergency_access_event(access_request):
+    return _event(
+        'emergency_access',
+        f"{access_request.agent.username} ({access_request.location.name}) requested emergency access: "
+        f"{access_request.reason}",
+        location=access_request.location,
+        actor=access_request.agent,
+        related_url=reverse('review_emergency_requests'),
+    )
+
+
+def cash_request_decided_event(cash_request, reviewer):
+    return _event(
+        'cash_request_decided',
+        f"Cash request for J${cash_request.total_jmd:,.2f} / US${cash_request.total_usd:,.2f} "
+        f"{cash_request.status}, delivery {cash_request.delivery_date:%d %b %Y}",
+        audience='location',
+        location_id=cash_request.location_id,
+        actor=reviewer,
+        related_url=reverse('agent_dashboard'),
+    )
+
+
+def emergency_access_decided_event(access_request):
+    message = f"Emergency access request {access_request.status}"
+    if access_request.access_granted_until:
+        message += f", until {timezone.localtime(access_request.access_granted_until):%I:%M %p}"
+    return _event(
+        'emergency_access_decided',
+        message,
+        audience='location',
+        location_id=access_request.location_id,
+        actor=access_request.reviewed_by,
+        related_url=reverse('agent_dashboard'),
+    )
+
+
+def recent_notifications(user, limit=5):
+    """The user's latest ``limit`` notifications, for the dashboards."""
+    return list(Notification.objects.filter(user=user)[:limit])
+
+
+def mark_all_read(user):
+    return Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+
+
+def _recipients(events):
+    """{user_id: (user, [events])}: each event goes to its audience, less the user who caused it."""
+    admins = []
+    if any(event.audience == 'admins' for event in events):
+        admins = list(User.objects.filter(is_staff=True, is_active=True))
+    agents = defaultdict(list)
+    location_ids = {event.location_id for event in events if event.audience == 'location'}
+    if location_ids:
+        for profile in AgentProfile.objects.filter(
+            location_id__in=location_ids, user__is_active=True,
+        ).select_related('user'):
+            agents[profile.location_id].append(profile.user)
+
+    recipients = {}
+    for event in events:
+        for user in admins if event.audience == 'admins' else agents[event.location_id]:
+            if user.id != event.actor_id:
+                recipients.setdefault(user.id, (user, []))[1].append(event)
+    return recipients
+
+
+def build_digest(user, events):
+    """An unsaved Notification for ``user`` covering ``events``."""
+    if len(events) == 1:
+        title = events[0].get_kind_display()
+    else:
+        counts = Counter(event.kind for event in events)
+        title = ', '.join(
+            f"{count} {SUMMARY_LABELS[kind][count > 1]}" for kind, count in counts.most_common()
+        )
+    lines = [event.message for event in events[:DIGEST_LINES]]
+    if len(events) > DIGEST_LINES:
+        lines.append(f"...and {len(events) - DIGEST_LINES} more")
+
+    urls = {event.related_url for event in events}
+    if len(urls) == 1:
+        related_url = urls.pop()
+    else:
+        related_url = reverse('admin_dashboard' if user.is_staff else 'agent_dashboard')
+    return Notification(
+        user=user,
+        title=title[:255],
+        message='\n'.join(lines),
+        notification_type='warning' if any(event.kind in WARNING_KINDS for event in events) else 'info',
+        related_url=related_url,
+        event_count=len(events),
+        email_status='pending' if user.email else 'none',
+    )
+
+
+def dispatch(now=None, window=DIGEST_WINDOW):
+    """
+    Send the queued events as one digest per recipient once the oldest has
+    waited ``window``. Returns the Notifications created (none if it has not).
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        events = list(
+            NotificationEvent.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('location')
+            .order_by('id')[:MAX_EVENTS]
+        )
+        if not events or events[0].created_at > now - window:
+            return []
+        notifications = Notification.objects.bulk_create([
+            build_digest(user, user_events) for user, user_events in _recipients(events).values()
+        ])
+        NotificationEvent.objects.filter(id__in=[event.id for event in events]).delete()
+    logger.info("Dispatched %s notification events as %s digests", len(events), len(notifications))
+    return notifications
+
+
+def _email(notification, connection):
+    body = notification.message
+    if notification.related_url:
+        body += f"\n\n{settings.SITE_URL}{notification.related_url}"
+    return EmailMessage(
+        subject=f"{settings.EMAIL_SUBJECT_PREFIX}{notification.title}",
+        body=body,
+        to=[notification.user.email],
+        connection=connection,
+    )
+
+
+def _send(notifications):
+    """Email ``notifications`` over one connection. Returns the ids sent."""
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception:
+        logger.exception("Could not connect to the mail server")
+        return set()
+    sent = set()
+    try:
+        for notification in notifications:
+            try:
+                _email(notification, connection).send()
+                sent.add(notification.id)
+            except Exception:
+                logger.exception("Emailing notification #%s to %s failed", notification.pk, notification.user.email)
+    finally:
+        connection.close()
+    return sent
+
+
+def send_emails(limit=EMAIL_BATCH_SIZE):
+    """Email up to ``limit`` pending digests. Returns (sent, failed for good)."""
+    with transaction.atomic():
+        notifications = list(
+            Notification.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(email_status='pending')
+            .select_related('user')
+            .order_by('id')[:limit]
+        )
+        if not notifications:
+            return 0, 0
+        # The address may have been removed since the digest was built
+        sendable = [notification for notification in notifications if notification.user.email]
+        sent = _send(sendable) if sendable else set()
+
+        now = timezone.now()
+        failed = 0
+        for notification in notifications:
+            if not notification.user.email:
+                notification.email_status = 'none'
+            elif notification.id in sent:
+                notification.email_status = 'sent'
+                notification.emailed_at = now
+                notification.email_attempts += 1
+            else:
+                notification.email_attempts += 1
+                if notification.email_attempts >= MAX_EMAIL_ATTEMPTS:
+                    notification.email_status = 'failed'
+                    failed += 1
+        Notification.objects.bulk_update(notifications, ['email_status', 'email_attempts', 'emailed_at'])
+    if sent or failed:
+        logger.info("Emailed %s notifications (%s failed for good)", len(sent), failed)
+    return len(sent), failed
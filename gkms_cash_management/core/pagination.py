@@ -0,0 +1,172 @@
+"""
+Keyset (seek) pagination for the large listings.
+
+Instead of OFFSET, a page starts after (or before) the sort key of the last
+row the user saw, carried in an opaque ``cursor`` query parameter, so a deep
+page costs the same as the first one. The ordering must end in a unique
+field (usually ``id``) and its fields must not be NULL. The total is only
+counted on request, and only up to COUNT_LIMIT rows.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+CURSOR_PARAM = 'cursor'
+
+# approximate_count stops counting here and reports the count as "at least"
+COUNT_LIMIT = 10000
+
+
+def _encode_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot use {type(value).__name__} in a pagination cursor")
+
+
+def encode_cursor(values, direction):
+    payload = json.dumps({'d': direction, 'v': values}, default=_encode_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (values, direction), or None for a missing or malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values, direction = payload['v'], payload['d']
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        return None
+    if direction not in ('next', 'previous') or not isinstance(values, list):
+        return None
+    return values, direction
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator; iterate it like a Django Page."""
+
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return encode_cursor(self.paginator.key(self.object_list[-1]), 'next')
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return encode_cursor(self.paginator.key(self.object_list[0]), 'previous')
+
+
+class KeysetPaginator:
+    """
+    Paginates ``queryset`` by ``ordering``, a sequence of field names as for
+    order_by (``'-statement_date'``, ``'location__name'``, ``'id'``).
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        self._count = None
+
+    def key(self, obj):
+        """The sort key of a row, following ``__`` through related objects."""
+        values = []
+        for field, _ in self.ordering:
+            value = obj
+            for attr in field.split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def _order_by(self, reverse=False):
+        return [
+            f"{'-' if descending != reverse else ''}{field}"
+            for field, descending in self.ordering
+        ]
+
+    def _seek(self, values, reverse=False):
+        """Rows after ``values`` in the ordering (before them if reverse)."""
+        conditions = []
+        for position, (field, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            equal = {prior: values[index] for index, (prior, _) in enumerate(self.ordering[:position])}
+            conditions.append(Q(**equal, **{f'{field}__{lookup}': values[position]}))
+        # The redundant bound on the leading field lets the database walk its index
+        # in order from the cursor instead of collecting and sorting every row past it
+        field, descending = self.ordering[0]
+        bound = Q(**{f"{field}__{'lte' if descending != reverse else 'gte'}": values[0]})
+        return bound & reduce(lambda left, right: left | right, conditions)
+
+    def page(self, cursor=None):
+        """The page after (or before) the cursor; the first page for a missing or invalid one."""
+        decoded = decode_cursor(cursor)
+        queryset = None
+        if decoded is not None and len(decoded[0]) == len(self.ordering):
+            values, direction = decoded
+            reverse = direction == 'previous'
+            try:
+                queryset = self.queryset.filter(self._seek(values, reverse))
+            except (ValidationError, ValueError, TypeError):
+                # Cursor values that do not fit the fields (a hand-edited URL)
+                queryset = None
+
+        if queryset is None:
+            rows = list(self.queryset.order_by(*self._order_by())[:self.per_page + 1])
+            return KeysetPage(self, rows[:self.per_page], len(rows) > self.per_page, False)
+
+        rows = list(queryset.order_by(*self._order_by(reverse))[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            return KeysetPage(self, rows, True, more)
+        return KeysetPage(self, rows, more, True)
+
+    def _counted(self):
+        if self._count is None:
+            # COUNT over a LIMITed subquery, so huge tables are not counted in full
+            self._count = self.queryset.order_by()[:COUNT_LIMIT + 1].count()
+        return self._count
+
+    @property
+    def approximate_count(self):
+        """Number of rows, counted up to COUNT_LIMIT (see count_is_exact)."""
+        return min(self._counted(), COUNT_LIMIT)
+
+    @property
+    def count_is_exact(self):
+        return self._counted() <= COUNT_LIMIT
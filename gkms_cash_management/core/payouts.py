@@ -0,0 +1,236 @@
+"""
+Historical average-payout engine.
+
+A location's payout for a day is the sum of its JMD Remote Services Pay
+Principal for that statement date, falling back to the EFT Outbound figure
+on days without a Remote Services upload. USD payouts are a separate cash
+position and are never added in. Averages over the rolling 90 days
+up to each statement date, and over each seasonal window (Christmas, Easter,
+Back to School, Mother's Day), are stored in PayoutAverage so that
+get_average_payout is a single indexed read.
+"""
+import logging
+from bisect import bisect_left
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from .models import EFTData, PayoutAverage, RemoteServicesData
+
+logger = logging.getLogger(__name__)
+
+ROLLING_DAYS = 90
+ROLLING_WINDOW = 'rolling_90'
+
+NO_HISTORY = Decimal('0.00')
+
+
+def easter_sunday(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def season_windows(year):
+    """Seasonal windows anchored in the given year, as {window: (start, end)}."""
+    easter = easter_sunday(year)
+    may_first = date(year, 5, 1)
+    # Mother's Day in Jamaica is the second Sunday in May
+    mothers_day = may_first + timedelta(days=(6 - may_first.weekday()) % 7 + 7)
+    return {
+        'christmas': (date(year, 12, 15), date(year + 1, 1, 2)),
+        'easter': (easter - timedelta(days=9), easter + timedelta(days=1)),
+        'back_to_school': (date(year, 8, 15), date(year, 9, 7)),
+        'mothers_day': (mothers_day - timedelta(days=6), mothers_day),
+    }
+
+
+def season_for(day):
+    """Return (window, start, end) of the seasonal window containing day, or None."""
+    # Christmas windows run into January, so also check the windows anchored in the previous year
+    for year in (day.year, day.year - 1):
+        for window, (start, end) in season_windows(year).items():
+            if start <= day <= end:
+                return window, start, end
+    return None
+
+
+def daily_payouts(location_ids, start, end, currency='JMD'):
+    """Return {location_id: {date: payout}} in ``currency`` for the date range, in two queries."""
+    payouts = {}
+    # EFT figures are JMD only
+    if currency == 'JMD':
+        for location_id, statement_date, outbound in EFTData.objects.filter(
+            location_id__in=location_ids, statement_date__range=(start, end)
+        ).values_list('location_id', 'statement_date', 'outbound'):
+            payouts.setdefault(location_id, {})[statement_date] = outbound
+
+    # Remote Services figures take precedence over EFT for the same day
+    for row in RemoteServicesData.objects.filter(
+        location_id__in=location_ids, currency=currency, statement_date__range=(start, end)
+    ).values('location_id', 'statement_date').annotate(total=Sum('pay_principal')):
+        payouts.setdefault(row['location_id'], {})[row['statement_date']] = row['total']
+    return payouts
+
+
+def _average(location_id, window, start, end, values):
+    total = sum(values, Decimal('0.00'))
+    return PayoutAverage(
+        location_id=location_id,
+        window=window,
+        period_start=start,
+        period_end=end,
+        days_observed=len(values),
+        total_payout=total,
+        average_payout=(total / len(values)).quantize(Decimal('0.01')),
+    )
+
+
+def refresh_payout_averages(location_ids, dates):
+    """
+    Recompute the PayoutAverage rows affected by new or changed payout data
+    for the given locations on the given statement dates.
+
+    A change on day D affects the rolling averages ending on D..D+89 and the
+    seasonal window containing D, so only those rows are rewritten.
+    """
+    location_ids = set(location_ids)
+    dates = set(dates)
+    if not location_ids or not dates:
+        return 0
+
+    first, last = min(dates), max(dates)
+    rolling_span = timedelta(days=ROLLING_DAYS - 1)
+    seasons = {season_for(day) for day in dates} - {None}
+
+    load_start = min([first - rolling_span] + [start for _, start, _ in seasons])
+    load_end = max([last + rolling_span] + [end for _, _, end in seasons])
+    payouts = daily_payouts(location_ids, load_start, load_end)
+
+    averages = []
+    for location_id, by_date in payouts.items():
+        days = sorted(by_date)
+        # Rolling windows ending on each statement date affected by the change
+        window_start = 0
+        for index, end in enumerate(days):
+            while days[window_start] < end - rolling_span:
+                window_start += 1
+            if first <= end <= last + rolling_span:
+                values = [by_date[day] for day in days[window_start:index + 1]]
+                averages.append(_average(location_id, ROLLING_WINDOW, end - rolling_span, end, values))
+
+        for window, start, end in seasons:
+            values = [by_date[day] for day in days if start <= day <= end]
+            if values:
+                averages.append(_average(location_id, window, start, end, values))
+
+    with transaction.atomic():
+        PayoutAverage.objects.bulk_create(
+            averages,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['location', 'window', 'period_end'],
+            update_fields=['period_start', 'days_observed', 'total_payout', 'average_payout', 'updated_at'],
+        )
+    logger.info("Refreshed %s payout averages for %s locations", len(averages), len(location_ids))
+    return len(averages)
+
+
+def get_average_payout(location_id, day, days=ROLLING_DAYS, seasonal=None):
+    """
+    Average daily payout for a location, read from PayoutAverage.
+
+    In a seasonal window the same window last year is used if the location
+    has data for it; otherwise the rolling 90-day average up to the most
+    recent statement before ``day`` (within the last 90 days). Pass seasonal=False to skip the seasonal
+    lookup. Returns 0.00 when the location has no payout history.
+    """
+    if days != ROLLING_DAYS:
+        raise ValueError(f"Only {ROLLING_DAYS}-day averages are precomputed")
+
+    season = season_for(day) if seasonal is not False else None
+    if season is not None:
+        window, start, _ = season
+        _, last_year_end = season_windows(start.year - 1)[window]
+        average = PayoutAverage.objects.filter(
+            location_id=location_id, window=window, period_end=last_year_end
+        ).values_list('average_payout', flat=True).first()
+        if average is not None:
+            return average
+
+    average = PayoutAverage.objects.filter(
+        location_id=location_id,
+        window=ROLLING_WINDOW,
+        period_end__lt=day,
+        period_end__gte=day - timedelta(days=ROLLING_DAYS),
+    ).order_by('-period_end').values_list('average_payout', flat=True).first()
+    return average if average is not None else NO_HISTORY
+
+
+def get_average_payouts(location_ids, days):
+    """
+    Batch form of get_average_payout: {(location_id, day): average} for every
+    location and day, read in at most two queries.
+    """
+    location_ids = list(location_ids)
+    days = sorted(set(days))
+    averages = {}
+    if not location_ids or not days:
+        return averages
+
+    # Seasonal days: last year's window, for every location at once
+    seasonal_days = {}
+    for day in days:
+        season = season_for(day)
+        if season is not None:
+            window, start, _ = season
+            seasonal_days[day] = (window, season_windows(start.year - 1)[window][1])
+    if seasonal_days:
+        season_filter = Q()
+        for window, period_end in set(seasonal_days.values()):
+            season_filter |= Q(window=window, period_end=period_end)
+        seasonal = {
+            (location_id, window, period_end): average
+            for location_id, window, period_end, average in PayoutAverage.objects.filter(
+                season_filter, location_id__in=location_ids
+            ).values_list('location_id', 'window', 'period_end', 'average_payout')
+        }
+        for day, (window, period_end) in seasonal_days.items():
+            for location_id in location_ids:
+                average = seasonal.get((location_id, window, period_end))
+                if average is not None:
+                    averages[(location_id, day)] = average
+
+    # Rolling: the latest average ending before each day (looking back at most one window)
+    rolling = {}
+    for location_id, period_end, average in PayoutAverage.objects.filter(
+        location_id__in=location_ids,
+        window=ROLLING_WINDOW,
+        period_end__gte=days[0] - timedelta(days=ROLLING_DAYS),
+        period_end__lt=days[-1],
+    ).order_by('period_end').values_list('location_id', 'period_end', 'average_payout'):
+        rolling.setdefault(location_id, []).append((period_end, average))
+
+    for location_id in location_ids:
+        history = rolling.get(location_id, [])
+        ends = [period_end for period_end, _ in history]
+        for day in days:
+            if (location_id, day) in averages:
+                continue
+            index = bisect_left(ends, day)
+            if index and ends[index - 1] >= day - timedelta(days=ROLLING_DAYS):
+                averages[(location_id, day)] = history[index - 1][1]
+            else:
+                averages[(location_id, day)] = NO_HISTORY
+    return averages
@@ -0,0 +1,27 @@
+"""
+Querysets built by the views and also checked by core.hot_queries.
+
+The views and the hot-query registry both call these, so EXPLAIN runs the
+query a page actually sends.
+"""
+from .models import CashRequest, EmergencyAccessRequest, RemoteServicesData
+
+
+def pending_cash_requests():
+    """Cash requests awaiting a decision (admin dashboard)."""
+    return CashRequest.objects.filter(status='pending').select_related('location')
+
+
+def pending_emergency_requests():
+    """Emergency access requests awaiting review, newest first (model ordering)."""
+    return EmergencyAccessRequest.objects.filter(status='pending')
+
+
+def latest_remote_services(location):
+    """The location's Remote Services rows, latest statement first; the location page takes the first."""
+    return RemoteServicesData.objects.filter(location=location).order_by('-statement_date')
+
+
+def location_remote_services(location, statement_date):
+    """The location's Remote Services rows of one statement, by currency."""
+    return RemoteServicesData.objects.filter(location=location, statement_date=statement_date).order_by('currency', 'id')
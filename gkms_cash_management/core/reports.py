@@ -0,0 +1,291 @@
+"""
+Report exports for the generate_report page.
+
+Each dataset is a flat ``values_list`` query (child rows are joined or
+aggregated in SQL) read with ``iterator(chunk_size=...)``, so an export never
+holds more than one chunk of rows in memory. CSV is streamed to the client
+as rows are read. XLSX is written with a write-only openpyxl workbook, which
+spools rows to disk instead of building the sheet in memory, and the
+finished file is streamed from there.
+
+Under ASGI, Django reads a synchronous streaming iterator into a list
+before sending anything, so generate_report wraps the generators in
+stream_in_thread: they run in a thread of their own and hand buffered
+chunks over a bounded queue, and the download still starts at once with
+flat memory.
+"""
+import asyncio
+import csv
+import tempfile
+import threading
+
+import openpyxl
+from django.db import connections
+from django.db.models import Count, DecimalField, FilteredRelation, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import DailyAgentData, EFTData, EODReport, RemoteServicesData, TellerBalance
+
+CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class ReportDataset:
+    """
+    A report: column headers and value paths for values_list, the date and
+    location fields the filters apply to, and an optional hook that
+    annotates the base queryset.
+    """
+
+    def __init__(self, label, model, date_field, columns, ordering, location_field='location', prepare=None):
+        self.label = label
+        self.model = model
+        self.date_field = date_field
+        self.location_field = location_field
+        self.columns = columns
+        self.ordering = ordering
+        self.prepare = prepare
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def queryset(self, start, end, locations=None):
+        queryset = self.model.objects.filter(**{f'{self.date_field}__range': (start, end)})
+        if locations:
+            queryset = queryset.filter(**{f'{self.location_field}__in': locations})
+        if self.prepare:
+            queryset = self.prepare(queryset)
+        return queryset.order_by(*self.ordering).values_list(*[path for _, path in self.columns])
+
+    def rows(self, start, end, locations=None):
+        return self.queryset(start, end, locations).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _teller_total(field):
+    return Coalesce(
+        Subquery(
+            TellerBalance.objects.filter(eod_report=OuterRef('pk'))
+            .order_by().values('eod_report').annotate(total=Sum(field)).values('total')
+        ),
+        Value(0),
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+
+
+def _prepare_eod_reports(queryset):
+    # One breakdown per currency (unique per report), so these joins never multiply rows
+    return queryset.annotate(
+        jmd=FilteredRelation('denomination_breakdowns', condition=Q(denomination_breakdowns__currency='JMD')),
+        usd=FilteredRelation('denomination_breakdowns', condition=Q(denomination_breakdowns__currency='USD')),
+        teller_count=Coalesce(
+            Subquery(
+                TellerBalance.objects.filter(eod_report=OuterRef('pk'))
+                .order_by().values('eod_report').annotate(count=Count('id')).values('count')
+            ),
+            0,
+        ),
+        teller_jmd_total=_teller_total('jmd_amount'),
+        teller_usd_total=_teller_total('usd_amount'),
+    )
+
+
+DATASETS = {
+    'eod_reports': ReportDataset(
+        'EOD Reports (with denominations and teller totals)', EODReport, 'processing_date',
+        [
+            ('Processing Date', 'processing_date'),
+            ('Location', 'location__name'),
+            ('Agent', 'agent__username'),
+            ('Closing Balance', 'closing_balance'),
+            ('Funds From BXP/Webex', 'funds_from_bxp_webex'),
+            ('Sent To Courier', 'cash_sent_to_courier'),
+            ('Courier JMD Amount', 'courier_jmd_amount'),
+            ('Courier JMD Receipt', 'courier_jmd_receipt'),
+            ('Courier USD Amount', 'courier_usd_amount'),
+            ('Courier USD Receipt', 'courier_usd_receipt'),
+            ('All Tellers Balanced', 'all_tellers_balanced'),
+            ('Total Variance', 'total_variance'),
+            ('JMD 5000 Count', 'jmd__denomination_5000_count'),
+            ('JMD 1000 Count', 'jmd__denomination_1000_count'),
+            ('JMD 500 Count', 'jmd__denomination_500_count'),
+            ('JMD 100 Count', 'jmd__denomination_100_count'),
+            ('JMD 50 Count', 'jmd__denomination_50_count'),
+            ('JMD Coins', 'jmd__coins_amount'),
+            ('USD 100 Count', 'usd__denomination_100_count'),
+            ('USD 50 Count', 'usd__denomination_50_count'),
+            ('USD 20 Count', 'usd__denomination_20_count'),
+            ('USD 10 Count', 'usd__denomination_10_count'),
+            ('USD Small Bills/Coins', 'usd__small_bills_coins_amount'),
+            ('Tellers', 'teller_count'),
+            ('Teller JMD Total', 'teller_jmd_total'),
+            ('Teller USD Total', 'teller_usd_total'),
+            ('Notes', 'notes'),
+        ],
+        ['processing_date', 'location__name', 'id'],
+        prepare=_prepare_eod_reports,
+    ),
+    'eod_tellers': ReportDataset(
+        'EOD Teller Balances', TellerBalance, 'eod_report__processing_date',
+        [
+            ('Processing Date', 'eod_report__processing_date'),
+            ('Location', 'eod_report__location__name'),
+            ('Agent', 'eod_report__agent__username'),
+            ('Teller', 'teller_name'),
+            ('JMD Amount', 'jmd_amount'),
+            ('USD Amount', 'usd_amount'),
+        ],
+        ['eod_report__processing_date', 'eod_report__location__name', 'id'],
+        location_field='eod_report__location',
+    ),
+    'eft': ReportDataset(
+        'EFT Statements', EFTData, 'statement_date',
+        [
+            ('Statement Date', 'statement_date'),
+            ('Location', 'location__name'),
+            ('Balance B/F', 'balance_bf'),
+            ('Inbound', 'inbound'),
+            ('Intra-Sent', 'intra_sent'),
+            ('Outbound', 'outbound'),
+            ('Loan', 'loan'),
+            ('Received From GK', 'received_from_gk'),
+            ('Adjusted', 'adjusted'),
+            ('BX', 'bx'),
+            ('SC', 'sc'),
+            ('FX', 'fx'),
+            ('Due To GK', 'due_to_gk'),
+            ('Due From GK', 'due_from_gk'),
+        ],
+        ['statement_date', 'location__name', 'id'],
+    ),
+    'remote_services': ReportDataset(
+        'Remote Services Statements', RemoteServicesData, 'statement_date',
+        [
+            ('Statement Date', 'statement_date'),
+            ('Location', 'location__name'),
+            ('Parish', 'parish_name'),
+            ('Parish ID', 'parish_id'),
+            ('Currency', 'currency'),
+            ('Pay Principal', 'pay_principal'),
+            ('Send Principal', 'send_principal'),
+            ('Total Principal', 'total_principal'),
+            ('Pay Count', 'pay_count'),
+            ('Send Count', 'send_count'),
+            ('Total Transactions', 'total_num_trans'),
+            ('Location Payout In Upload', 'total_payout_for_location_in_upload'),
+        ],
+        ['statement_date', 'location__name', 'currency', 'id'],
+    ),
+    'daily_positions': ReportDataset(
+        'Daily Cash Positions', DailyAgentData, 'date',
+        [
+            ('Date', 'date'),
+            ('Location', 'location__name'),
+            ('Previous Day Balance', 'previous_day_balance'),
+            ('Cash Delivered', 'cash_delivered_today'),
+            ('Payout At 3PM', 'payout_at_3pm'),
+            ('Cash Position At 3PM', 'cash_position_at_3pm'),
+            ('Projected Ending Position', 'projected_ending_position'),
+            ('Projected Next Day Amount', 'projected_next_day_amount'),
+            ('Closing Balance', 'closing_balance'),
+            ('Variance', 'variance'),
+            ('Exceeds Insurance Limit', 'exceeds_insurance_limit'),
+            ('Exceeds EOD Vault Limit', 'exceeds_eod_limit'),
+            ('Exceeds Working Day Limit', 'exceeds_working_day_limit'),
+        ],
+        ['date', 'location__name', 'id'],
+    ),
+}
+
+
+class Echo:
+    """File-like object whose write() returns the line, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(dataset, start, end, locations=None):
+    """Encoded CSV lines of the report, header first, produced as rows are read."""
+    writer = csv.writer(Echo())
+    yield '\ufeff'.encode('utf-8')  # BOM so Excel detects UTF-8
+    yield writer.writerow(dataset.headers).encode('utf-8')
+    for row in dataset.rows(start, end, locations):
+        yield writer.writerow(row).encode('utf-8')
+
+
+def write_xlsx(file, dataset, start, end, locations=None):
+    """Write the report as an XLSX workbook into the open binary ``file``."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=dataset.label[:31])
+    sheet.append(dataset.headers)
+    for row in dataset.rows(start, end, locations):
+        sheet.append(row)
+    workbook.save(file)
+
+
+def xlsx_chunks(dataset, start, end, locations=None, chunk_size=64 * 1024):
+    """The report as XLSX, built in a temporary file and read back in chunks."""
+    with tempfile.TemporaryFile() as file:
+        write_xlsx(file, dataset, start, end, locations)
+        file.seek(0)
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+_DONE = object()
+
+
+async def stream_in_thread(chunks, buffer_size=64 * 1024, queue_size=8):
+    """
+    Async iterator over the byte chunks of the generator ``chunks``, which
+    runs in its own thread. Chunks are sent on in ``buffer_size`` pieces,
+    at most ``queue_size`` ahead of the client; if the client goes away the
+    generator is closed.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    slots = threading.Semaphore(queue_size)
+    stop = threading.Event()
+
+    def send(item):
+        while not slots.acquire(timeout=1):
+            if stop.is_set():
+                return False
+        if stop.is_set():
+            return False
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+        return True
+
+    def produce():
+        try:
+            buffer = bytearray()
+            for chunk in chunks:
+                buffer += chunk
+                if len(buffer) >= buffer_size:
+                    if not send(bytes(buffer)):
+                        return
+                    buffer.clear()
+            if buffer and not send(bytes(buffer)):
+                return
+            send(_DONE)
+        except Exception as exc:
+            send(exc)
+        finally:
+            chunks.close()
+            # The thread's own database connections
+            connections.close_all()
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            slots.release()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,276 @@
+"""
+Cash rollups behind the analytics charts and period reporting.
+
+refresh_rollups rebuilds the daily CashRollup rows of the given dates for
+every location from DailyAgentData (closing balance), EFTData, Remote
+Services, CashDelivery and EODReport, one aggregate query per source, and
+sums them into parish and network rows. It then re-derives the weekly and
+monthly rows of the periods containing those dates from the daily rows, so
+a period total never reads raw history. Imports refresh the dates they
+wrote, the import worker refreshes the dates of saved EOD reports,
+deliveries and daily positions (see core.tasks), and rebuild_rollups
+rebuilds everything.
+
+A location's parish is the parish of its latest Remote Services row. The
+analytics endpoints read a chart series or a composition as one indexed
+range of rollup rows, and use rollup_version() as their ETag so browsers
+revalidate for free until the next refresh.
+"""
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from .models import CashDelivery, CashRollup, DailyAgentData, EFTData, EODReport, RemoteServicesData
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'cash_rollups:version'
+
+# Figures that add up across locations
+DECIMAL_METRICS = [
+    'closing_balance', 'closing_balance_sum', 'eft_inbound', 'eft_outbound', 'payouts',
+    'deliveries_jmd', 'deliveries_usd', 'variance',
+]
+COUNT_METRICS = ['closing_balance_count', 'payout_count', 'delivery_count', 'eod_report_count']
+METRICS = DECIMAL_METRICS + COUNT_METRICS
+
+NETWORK_KEY = 'network'
+
+# Grains derived from the daily rows
+PERIOD_GRAINS = ['week', 'month']
+
+
+def location_key(location_id):
+    return f'location:{location_id}'
+
+
+def parish_key(parish):
+    return f'parish:{parish}'
+
+
+def period_start(day, grain):
+    """First day of the period of ``grain`` containing ``day`` (weeks start on Monday)."""
+    if grain == 'week':
+        return day - timedelta(days=day.weekday())
+    if grain == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def period_end(start, grain):
+    """Last day of the period of ``grain`` starting on ``start``."""
+    if grain == 'week':
+        return start + timedelta(days=6)
+    if grain == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return start
+
+
+def rollup_version():
+    """Stamp that changes whenever rollups are refreshed."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, timeout=None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def location_parishes():
+    """{location_id: parish name} from each location's latest Remote Services row."""
+    latest = RemoteServicesData.objects.exclude(parish_name='').values('location_id').annotate(latest=Max('id'))
+    return dict(
+        RemoteServicesData.objects.filter(id__in=latest.values('latest')).values_list('location_id', 'parish_name')
+    )
+
+
+def _zero():
+    return {**{field: Decimal('0.00') for field in DECIMAL_METRICS}, **{field: 0 for field in COUNT_METRICS}}
+
+
+def daily_location_figures(dates):
+    """{(location_id, date): metrics} for the given dates, one aggregate query per source."""
+    dates = set(dates)
+    span = (min(dates), max(dates))
+    figures = defaultdict(_zero)
+
+    for location_id, day, closing_balance in DailyAgentData.objects.filter(
+        date__range=span
+    ).values_list('location_id', 'date', 'closing_balance'):
+        if day in dates:
+            row = figures[(location_id, day)]
+            row['closing_balance'] = row['closing_balance_sum'] = closing_balance
+            row['closing_balance_count'] = 1
+
+    eft_outbound = {}
+    for location_id, day, inbound, outbound in EFTData.objects.filter(
+        statement_date__range=span
+    ).values_list('location_id', 'statement_date', 'inbound', 'outbound'):
+        if day in dates:
+            row = figures[(location_id, day)]
+            row['eft_inbound'] += inbound
+            row['eft_outbound'] += outbound
+            eft_outbound[(location_id, day)] = outbound
+
+    # Remote Services JMD pay principal takes precedence over EFT outbound as the day's payout (see core.payouts)
+    remote_services = {
+        (row['location_id'], row['statement_date']): row
+        for row in RemoteServicesData.objects.filter(currency='JMD', statement_date__range=span)
+        .values('location_id', 'statement_date').annotate(total=Sum('pay_principal'), count=Sum('pay_count'))
+        if row['statement_date'] in dates
+    }
+    for key in set(remote_services) | set(eft_outbound):
+        row = figures[key]
+        if key in remote_services:
+            row['payouts'] = remote_services[key]['total']
+            row['payout_count'] = remote_services[key]['count'] or 0
+        else:
+            row['payouts'] = eft_outbound[key]
+
+    for row in CashDelivery.objects.filter(date__range=span, location__isnull=False).values(
+        'location_id', 'date'
+    ).annotate(jmd=Sum('jmd_amount'), usd=Sum('usd_amount'), count=Count('id')):
+        if row['date'] in dates:
+            figures[(row['location_id'], row['date'])].update(
+                deliveries_jmd=row['jmd'], deliveries_usd=row['usd'], delivery_count=row['count'],
+            )
+
+    for row in EODReport.objects.filter(processing_date__range=span).values(
+        'location_id', 'processing_date'
+    ).annotate(variance=Sum('total_variance'), count=Count('id')):
+        if row['processing_date'] in dates:
+            figures[(row['location_id'], row['processing_date'])].update(
+                variance=row['variance'], eod_report_count=row['count'],
+            )
+
+    return figures
+
+
+def _replace_rollups(rows, grain, periods):
+    """Upsert ``rows`` and delete the other rollups of ``grain`` in ``periods``. Returns the number removed."""
+    stale = [
+        pk for pk, key, start in CashRollup.objects.filter(grain=grain, period_start__in=periods)
+        .values_list('pk', 'key', 'period_start')
+        if (key, start) not in rows
+    ]
+    CashRollup.objects.filter(pk__in=stale).delete()
+    CashRollup.objects.bulk_create(
+        rows.values(),
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['key', 'grain', 'period_start'],
+        update_fields=['scope', 'location', 'parish', 'updated_at'] + METRICS,
+    )
+    return len(stale)
+
+
+def _period_rollups(dates, grain):
+    """{(key, period start): CashRollup} of ``grain`` for the periods containing ``dates``, from the daily rows."""
+    periods = {period_start(day, grain) for day in dates}
+    rows = {}
+    for day_row in CashRollup.objects.filter(
+        grain='day', period_start__range=(min(periods), period_end(max(periods), grain))
+    ).order_by('period_start').values('key', 'scope', 'location_id', 'parish', 'period_start', *METRICS):
+        start = period_start(day_row['period_start'], grain)
+        if start not in periods:
+            continue
+        row = rows.get((day_row['key'], start))
+        if row is None:
+            row = rows[(day_row['key'], start)] = CashRollup(
+                key=day_row['key'], grain=grain, period_start=start, **_zero(),
+            )
+        # The latest day decides the parish; its closing balance is the period's
+        row.scope, row.location_id, row.parish = day_row['scope'], day_row['location_id'], day_row['parish']
+        for field in METRICS:
+            if field != 'closing_balance':
+                setattr(row, field, getattr(row, field) + day_row[field])
+        if day_row['closing_balance_count']:
+            row.closing_balance = day_row['closing_balance']
+    return rows, periods
+
+
+def refresh_rollups(dates):
+    """
+    Rebuild the daily rollups (location, parish and network rows) of the
+    given dates and the weekly and monthly rollups containing them, and
+    remove rows of those periods that no longer have data. Returns the
+    number of rows written.
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return 0
+    parishes = location_parishes()
+
+    rows = {}
+
+    def row_for(key, scope, day, location_id=None, parish=''):
+        if (key, day) not in rows:
+            rows[(key, day)] = CashRollup(
+                key=key, scope=scope, location_id=location_id, parish=parish,
+                grain='day', period_start=day, **_zero(),
+            )
+        return rows[(key, day)]
+
+    for (location_id, day), values in daily_location_figures(dates).items():
+        parish = parishes.get(location_id, '')
+        row = row_for(location_key(location_id), 'location', day, location_id, parish)
+        for field, value in values.items():
+            setattr(row, field, value)
+        totals = [row_for(NETWORK_KEY, 'network', day)]
+        if parish:
+            totals.append(row_for(parish_key(parish), 'parish', day, parish=parish))
+        for total in totals:
+            for field in METRICS:
+                setattr(total, field, getattr(total, field) + values[field])
+
+    with transaction.atomic():
+        removed = _replace_rollups(rows, 'day', dates)
+        written = len(rows)
+        for grain in PERIOD_GRAINS:
+            period_rows, periods = _period_rollups(dates, grain)
+            removed += _replace_rollups(period_rows, grain, periods)
+            written += len(period_rows)
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None))
+
+    logger.info("Refreshed %s cash rollups for %s dates (%s removed)", written, len(dates), removed)
+    return written
+
+
+def series(key, start, end, grain='day'):
+    """The rollups of one location, parish or the network for the periods between start and end, oldest first."""
+    return list(
+        CashRollup.objects.filter(key=key, grain=grain, period_start__range=(period_start(start, grain), end))
+        .order_by('period_start')
+        .values('period_start', *METRICS)
+    )
+
+
+def composition(day, parish=None, limit=5, grain='day'):
+    """
+    Closing balances on ``day`` split by parish (network-wide) or by location
+    (within ``parish``): the largest ``limit`` entries and the rest as "Other".
+    Returns [(label, amount)].
+    """
+    rows = CashRollup.objects.filter(grain=grain, period_start=day)
+    if parish:
+        rows = list(rows.filter(scope='location', parish=parish).values_list('location__name', 'closing_balance'))
+    else:
+        rows = list(rows.filter(scope__in=['parish', 'network']).values_list('scope', 'parish', 'closing_balance'))
+        network = sum((amount for scope, _, amount in rows if scope == 'network'), Decimal('0.00'))
+        rows = [(name, amount) for scope, name, amount in rows if scope == 'parish']
+        # Locations without a Remote Services row have no parish
+        unassigned = network - sum((amount for _, amount in rows), Decimal('0.00'))
+        if unassigned:
+            rows.append(('No parish', unassigned))
+    rows = sorted(rows, key=lambda row: row[1], reverse=True)
+    parts = rows[:limit]
+    other = sum((amount for _, amount in rows[limit:]), Decimal('0.00'))
+    if other:
+        parts.append(('Other', other))
+    return parts
@@ -1,36 +1,71 @@
 import decimal
 from datetime import datetime, timedelta
-import requests
 from django.conf import settings
+from . import payouts
 
 def get_eft_balance(location_id, date):
     """
     Pull the end-of-day balance for the specified location and date from the EFT system
     """
-    # In a real implementation, this would make an API call to the EFT system
-    # For now, returning a mock value
-    return decimal.Decimal('10000.00')
+    return get_eft_balances([location_id], [date]).get((location_id, date), decimal.Decimal('0.00'))
+
+def get_eft_balances(location_ids, dates):
+    """
+    End-of-day EFT balances as {(location_id, date): balance}, in one query.
+    A day's closing balance is the Balance B/F on the following day's imported EFT statement.
+    """
+    from .models import EFTData
+    next_days = [date + timedelta(days=1) for date in dates]
+    return {
+        (location_id, statement_date - timedelta(days=1)): balance
+        for location_id, statement_date, balance in EFTData.objects.filter(
+            location_id__in=location_ids, statement_date__in=next_days
+        ).values_list('location_id', 'statement_date', 'balance_bf')
+    }
 
 def get_payout_at_3pm(location_id, date):
     """
     Pull the payout amount as of 3 PM for the specified location and date from Remote Services
     """
-    # In a real implementation, this would make an API call to Remote Services
-    # For now, returning a mock value
-    return decimal.Decimal('5000.00')
+    return get_payouts_at_3pm([location_id], [date]).get((location_id, date), decimal.Decimal('0.00'))
+
+def get_payouts_at_3pm(location_ids, dates):
+    """
+    Remote Services JMD payouts as {(location_id, date): Pay Principal total}, in one query
+    (USD principal is paid from the USD float and is not part of the JMD position).
+    """
+    from django.db.models import Sum
+    from .models import RemoteServicesData
+    return {
+        (row['location_id'], row['statement_date']): row['total']
+        for row in RemoteServicesData.objects.filter(
+            location_id__in=location_ids, currency='JMD', statement_date__in=dates
+        ).values('location_id', 'statement_date').annotate(total=Sum('pay_principal'))
+    }
 
-def get_average_payout(location_id, date, days=90, seasonal=False):
+def get_average_payout(location_id, date, days=90, seasonal=None):
     """
     Calculate the average payout for a location based on historical data
     """
-    # If it's a seasonal period, use data from the same period last year
-    if seasonal:
-        # Implementation for seasonal calculation
-        pass
-    
-    # Otherwise use 3-month historical data
-    # This would query the database or external system for historical data
-    return decimal.Decimal('7500.00')
+    # Seasonal periods use the same period last year, otherwise the 3-month history.
+    # Both are precomputed from imported statements (see core.payouts).
+    return payouts.get_average_payout(location_id, date, days=days, seasonal=seasonal)
+
+def get_average_payouts(location_ids, dates):
+    """
+    Average payouts for many locations and dates as {(location_id, date): average}
+    """
+    return payouts.get_average_payouts(location_ids, dates)
+
+def get_expected_payouts(location_ids, dates):
+    """
+    Expected payouts for many locations and dates as {(location_id, date): amount}:
+    the stored forecast (see core.forecasting), or the average payout where there is none
+    """
+    from .forecasting import get_forecast_payouts
+    expected = payouts.get_average_payouts(location_ids, dates)
+    expected.update(get_forecast_payouts(location_ids, dates))
+    return expected
 
 def send_cash_request_to_courier(cash_request_id):
     """
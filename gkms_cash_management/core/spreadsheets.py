@@ -0,0 +1,176 @@
+"""
+Streaming reader for uploaded Excel statements.
+
+Workbooks are opened in openpyxl's read-only mode and iterated with
+values_only=True, so rows are parsed one at a time as the sheet XML is read
+instead of building the whole workbook in memory first.
+"""
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+import openpyxl
+from django.conf import settings
+
+# Upload limits; override in settings
+DEFAULT_MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+DEFAULT_MAX_ROWS = 200000
+
+
+class SheetError(ValueError):
+    """Raised when a whole sheet is rejected (bad header, too large, unreadable)."""
+
+
+class RowError(ValueError):
+    """Raised when a sheet row cannot be turned into a record."""
+
+
+def to_str(value):
+    return str(value).strip() if value is not None else ''
+
+
+def to_decimal(value):
+    """Convert a cell value to Decimal, defaulting to 0.00 if None or empty. NaN and Infinity are rejected."""
+    if value is None or str(value).strip() == "":
+        return Decimal('0.00')
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise RowError(f"Invalid decimal value '{value}'.")
+    if not number.is_finite():
+        raise RowError(f"Invalid decimal value '{value}'.")
+    return number
+
+
+def to_int(value):
+    """Convert a cell value to int (via Decimal, so "1.00" is accepted, but not "1.5"); None if empty."""
+    if value is None or str(value).strip() == "":
+        return None
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise RowError(f"Invalid integer value '{value}'.")
+    if not number.is_finite() or number != number.to_integral_value():
+        raise RowError(f"Invalid integer value '{value}'.")
+    return int(number)
+
+
+def to_date(value):
+    """Convert a cell value (datetime or YYYY-MM-DD / MM/DD/YYYY string) to a date."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in ('%Y-%m-%d', '%m/%d/%Y'):
+        try:
+            return datetime.strptime(str(value).split(' ')[0], fmt).date()
+        except ValueError:
+            continue
+    raise RowError(f"Invalid date format for '{value}'. Use YYYY-MM-DD or MM/DD/YYYY.")
+
+
+class Column:
+    """A sheet column: the header text expected in the file and how to convert its cells."""
+
+    def __init__(self, header, field=None, convert=to_str, required=False, default=None):
+        self.header = header
+        self.field = field
+        self.convert = convert
+        self.required = required
+        self.default = default
+
+    def parse(self, value):
+        if value is None or str(value).strip() == "":
+            if self.required:
+                raise RowError(f"Missing {self.header}.")
+            if self.default is not None:
+                return self.default
+        try:
+            return self.convert(value)
+        except RowError as e:
+            raise RowError(f"{self.header}: {e}")
+
+
+class SheetSchema:
+    """
+    Declared layout of a statement sheet.
+
+    Columns with field=None (e.g. a blank spacer column) are checked in the
+    header but not returned. ``key_columns`` is how many leading columns are
+    looked at to tell data from blank rows: a row with a value in any of them
+    is data (and is rejected if a required column is missing), a row with
+    none is skipped silently.
+    """
+
+    def __init__(self, columns, header_row=1, key_columns=None):
+        self.columns = columns
+        self.header_row = header_row
+        self.key_columns = key_columns or len(columns)
+
+    @property
+    def headers(self):
+        return [column.header for column in self.columns]
+
+    def validate_header(self, header):
+        header = list(header[:len(self.columns)])
+        header += [None] * (len(self.columns) - len(header))
+        if header != self.headers:
+            raise SheetError(f"Invalid Excel header. Expected: {self.headers}. Found: {header}")
+
+    def parse_row(self, row):
+        values = {}
+        for column, value in zip(self.columns, row):
+            if column.field:
+                values[column.field] = column.parse(value)
+        return values
+
+
+def check_upload_size(uploaded_file):
+    max_bytes = getattr(settings, 'STATEMENT_UPLOAD_MAX_BYTES', DEFAULT_MAX_UPLOAD_BYTES)
+    size = getattr(uploaded_file, 'size', None)
+    if size is not None and size > max_bytes:
+        raise SheetError(f"File is too large ({size // 1024} KB). The maximum upload size is {max_bytes // 1024} KB.")
+
+
+def read_rows(uploaded_file, schema):
+    """
+    Yield ``(row_number, values)`` for each data row of the first sheet.
+
+    ``values`` is a dict of typed values keyed by column field, or a RowError
+    if the row could not be converted. Blank rows (see SheetSchema) are
+    skipped. Raises SheetError if the file cannot be
+    read, the header does not match the schema, or the sheet exceeds the
+    configured row cap.
+    """
+    check_upload_size(uploaded_file)
+    max_rows = getattr(settings, 'STATEMENT_UPLOAD_MAX_ROWS', DEFAULT_MAX_ROWS)
+
+    try:
+        workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+    except (openpyxl.utils.exceptions.InvalidFileException, zipfile.BadZipFile):
+        raise SheetError("Invalid file format. Please upload a valid Excel file (.xlsx).")
+
+    try:
+        sheet = workbook.active
+        rows = sheet.iter_rows(min_row=schema.header_row, values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise SheetError("The uploaded file is empty.")
+        schema.validate_header(header)
+
+        width = len(schema.columns)
+        data_rows = 0
+        for row_number, row in enumerate(rows, start=schema.header_row + 1):
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            if not any(value is not None and str(value).strip() != '' for value in row[:schema.key_columns]):
+                continue
+            data_rows += 1
+            if data_rows > max_rows:
+                raise SheetError(f"The uploaded file has more than {max_rows} data rows. Please split it into smaller files.")
+            try:
+                yield row_number, schema.parse_row(row)
+            except RowError as e:
+                yield row_number, e
+    finally:
+        # Read-only workbooks keep the file handle open until closed
+        workbook.close()
@@ -0,0 +1,118 @@
+"""
+Follow-up work run by the import worker instead of the request.
+
+Saving an EOD report, a delivery or a daily position has knock-on effects
+that nobody at the submit button waits for: posting the report to the cash
+ledger, refreshing the cash rollups of its date and re-checking the
+location's limits. The receivers in models.py call defer() instead, which
+writes every task of the transaction as one DeferredTask insert once it
+commits. The worker's run_deferred_tasks() then takes the queue in
+batches, merges the tasks of each kind and runs them.
+
+Every handler recomputes from what is stored, so running a task twice, or
+for a row deleted since, is harmless: tasks left over from a rolled back
+transaction simply go with the next one, and a batch that fails is
+retried on the next pass.
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F
+
+from .ledger import sync_eod_reports
+from .limits import sync_limit_breaches
+from .models import DeferredTask, EODReport
+from .rollups import refresh_rollups
+
+logger = logging.getLogger(__name__)
+
+# Tasks taken per worker pass
+BATCH_SIZE = 500
+# Passes a failing task is retried for before it is dropped
+MAX_ATTEMPTS = 5
+
+_pending = threading.local()
+
+
+def _flush():
+    tasks = getattr(_pending, 'tasks', {})
+    _pending.tasks = {}
+    if tasks:
+        DeferredTask.objects.bulk_create([DeferredTask(kind=kind, args=dict(args)) for kind, args in tasks])
+
+
+def defer(kind, **args):
+    """
+    Queue a task of ``kind`` for the worker once the current transaction
+    commits. The tasks of one transaction are written together by the
+    first callback, with duplicates dropped.
+    """
+    if not hasattr(_pending, 'tasks'):
+        _pending.tasks = {}
+    _pending.tasks[(kind, tuple(sorted(args.items())))] = None
+    transaction.on_commit(_flush)
+
+
+def _dates(values):
+    return sorted({date.fromisoformat(value) for value in values if value})
+
+
+def _sync_eod_ledger(tasks):
+    sync_eod_reports(EODReport.objects.filter(id__in={task['report_id'] for task in tasks}))
+
+
+def _refresh_rollups(tasks):
+    refresh_rollups(_dates(task['date'] for task in tasks))
+
+
+def _sync_limit_breaches(tasks):
+    # A date of None re-checks every day recorded for the location (its limits changed)
+    every_day = {task['location_id'] for task in tasks if task['date'] is None}
+    if every_day:
+        sync_limit_breaches(None, every_day)
+    dated = [task for task in tasks if task['date'] is not None and task['location_id'] not in every_day]
+    if dated:
+        sync_limit_breaches(_dates(task['date'] for task in dated), {task['location_id'] for task in dated})
+
+
+HANDLERS = {
+    'eod_ledger': _sync_eod_ledger,
+    'rollups': _refresh_rollups,
+    'limits': _sync_limit_breaches,
+}
+
+
+def run_deferred_tasks(limit=BATCH_SIZE):
+    """
+    Run up to ``limit`` queued tasks, oldest first, and delete them.
+    Returns the number of tasks run.
+    """
+    with transaction.atomic():
+        tasks = list(DeferredTask.objects.select_for_update(skip_locked=True).order_by('id')[:limit])
+        if not tasks:
+            return 0
+        by_kind = defaultdict(list)
+        for task in tasks:
+            by_kind[task.kind].append(task)
+
+        failed = []
+        for kind, handler in HANDLERS.items():
+            if kind not in by_kind:
+                continue
+            try:
+                with transaction.atomic():
+                    handler([task.args for task in by_kind[kind]])
+            except Exception:
+                logger.exception("Deferred %s tasks failed", kind)
+                failed += by_kind[kind]
+
+        retry = [task.id for task in failed if task.attempts + 1 < MAX_ATTEMPTS]
+        dropped = len(failed) - len(retry)
+        if dropped:
+            logger.error("Dropped %s deferred tasks after %s attempts", dropped, MAX_ATTEMPTS)
+        DeferredTask.objects.filter(id__in=[task.id for task in tasks]).exclude(id__in=retry).delete()
+        DeferredTask.objects.filter(id__in=retry).update(attempts=F('attempts') + 1)
+    return len(tasks) - len(failed)
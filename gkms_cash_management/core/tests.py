@@ -1,3 +1,1344 @@
-from django.test import TestCase
+import asyncio
+import io
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import openpyxl
+from django.conf import settings as django_settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature, tag
+from django.utils import timezone
+
+from . import (
+    approvals, benchmarks, dashboard, hot_queries, ledger, limits, live, metrics, notifications, reports, rollups,
+)
+from .cash_plan import plan_orders
+from .eod import save_eod_report, to_amount
+from .forecasting import (
+    FEATURES, MIN_OBSERVED_DAYS, fit, forecast, get_forecast_payouts, public_holidays, refresh_forecasts,
+)
+from .calculations import recompute_daily_positions
+from .importers import EFT_SCHEMA, LocationNameIndex, import_remote_services_rows
+from .jobs import claim_next_job, enqueue_import, run_job
+from .management.commands import run_benchmarks
+from .models import (
+    Adjustment, AgentProfile, CashDelivery, CashLedgerEntry, CashRequest, CashRollup, DailyAgentData, DeferredTask,
+    DenominationBreakdown, EFTData, EmergencyAccessRequest, EODReport, ImportJob, LimitBreach, LiveEvent, Location,
+    LocationLimit, Notification, NotificationEvent, PayoutAverage, PayoutForecast, RemoteServicesData, RequestSample,
+    SystemSettings, TellerBalance,
+)
+from .pagination import KeysetPaginator, encode_cursor
+from .payouts import (
+    daily_payouts, easter_sunday, get_average_payout, get_average_payouts, refresh_payout_averages, season_for,
+    season_windows,
+)
+from .spreadsheets import RowError, read_rows, to_decimal, to_int
+from .tasks import run_deferred_tasks
+
+
+@tag('benchmark')
+class HotPathBenchmarkTests(TestCase):
+    """
+    Runs the benchmark scenarios against the small seeded dataset and fails
+    when a hot path needs more queries than its stored baseline. Latency
+    depends on the machine, so it is only checked by run_benchmarks. Refresh the baselines with
+    ``manage.py run_benchmarks --profile small --update-baselines`` on a
+    database seeded with ``seed_benchmark_data --profile small``.
+    Skip with ``manage.py test --exclude-tag benchmark``.
+    """
+    profile = 'small'
+
+    @classmethod
+    def setUpTestData(cls):
+        benchmarks.seed(cls.profile)
+        cls.baselines = benchmarks.load_baselines(cls.profile)
+
+    def assertWithinBaseline(self, scenario):
+        results = run_benchmarks.run([scenario], repeat=1)
+        self.assertIn(scenario, self.baselines, f"No {self.profile} baseline for {scenario}")
+        regressions = benchmarks.compare(results, self.baselines, latency_tolerance=None)
+        self.assertEqual(regressions, [])
+
+    def test_admin_dashboard(self):
+        self.assertWithinBaseline('admin_dashboard')
+
+    def test_agent_dashboard(self):
+        self.assertWithinBaseline('agent_dashboard')
+
+    def test_submit_eod_report_form(self):
+        self.assertWithinBaseline('submit_eod_report_form')
+
+    def test_submit_eod_report(self):
+        self.assertWithinBaseline('submit_eod_report')
+
+    def test_admin_view_eod_reports(self):
+        self.assertWithinBaseline('admin_view_eod_reports')
+
+    def test_view_eft_statements(self):
+        self.assertWithinBaseline('view_eft_statements')
+
+    def test_view_remote_services_statements(self):
+        self.assertWithinBaseline('view_remote_services_statements')
+
+    def test_manage_locations(self):
+        self.assertWithinBaseline('manage_locations')
+
+    def test_import_eft_statement(self):
+        self.assertWithinBaseline('import_eft_statement')
+
+    def test_import_remote_services_statement(self):
+        self.assertWithinBaseline('import_remote_services_statement')
+
+
+@tag('benchmark')
+class HotQueryPlanTests(TestCase):
+    """Fails when a registered hot-path query stops using an index (see explain_hot_queries)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        benchmarks.seed('small')
+
+    def test_no_sequential_scans(self):
+        scans = {name: result['scans'] for name, result in hot_queries.explain().items() if result['scans']}
+        self.assertEqual(scans, {})
+
+
+class DailyPayoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.location = Location.objects.create(name='Half Way Tree')
+        cls.day = date(2026, 3, 10)
+        for parish_id, currency, pay in [(1, 'JMD', '100000.00'), (2, 'JMD', '25000.50'), (1, 'USD', '900.00')]:
+            RemoteServicesData.objects.create(
+                location=cls.location, statement_date=cls.day, parish_id=parish_id, currency=currency,
+                pay_principal=Decimal(pay),
+            )
+        EFTData.objects.create(location=cls.location, statement_date=date(2026, 3, 9), outbound=Decimal('40000.00'))
+
+    def test_jmd_payouts_leave_out_usd(self):
+        payouts = daily_payouts([self.location.id], date(2026, 3, 9), self.day)
+        self.assertEqual(payouts[self.location.id], {
+            date(2026, 3, 9): Decimal('40000.00'),
+            self.day: Decimal('125000.50'),
+        })
+
+    def test_usd_payouts(self):
+        payouts = daily_payouts([self.location.id], date(2026, 3, 9), self.day, currency='USD')
+        self.assertEqual(payouts[self.location.id], {self.day: Decimal('900.00')})
+
+    def test_daily_position_payout_is_jmd(self):
+        recompute_daily_positions([self.day], location_ids=[self.location.id])
+        data = DailyAgentData.objects.get(location=self.location, date=self.day)
+        self.assertEqual(data.payout_at_3pm, Decimal('125000.50'))
+        self.assertEqual(data.cash_position_at_3pm, -Decimal('125000.50'))
+
+
+class PayoutAverageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.location = Location.objects.create(name='Savanna-la-Mar')
+        for day, amount in [
+            (date(2025, 12, 20), '1000.00'), (date(2025, 12, 24), '3000.00'),
+            (date(2026, 4, 10), '900.00'), (date(2026, 7, 1), '100.00'), (date(2026, 7, 10), '600.00'),
+        ]:
+            RemoteServicesData.objects.create(
+                location=cls.location, statement_date=day, currency='JMD', pay_principal=Decimal(amount),
+            )
+        # No Remote Services upload that day: the EFT outbound is the payout
+        EFTData.objects.create(location=cls.location, statement_date=date(2026, 7, 3), outbound=Decimal('200.00'))
+        refresh_payout_averages([cls.location.id], [
+            date(2025, 12, 20), date(2025, 12, 24), date(2026, 4, 10), date(2026, 7, 1), date(2026, 7, 3), date(2026, 7, 10),
+        ])
+
+    def test_easter_sunday(self):
+        self.assertEqual(
+            [easter_sunday(year) for year in (2000, 2019, 2024, 2025, 2026)],
+            [date(2000, 4, 23), date(2019, 4, 21), date(2024, 3, 31), date(2025, 4, 20), date(2026, 4, 5)],
+        )
+
+    def test_season_windows(self):
+        self.assertEqual(season_windows(2026), {
+            'christmas': (date(2026, 12, 15), date(2027, 1, 2)),
+            # Nine days before Easter Sunday (5 April) to Easter Monday
+            'easter': (date(2026, 3, 27), date(2026, 4, 6)),
+            'back_to_school': (date(2026, 8, 15), date(2026, 9, 7)),
+            # Second Sunday in May
+            'mothers_day': (date(2026, 5, 4), date(2026, 5, 10)),
+        })
+        self.assertEqual(season_for(date(2027, 1, 1)), ('christmas', date(2026, 12, 15), date(2027, 1, 2)))
+        self.assertIsNone(season_for(date(2026, 7, 1)))
+
+    def test_rolling_average_is_over_observed_days(self):
+        averages = dict(
+            PayoutAverage.objects.filter(location=self.location, window='rolling_90')
+            .values_list('period_end', 'average_payout')
+        )
+        # 10 April is still in the 90 days to 1 July: (900 + 100) / 2
+        self.assertEqual(averages[date(2026, 7, 1)], Decimal('500.00'))
+        # ...but not in those to 10 July (from 12 April): (100 + 200 + 600) / 3
+        self.assertEqual(averages[date(2026, 7, 10)], Decimal('300.00'))
+        self.assertEqual(
+            PayoutAverage.objects.get(location=self.location, window='christmas').average_payout, Decimal('2000.00'),
+        )
+
+    def test_average_payouts_for_many_days(self):
+        days = [date(2026, 7, 2), date(2026, 7, 11), date(2026, 12, 20), date(2026, 11, 1)]
+        with self.assertNumQueries(2):
+            averages = get_average_payouts([self.location.id], days)
+        self.assertEqual(averages, {
+            # The latest rolling average ending before the day
+            (self.location.id, date(2026, 7, 2)): Decimal('500.00'),
+            (self.location.id, date(2026, 7, 11)): Decimal('300.00'),
+            # Christmas: last year's window
+            (self.location.id, date(2026, 12, 20)): Decimal('2000.00'),
+            # Nothing in the 90 days before
+            (self.location.id, date(2026, 11, 1)): Decimal('0.00'),
+        })
+        for (_, day), average in averages.items():
+            self.assertEqual(get_average_payout(self.location.id, day), average)
+
+
+class PayoutForecastTests(TestCase):
+    def test_public_holidays_move_sunday_holidays_to_monday(self):
+        self.assertEqual(sorted(public_holidays(2023)), [
+            date(2023, 1, 2),  # New Year's Day falls on a Sunday
+            date(2023, 2, 22), date(2023, 4, 7), date(2023, 4, 10),  # Easter Sunday is 9 April
+            date(2023, 5, 23), date(2023, 8, 1),
+            date(2023, 8, 7),  # Independence Day falls on a Sunday
+            date(2023, 10, 16),
+            date(2023, 12, 25), date(2023, 12, 26),
+        ])
+        # Christmas on a Sunday pushes Boxing Day to the Tuesday
+        self.assertLessEqual({date(2022, 12, 26), date(2022, 12, 27)}, public_holidays(2022))
+        self.assertNotIn(date(2022, 12, 25), public_holidays(2022))
+
+    def test_heroes_day_is_the_third_monday_of_october(self):
+        for year, day in [(2018, 15), (2023, 16), (2024, 21), (2025, 20)]:
+            heroes_day = [holiday for holiday in public_holidays(year) if holiday.month == 10]
+            self.assertEqual(heroes_day, [date(year, 10, day)])
+
+    def test_fit_recovers_the_weekday_pattern(self):
+        # Four weeks from a Monday: a flat location, one paying double on Fridays and Saturdays and
+        # closed on Sundays, and one without statements
+        weekdays = np.arange(28) % 7
+        features = np.zeros((28, len(FEATURES)))
+        payouts = np.array([
+            [100.0] * 28,
+            [[100.0, 100.0, 100.0, 100.0, 200.0, 200.0, 0.0][weekday] for weekday in weekdays],
+            [0.0] * 28,
+        ])
+        observed = np.array([[True] * 28, weekdays != 6, [False] * 28])
+
+        level, weekday_factors, feature_factors, counts = fit(payouts, observed, weekdays, features)
+        np.testing.assert_array_equal(counts, [28, 24, 0])
+        self.assertAlmostEqual(level[0], 100.0)
+        np.testing.assert_allclose(weekday_factors[0], np.ones(7))
+        # Mean 400 / 3; Monday (4 x 100 + 4 x 400 / 3) / 8 = 350 / 3, Friday (4 x 200 + 4 x 400 / 3) / 8 = 500 / 3
+        np.testing.assert_allclose(weekday_factors[1], [0.875, 0.875, 0.875, 0.875, 1.25, 1.25, 0.0])
+        self.assertGreater(level[1], 0)
+        np.testing.assert_allclose(feature_factors, np.ones(feature_factors.shape))
+        # No history: no level, and no weekday is taken to be closed
+        self.assertEqual(level[2], 0.0)
+        np.testing.assert_allclose(weekday_factors[2], np.ones(7))
+
+    def test_forecast_from_statements(self):
+        first_day = date(2024, 3, 4)  # A Monday, clear of holidays and seasons
+        regular, new = Location.objects.create(name='Regular'), Location.objects.create(name='New')
+        for location, days in [(regular, 21), (new, MIN_OBSERVED_DAYS - 1)]:
+            for offset in range(1, days + 1):
+                day = first_day - timedelta(days=offset)
+                if day.weekday() != 6:
+                    RemoteServicesData.objects.create(
+                        location=location, statement_date=day, currency='JMD', pay_principal=Decimal('100.00'),
+                    )
+
+        days, forecasts, counts = forecast([regular.id, new.id], first_day)
+        self.assertEqual((days[0], days[-1]), (first_day, date(2024, 3, 17)))
+        np.testing.assert_array_equal(counts, [18, 11])
+        np.testing.assert_allclose(forecasts[0], [0.0 if day.weekday() == 6 else 100.0 for day in days])
+
+        # Only the location with MIN_OBSERVED_DAYS of history is stored
+        self.assertEqual(refresh_forecasts(first_day, [regular.id, new.id]), 14)
+        self.assertEqual(set(PayoutForecast.objects.values_list('location_id', 'days_observed')), {(regular.id, 18)})
+        self.assertEqual(get_forecast_payouts([regular.id, new.id], [first_day, date(2024, 3, 10)]), {
+            (regular.id, first_day): Decimal('100.00'),
+            (regular.id, date(2024, 3, 10)): Decimal('0.00'),
+        })
+
+
+class CashLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = User.objects.create_user('ledger_agent', password='x')
+        cls.location = Location.objects.create(name='May Pen')
+        cls.day = date(2026, 3, 10)
+
+    def entries(self):
+        return list(
+            CashLedgerEntry.objects.filter(location=self.location).order_by('id')
+            .values_list('entry_type', 'business_date', 'amount', 'balance_after')
+        )
+
+    def balance(self):
+        return ledger.current_position(self.location.id)
+
+    def payout(self, day, amount, currency='JMD', parish_id=1):
+        RemoteServicesData.objects.update_or_create(
+            location=self.location, statement_date=day, currency=currency, parish_id=parish_id,
+            defaults={'pay_principal': Decimal(amount)},
+        )
+
+    def report(self, day, closing_balance, **fields):
+        report = EODReport(
+            agent=self.agent, location=self.location, processing_date=day,
+            closing_balance=Decimal(closing_balance), **fields,
+        )
+        self.save(report)
+        return report
+
+    def save(self, report):
+        # The worker posts the report once it commits
+        with self.captureOnCommitCallbacks(execute=True):
+            report.save()
+        self.assertEqual(run_deferred_tasks(), 2)
+
+    def test_payouts_are_posted_in_jmd_once(self):
+        self.payout(self.day, '150000.00')
+        self.payout(self.day, '900.00', currency='USD')
+        self.assertEqual(ledger.post_payouts([self.day], [self.location.id]), 1)
+        self.assertEqual(ledger.post_payouts([self.day], [self.location.id]), 0)
+        self.assertEqual(self.balance(), Decimal('-150000.00'))
+
+        # A re-imported statement posts the difference
+        self.payout(self.day, '120000.00')
+        ledger.post_payouts([self.day], [self.location.id])
+        self.assertEqual(self.entries()[-1], ('payout', self.day, Decimal('30000.00'), Decimal('-120000.00')))
+
+    def test_delivery_posted_when_verified_and_reversed_when_not(self):
+        delivery = CashDelivery.objects.create(location=self.location, date=self.day, jmd_amount=Decimal('500000.00'))
+        self.assertEqual(self.entries(), [])
+        delivery.verified = True
+        delivery.save()
+        self.assertEqual(self.balance(), Decimal('500000.00'))
+        delivery.verified = False
+        delivery.save()
+        self.assertEqual(self.entries(), [
+            ('delivery', self.day, Decimal('500000.00'), Decimal('500000.00')),
+            ('delivery', self.day, Decimal('-500000.00'), Decimal('0.00')),
+        ])
+
+    def test_jmd_adjustments_move_the_balance(self):
+        report = self.report(self.day, '0.00')
+        Adjustment.objects.create(eod_report=report, type='overage', amount=Decimal('1000.00'))
+        Adjustment.objects.create(eod_report=report, type='shortage', amount=Decimal('250.00'))
+        Adjustment.objects.create(eod_report=report, type='overage', amount=Decimal('40.00'), currency='USD')
+        adjustments = [entry for entry in self.entries() if entry[0] == 'adjustment']
+        self.assertEqual([amount for _, _, amount, _ in adjustments], [Decimal('1000.00'), Decimal('-250.00')])
+
+    def test_backdated_entry_keeps_the_running_balance(self):
+        CashDelivery.objects.create(location=self.location, date=self.day, jmd_amount=Decimal('400000.00'), verified=True)
+        # Imported after the delivery, for the day before
+        self.payout(self.day - timedelta(days=1), '100000.00')
+        ledger.post_payouts([self.day - timedelta(days=1)], [self.location.id])
+        running = Decimal('0.00')
+        for _, _, amount, balance_after in self.entries():
+            running += amount
+            self.assertEqual(balance_after, running)
+        self.assertEqual(self.balance(), Decimal('300000.00'))
+        self.assertEqual(ledger.write_checkpoints(self.day), (1, []))
+
+    def test_eod_count_reconciles_the_balance(self):
+        CashDelivery.objects.create(location=self.location, date=self.day, jmd_amount=Decimal('500000.00'), verified=True)
+        self.payout(self.day, '150000.00')
+        ledger.post_payouts([self.day], [self.location.id])
+        report = self.report(self.day, '340000.00')
+        self.assertEqual(self.entries()[-1], ('eod_close', self.day, Decimal('-10000.00'), Decimal('340000.00')))
+
+        # Next day's payout is not in the count; a payout for the counted day already is
+        next_day = self.day + timedelta(days=1)
+        self.payout(next_day, '40000.00')
+        ledger.post_payouts([next_day], [self.location.id])
+        self.payout(self.day, '160000.00')
+        ledger.post_payouts([self.day], [self.location.id])
+        self.assertEqual(self.balance(), Decimal('300000.00'))
+
+        # A corrected count moves the balance by the correction only
+        report.closing_balance = Decimal('345000.00')
+        self.save(report)
+        self.assertEqual(self.balance(), Decimal('305000.00'))
+        self.assertEqual(ledger.write_checkpoints(next_day), (1, []))
+
+
+class AgentDashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.agent = User.objects.create_user('cached_agent', password='x')
+        self.location, self.other = Location.objects.create(name='Lucea'), Location.objects.create(name='Falmouth')
+        self.today = date(2026, 3, 10)
+
+    def load(self, location, queries):
+        with self.assertNumQueries(queries):
+            return dashboard.location_dashboard_data(location, today=self.today)
+
+    def test_location_data_is_cached_per_location_until_a_save(self):
+        # Today's position, the recent reports, then today's report (not among them)
+        self.assertIsNone(self.load(self.location, 3)['daily_data'].pk)
+        self.load(self.other, 3)
+        self.load(self.location, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DailyAgentData.objects.create(location=self.location, date=self.today, closing_balance=Decimal('75000.00'))
+        self.assertEqual(self.load(self.location, 3)['daily_data'].closing_balance, Decimal('75000.00'))
+        self.load(self.other, 0)
+
+    def test_cached_data_of_another_day_is_reloaded(self):
+        self.load(self.location, 3)
+        with self.assertNumQueries(3):
+            dashboard.location_dashboard_data(self.location, today=self.today + timedelta(days=1))
+
+    def test_bulk_recompute_drops_the_entries(self):
+        self.load(self.location, 3)
+        self.load(self.other, 3)
+        recompute_daily_positions([self.today], location_ids=[self.location.id])
+        self.assertIsNotNone(self.load(self.location, 3)['daily_data'].pk)
+        self.load(self.other, 0)
+
+    def test_emergency_access_state_is_cached_per_agent_until_a_request_changes(self):
+        other_agent = User.objects.create_user('other_agent', password='x')
+        with self.assertNumQueries(1):
+            self.assertEqual(dashboard.emergency_access_state(self.agent), (None, False))
+        dashboard.emergency_access_state(other_agent)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            access_request = EmergencyAccessRequest.objects.create(agent=self.agent, location=self.location, reason='Late')
+        with self.assertNumQueries(1):
+            self.assertEqual(dashboard.emergency_access_state(self.agent), (None, True))
+        with self.assertNumQueries(0):
+            dashboard.emergency_access_state(other_agent)
+
+        until = timezone.now() + timedelta(minutes=30)
+        access_request.status, access_request.access_granted_until = 'approved', until
+        with self.captureOnCommitCallbacks(execute=True):
+            access_request.save()
+        self.assertEqual(dashboard.emergency_access_state(self.agent), (until, False))
+
+
+@override_settings(SYSTEM_SETTINGS_CHECK_SECONDS=60)
+class SystemSettingsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reset()
+        self.addCleanup(self.reset)
+
+    def reset(self):
+        SystemSettings._cached = SystemSettings._cached_version = SystemSettings._checked_at = None
+
+    def test_settings_are_cached_in_the_process(self):
+        settings = SystemSettings.get_settings()
+        self.assertEqual(settings.pk, 1)
+        with self.assertNumQueries(0):
+            cached = SystemSettings.get_settings()
+        # Callers get a copy
+        cached.cutoff_hour = 11
+        self.assertEqual(SystemSettings.get_settings().cutoff_hour, 15)
+
+    def test_a_new_version_stamp_is_picked_up_at_the_next_check(self):
+        SystemSettings.get_settings()
+        version = cache.get(SystemSettings.VERSION_KEY)
+        self.assertIsNotNone(version)
+        # Another process saves the settings
+        SystemSettings.objects.filter(pk=1).update(cutoff_hour=16)
+        cache.set(SystemSettings.VERSION_KEY, 'changed', timeout=None)
+
+        self.assertEqual(SystemSettings.get_settings().cutoff_hour, 15)
+        with self.settings(SYSTEM_SETTINGS_CHECK_SECONDS=0):
+            self.assertEqual(SystemSettings.get_settings().cutoff_hour, 16)
+            # Same stamp: checked, not reloaded
+            with self.assertNumQueries(0):
+                SystemSettings.get_settings()
+
+    def test_saved_change_is_seen_after_commit(self):
+        settings = SystemSettings.get_settings()
+        version = cache.get(SystemSettings.VERSION_KEY)
+        settings.cutoff_hour = 17
+        with self.captureOnCommitCallbacks(execute=True):
+            settings.save()
+            self.assertEqual(SystemSettings.get_settings().cutoff_hour, 15)
+        self.assertNotEqual(cache.get(SystemSettings.VERSION_KEY), version)
+        self.assertEqual(SystemSettings.get_settings().cutoff_hour, 17)
+
+
+class LimitBreachTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.day = date(2024, 3, 6)
+        self.location = Location.objects.create(name='Ocho Rios')
+        self.unlimited = Location.objects.create(name='Falmouth')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.limit = LocationLimit.objects.create(
+                location=self.location, insurance_limit=Decimal('1000000.00'),
+                working_day_limit=Decimal('800000.00'), eod_vault_limit=Decimal('500000.00'),
+            )
+        run_deferred_tasks()
+
+    def position(self, location, closing_balance, day=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            data, _ = DailyAgentData.objects.update_or_create(
+                location=location, date=day or self.day, defaults={'closing_balance': Decimal(closing_balance)},
+            )
+        # The date's rollups and the location's limits
+        self.assertEqual(run_deferred_tasks(), 2)
+        data.refresh_from_db()
+        return data
+
+    def breaches(self):
+        return list(LimitBreach.objects.values_list('location__name', 'date', 'limit_type', 'amount', 'limit'))
+
+    def test_saving_a_position_flags_and_records_its_breaches(self):
+        data = self.position(self.location, '900000.00')
+        self.assertEqual(
+            (data.exceeds_insurance_limit, data.exceeds_eod_limit, data.exceeds_working_day_limit), (False, True, True),
+        )
+        self.assertEqual(self.breaches(), [
+            ('Ocho Rios', self.day, 'eod_vault', Decimal('900000.00'), Decimal('500000.00')),
+            ('Ocho Rios', self.day, 'working_day', Decimal('900000.00'), Decimal('800000.00')),
+        ])
+        # A location without limits has no breaches
+        data = self.position(self.unlimited, '9000000.00')
+        self.assertFalse(any(getattr(data, flag) for flag in limits.LIMIT_FLAGS))
+        self.assertEqual(len(self.breaches()), 2)
+
+        data = self.position(self.location, '600000.00')
+        self.assertEqual((data.exceeds_eod_limit, data.exceeds_working_day_limit), (True, False))
+        self.assertEqual(self.breaches(), [
+            ('Ocho Rios', self.day, 'eod_vault', Decimal('600000.00'), Decimal('500000.00')),
+        ])
+
+    def test_changing_a_limit_rechecks_every_day_of_the_location(self):
+        self.position(self.location, '600000.00')
+        self.position(self.location, '700000.00', self.day + timedelta(days=1))
+        self.assertEqual(LimitBreach.objects.count(), 2)
+
+        self.limit.eod_vault_limit = Decimal('650000.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.limit.save()
+        self.assertEqual(list(DeferredTask.objects.values_list('args', flat=True)), [
+            {'date': None, 'location_id': self.location.id},
+        ])
+        run_deferred_tasks()
+        self.assertEqual(self.breaches(), [
+            ('Ocho Rios', self.day + timedelta(days=1), 'eod_vault', Decimal('700000.00'), Decimal('650000.00')),
+        ])
+        self.assertFalse(DailyAgentData.objects.get(date=self.day).exceeds_eod_limit)
+
+    def test_sync_drops_the_cached_breaches_of_its_dates(self):
+        self.position(self.location, '900000.00')
+        self.assertEqual(len(limits.get_limit_breaches(self.day)), 2)
+        with self.assertNumQueries(0):
+            limits.get_limit_breaches(self.day)
+
+        other_day = limits.CACHE_KEY.format(date=self.day + timedelta(days=1))
+        cache.set(other_day, [], limits.CACHE_TIMEOUT)
+        DailyAgentData.objects.filter(location=self.location).update(closing_balance=Decimal('100.00'))
+        limits.sync_limit_breaches([self.day], [self.location.id])
+        self.assertIsNone(cache.get(limits.CACHE_KEY.format(date=self.day)))
+        self.assertEqual(cache.get(other_day), [])
+        self.assertEqual(limits.get_limit_breaches(self.day), [])
+
+        # Syncing every date drops the key of each date it finds
+        self.position(self.location, '900000.00')
+        limits.get_limit_breaches(self.day)
+        limits.sync_limit_breaches()
+        self.assertIsNone(cache.get(limits.CACHE_KEY.format(date=self.day)))
+
+
+class CashPlanTests(TestCase):
+    """A one-location plan worked out by hand (see core.cash_plan for the rules)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.location = Location.objects.create(name='Linstead')
+        LocationLimit.objects.create(
+            location=cls.location, insurance_limit=Decimal('1000000.00'),
+            working_day_limit=Decimal('800000.00'), eod_vault_limit=Decimal('500000.00'),
+        )
+        cls.delivery_date = date(2026, 3, 10)
+        history = [cls.delivery_date - timedelta(days=offset) for offset in range(1, 15)]
+        for day in history:
+            RemoteServicesData.objects.create(
+                location=cls.location, statement_date=day, currency='JMD', pay_principal=Decimal('200000.00'),
+            )
+        # US$2,800 over the last 28 days (US$100 a day), which must stay out of the JMD demand
+        for day in history[:2]:
+            RemoteServicesData.objects.create(
+                location=cls.location, statement_date=day, currency='USD', pay_principal=Decimal('1400.00'),
+            )
+        refresh_payout_averages([cls.location.id], history)
+        DailyAgentData.objects.create(
+            location=cls.location, date=cls.delivery_date - timedelta(days=1), closing_balance=Decimal('100000.00'),
+        )
+
+    def test_plan_matches_hand_computed_order(self):
+        [line] = plan_orders(self.delivery_date)
+        self.assertEqual(line.opening_position, Decimal('100000.00'))
+        self.assertEqual(line.expected_payout, Decimal('200000.00'))
+        self.assertEqual(line.next_day_payout, Decimal('200000.00'))
+        # 200,000 x 1.15 + 200,000 x 0.5 - 100,000 opening
+        self.assertEqual(line.jmd_amount, Decimal('230000.00'))
+        # Caps: min(1,000,000, 800,000) - 100,000 and 500,000 - (100,000 - 200,000)
+        self.assertEqual(line.headroom, Decimal('600000.00'))
+        self.assertEqual(line.shortfall, Decimal('0.00'))
+        # US$100 x 1.15, rounded up to US$200: one packet of US$20 notes
+        self.assertEqual(line.usd_amount, Decimal('200.00'))
+        self.assertEqual({field: count for field, count in line.notes.items() if count}, {
+            'jmd_2000': 100, 'jmd_100': 300, 'usd_20': 10,
+        })
+
+
+class NotificationTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name='May Pen')
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'x', is_staff=True)
+        self.other_admin = User.objects.create_user('other', password='x', is_staff=True)
+        self.agent = User.objects.create_user('agent', 'agent@example.com', 'x')
+        AgentProfile.objects.create(user=self.agent, location=self.location)
+
+    def cash_request(self):
+        cash_request = CashRequest(location=self.location, jmd_5000=10)
+        cash_request.save()
+        return cash_request
+
+    def test_events_are_queued_when_the_transaction_commits(self):
+        cash_request = self.cash_request()
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.enqueue(notifications.cash_request_event(cash_request, self.agent))
+            self.assertFalse(NotificationEvent.objects.exists())
+        self.assertEqual(list(NotificationEvent.objects.values_list('kind', 'actor')), [('cash_request', self.agent.id)])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(ValueError), transaction.atomic():
+                notifications.enqueue(notifications.cash_request_event(cash_request, self.agent))
+                raise ValueError
+        self.assertEqual(callbacks, [])
+
+    def test_burst_becomes_one_digest_per_recipient(self):
+        events = [notifications.cash_request_event(self.cash_request(), self.agent) for _ in range(25)]
+        events.append(NotificationEvent(
+            kind='emergency_access', message='agent requested emergency access', location=self.location,
+            actor=self.agent, related_url='/system-admin/emergency-requests/',
+        ))
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.enqueue(*events)
+        # Not before the oldest event has waited the digest window
+        self.assertEqual(notifications.dispatch(), [])
+
+        # Events, admins, one insert of the digests and one delete, in a savepoint
+        with self.assertNumQueries(6):
+            digests = notifications.dispatch(now=timezone.now() + notifications.DIGEST_WINDOW)
+        self.assertFalse(NotificationEvent.objects.exists())
+        # The agent is not told about their own requests
+        self.assertEqual(sorted(digest.user.username for digest in digests), ['admin', 'other'])
+        digest = Notification.objects.get(user=self.admin)
+        self.assertEqual(digest.title, '25 cash requests submitted, 1 emergency access request')
+        self.assertEqual((digest.event_count, digest.notification_type), (26, 'warning'))
+        self.assertEqual(digest.message.splitlines()[-1], '...and 6 more')
+        self.assertEqual(digest.related_url, '/admin-dashboard/')
+        self.assertEqual(
+            dict(Notification.objects.values_list('user__username', 'email_status')), {'admin': 'pending', 'other': 'none'},
+        )
+
+        # Decisions go to the location's agents, not to the admin who made them
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.enqueue(notifications.cash_request_decided_event(CashRequest.objects.first(), self.admin))
+        digests = notifications.dispatch(now=timezone.now() + notifications.DIGEST_WINDOW)
+        self.assertEqual([(digest.user, digest.event_count) for digest in digests], [(self.agent, 1)])
+
+    def test_emails_are_retried_until_they_fail_for_good(self):
+        notification = Notification.objects.create(
+            user=self.admin, title='EOD Report Submitted', message='May Pen: EOD report', related_url='/system-admin/',
+            email_status='pending',
+        )
+        with mock.patch('core.notifications.EmailMessage.send', side_effect=OSError('Connection refused')), \
+                self.assertLogs('core.notifications', 'ERROR'):
+            for attempt in range(1, notifications.MAX_EMAIL_ATTEMPTS):
+                self.assertEqual(notifications.send_emails(), (0, 0))
+                notification.refresh_from_db()
+                self.assertEqual((notification.email_status, notification.email_attempts), ('pending', attempt))
+            self.assertEqual(notifications.send_emails(), (0, 1))
+        notification.refresh_from_db()
+        self.assertEqual(notification.email_status, 'failed')
+        self.assertEqual(notifications.send_emails(), (0, 0))
+
+    def test_pending_emails_are_sent_once(self):
+        Notification.objects.create(
+            user=self.admin, title='EOD Report Submitted', message='May Pen: EOD report', related_url='/system-admin/',
+            email_status='pending',
+        )
+        # The mail server is down: nothing is sent, and the digest waits for the next pass
+        connection = mock.Mock(**{'open.side_effect': OSError('Connection refused')})
+        with mock.patch('core.notifications.get_connection', return_value=connection), \
+                self.assertLogs('core.notifications', 'ERROR'):
+            self.assertEqual(notifications.send_emails(), (0, 0))
+
+        self.assertEqual(notifications.send_emails(), (1, 0))
+        self.assertEqual(notifications.send_emails(), (0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['admin@example.com'])
+        self.assertEqual(mail.outbox[0].subject, f'{django_settings.EMAIL_SUBJECT_PREFIX}EOD Report Submitted')
+        self.assertIn(f'{django_settings.SITE_URL}/system-admin/', mail.outbox[0].body)
+        self.assertEqual(
+            Notification.objects.values_list('email_status', 'email_attempts').get(), ('sent', 2),
+        )
+
+
+class ReportExportTests(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user('agent', password='x')
+        self.portmore = Location.objects.create(name='Portmore')
+        self.spanish_town = Location.objects.create(name='Spanish Town')
+        self.day = date(2024, 3, 6)
+        self.report = EODReport.objects.create(
+            agent=self.agent, location=self.portmore, processing_date=self.day, closing_balance=Decimal('1500.00'),
+        )
+        DenominationBreakdown.objects.create(eod_report=self.report, currency='JMD', denomination_1000_count=1,
+                                             coins_amount=Decimal('12.50'))
+        DenominationBreakdown.objects.create(eod_report=self.report, currency='USD', denomination_20_count=2)
+        TellerBalance.objects.create(eod_report=self.report, teller_name='A', jmd_amount=Decimal('400.00'),
+                                     usd_amount=Decimal('10.00'))
+        TellerBalance.objects.create(eod_report=self.report, teller_name='B', jmd_amount=Decimal('600.00'))
+        EODReport.objects.create(agent=self.agent, location=self.spanish_town, processing_date=self.day)
+        EODReport.objects.create(agent=self.agent, location=self.portmore, processing_date=self.day + timedelta(days=1))
+
+    def row(self, dataset, values):
+        return dict(zip(dataset.headers, values))
+
+    def test_eod_report_row_has_denominations_and_teller_totals(self):
+        dataset = reports.DATASETS['eod_reports']
+        with self.assertNumQueries(1):
+            rows = [self.row(dataset, values) for values in dataset.rows(self.day, self.day)]
+        # One row per report, however many tellers and breakdowns it has
+        self.assertEqual([row['Location'] for row in rows], ['Portmore', 'Spanish Town'])
+        portmore, spanish_town = rows
+        self.assertEqual(portmore['Agent'], 'agent')
+        self.assertEqual(portmore['Closing Balance'], Decimal('1500.00'))
+        self.assertEqual((portmore['JMD 1000 Count'], portmore['JMD Coins']), (1, Decimal('12.50')))
+        self.assertEqual(portmore['USD 20 Count'], 2)
+        self.assertEqual(
+            (portmore['Tellers'], portmore['Teller JMD Total'], portmore['Teller USD Total']),
+            (2, Decimal('1000.00'), Decimal('10.00')),
+        )
+        # A report without breakdowns or tellers
+        self.assertEqual((spanish_town['JMD 1000 Count'], spanish_town['Tellers']), (None, 0))
+        self.assertEqual(spanish_town['Teller JMD Total'], Decimal('0'))
+
+    def test_filters_by_date_range_and_location(self):
+        dataset = reports.DATASETS['eod_reports']
+        rows = dataset.rows(self.day, self.day + timedelta(days=1), [self.portmore.id])
+        self.assertEqual([(values[0], values[1]) for values in rows], [
+            (self.day, 'Portmore'), (self.day + timedelta(days=1), 'Portmore'),
+        ])
+        tellers = reports.DATASETS['eod_tellers']
+        self.assertEqual([values[3] for values in tellers.rows(self.day, self.day, [self.spanish_town.id])], [])
+        self.assertEqual([values[3] for values in tellers.rows(self.day, self.day, [self.portmore.id])], ['A', 'B'])
+
+    def test_csv_and_xlsx_hold_the_same_rows(self):
+        dataset = reports.DATASETS['eod_tellers']
+        content = b''.join(reports.csv_lines(dataset, self.day, self.day)).decode('utf-8-sig')
+        self.assertEqual(content.splitlines(), [
+            'Processing Date,Location,Agent,Teller,JMD Amount,USD Amount',
+            '2024-03-06,Portmore,agent,A,400.00,10.00',
+            '2024-03-06,Portmore,agent,B,600.00,0.00',
+        ])
+
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(reports.xlsx_chunks(dataset, self.day, self.day))))
+        sheet = workbook[dataset.label]
+        self.assertEqual([row[3:5] for row in sheet.iter_rows(values_only=True)], [
+            ('Teller', 'JMD Amount'), ('A', 400), ('B', 600),
+        ])
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics.clear()
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+
+    def samples(self):
+        return [sample for sample in metrics.buffered_samples() if sample['url_name'] == 'admin_dashboard']
+
+    def test_records_sync_request(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/admin-dashboard/').status_code, 200)
+        [sample] = self.samples()
+        self.assertEqual(sample['status_code'], 200)
+        self.assertGreater(sample['query_count'], 0)
+
+    def test_report_reads_the_latest_stored_samples_and_pruning_is_separate(self):
+        now = timezone.now()
+        sample = {'method': 'GET', 'status_code': 200, 'wall_ms': 1.0, 'query_count': 1, 'sql_ms': 0.5, 'duplicate_queries': []}
+        metrics._save([
+            {**sample, 'url_name': f'view_{days}', 'recorded_at': now - timedelta(days=days)} for days in (0, 1, 30)
+        ])
+        self.assertEqual(RequestSample.objects.count(), 3)
+        with self.settings(REQUEST_METRICS_REPORT_SAMPLES=1):
+            self.assertEqual([row['url_name'] for row in metrics.stored_samples(now - timedelta(days=7))], ['view_0'])
+        self.assertEqual(metrics.prune_samples(), 1)
+        self.assertEqual(sorted(RequestSample.objects.values_list('url_name', flat=True)), ['view_0', 'view_1'])
+
+    async def test_records_async_request(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get('/admin-dashboard/')
+        self.assertEqual(response.status_code, 200)
+        [sample] = self.samples()
+        self.assertGreater(sample['query_count'], 0)
+
+
+class CashRollupTests(TestCase):
+    def setUp(self):
+        self.day = date(2024, 3, 6)
+        self.kingston, self.mandeville = Location.objects.create(name='Kingston'), Location.objects.create(name='Mandeville')
+        for location, parish in [(self.kingston, 'Kingston'), (self.mandeville, 'Manchester')]:
+            RemoteServicesData.objects.create(
+                location=location, statement_date=self.day, currency='JMD', parish_name=parish,
+                pay_principal=Decimal('1000.00'),
+            )
+        rollups.refresh_rollups([self.day])
+
+    def rollup(self, key, grain='day'):
+        return CashRollup.objects.filter(key=key, grain=grain, period_start=rollups.period_start(self.day, grain)).first()
+
+    def test_saving_queues_the_date_for_the_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            DailyAgentData.objects.create(location=self.kingston, date=self.day, closing_balance=Decimal('50000.00'))
+            DailyAgentData.objects.create(location=self.mandeville, date=self.day, closing_balance=Decimal('20000.00'))
+        self.assertEqual(self.rollup(rollups.NETWORK_KEY).closing_balance, Decimal('0.00'))
+        # One refresh of the date, one limit check per location
+        self.assertEqual(sorted(DeferredTask.objects.values_list('kind', flat=True)), ['limits', 'limits', 'rollups'])
+
+        self.assertEqual(run_deferred_tasks(), 3)
+        self.assertEqual(self.rollup(rollups.NETWORK_KEY).closing_balance, Decimal('70000.00'))
+        self.assertEqual(self.rollup(rollups.parish_key('Kingston')).closing_balance, Decimal('50000.00'))
+        self.assertEqual(self.rollup(rollups.location_key(self.kingston.id), 'month').closing_balance, Decimal('50000.00'))
+        self.assertFalse(DeferredTask.objects.exists())
+
+    def test_failed_tasks_are_retried(self):
+        DeferredTask.objects.create(kind='rollups', args={'date': 'not a date'})
+        DeferredTask.objects.create(kind='limits', args={'date': None, 'location_id': self.kingston.id})
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertEqual(run_deferred_tasks(), 1)
+        self.assertEqual(list(DeferredTask.objects.values_list('kind', 'attempts')), [('rollups', 1)])
+
+    def test_removes_location_rows_without_data(self):
+        delivery = CashDelivery.objects.create(location=self.kingston, date=self.day + timedelta(days=1), jmd_amount=Decimal('100.00'))
+        rollups.refresh_rollups([delivery.date])
+        key = rollups.location_key(self.kingston.id)
+        self.assertTrue(CashRollup.objects.filter(key=key, grain='day', period_start=delivery.date).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            delivery.delete()
+        run_deferred_tasks()
+        self.assertFalse(CashRollup.objects.filter(key=key, grain='day', period_start=delivery.date).exists())
+        # The week still has the statement day
+        self.assertEqual(self.rollup(key, 'week').deliveries_jmd, Decimal('0.00'))
+
+
+class AnalyticsEndpointTests(TestCase):
+    def setUp(self):
+        self.monday, self.tuesday = date(2024, 3, 4), date(2024, 3, 5)
+        self.kingston, self.mandeville = Location.objects.create(name='Kingston'), Location.objects.create(name='Mandeville')
+        # Queues the follow-up tasks now rather than leaving them to the next test
+        with self.captureOnCommitCallbacks(execute=True):
+            for location, parish, balances in [
+                (self.kingston, 'Kingston', ['50000.00', '60000.00']), (self.mandeville, 'Manchester', ['20000.00', '30000.00']),
+            ]:
+                RemoteServicesData.objects.create(
+                    location=location, statement_date=self.monday, currency='JMD', parish_name=parish,
+                    pay_principal=Decimal('1000.00'), pay_count=2,
+                )
+                for day, balance in zip([self.monday, self.tuesday], balances):
+                    DailyAgentData.objects.create(location=location, date=day, closing_balance=Decimal(balance))
+            CashDelivery.objects.create(location=self.kingston, date=self.tuesday, jmd_amount=Decimal('5000.00'))
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            rollups.refresh_rollups([self.monday, self.tuesday])
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+
+    def test_cash_position_series(self):
+        response = self.client.get('/system-admin/analytics/cash-position/')
+        self.assertEqual(response.json(), {
+            'scope': 'All Locations', 'grain': 'day', 'start': '2024-02-05', 'end': '2024-03-05',
+            'labels': ['2024-03-04', '2024-03-05'],
+            'closing_balance': [70000.0, 90000.0],
+            'closing_balance_sum': [70000.0, 90000.0],
+            'closing_balance_count': [2, 2],
+        })
+
+        data = self.client.get('/system-admin/analytics/cash-position/', {'grain': 'week', 'parish': 'Manchester'}).json()
+        self.assertEqual((data['scope'], data['labels']), ('Manchester', ['2024-03-04']))
+        self.assertEqual((data['closing_balance_sum'], data['closing_balance_count']), ([50000.0], [2]))
+
+        data = self.client.get('/system-admin/analytics/cash-position/', {
+            'location': self.kingston.id, 'start': '2024-03-05', 'end': '2024-03-05',
+        }).json()
+        self.assertEqual((data['scope'], data['labels'], data['closing_balance']), ('Kingston', ['2024-03-05'], [60000.0]))
+
+    def test_payouts_series(self):
+        data = self.client.get('/system-admin/analytics/payouts/').json()
+        self.assertEqual(data['labels'], ['2024-03-04', '2024-03-05'])
+        self.assertEqual(data['payouts'], [2000.0, 0.0])
+        self.assertEqual(data['payout_count'], [4, 0])
+        self.assertEqual(data['deliveries_jmd'], [0.0, 5000.0])
+
+    def test_composition(self):
+        data = self.client.get('/system-admin/analytics/composition/').json()
+        self.assertEqual(data, {
+            'scope': 'All Locations', 'date': '2024-03-05',
+            'labels': ['Kingston', 'Manchester'], 'values': [60000.0, 30000.0],
+        })
+        data = self.client.get('/system-admin/analytics/composition/', {'parish': 'Kingston', 'end': '2024-03-04'}).json()
+        self.assertEqual((data['date'], data['labels'], data['values']), ('2024-03-04', ['Kingston'], [50000.0]))
+
+    def test_bad_parameters_are_rejected(self):
+        response = self.client.get('/system-admin/analytics/cash-position/', {'grain': 'year'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'grain must be one of day, week, month'})
+        response = self.client.get('/system-admin/analytics/payouts/', {'start': '2024-03-06', 'end': '2024-03-05'})
+        self.assertEqual(response.json(), {'error': 'start must not be after end'})
+        response = self.client.get('/system-admin/analytics/composition/', {'end': '5 March'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag_changes_when_rollups_are_refreshed(self):
+        response = self.client.get('/system-admin/analytics/payouts/')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/system-admin/analytics/payouts/', headers={'If-None-Match': etag}).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            rollups.refresh_rollups([self.tuesday])
+        response = self.client.get('/system-admin/analytics/payouts/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+
+class ImportJobTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name='Half Way Tree', eft_system_name='HWT')
+        workbook = openpyxl.Workbook()
+        workbook.active.append(EFT_SCHEMA.headers)
+        workbook.active.append(['HWT', '2024-03-06', 1000, 500, 0, 400, 0, 0, 0, 0, 0, 0, 0, 0])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        self.workbook = buffer.getvalue()
+
+    def upload(self, **kwargs):
+        return enqueue_import('eft', SimpleUploadedFile('eft.xlsx', self.workbook), **kwargs)
+
+    def run_queued(self):
+        job = claim_next_job()
+        run_job(job)
+        return job
+
+    def test_same_file_is_not_queued_again_once_imported(self):
+        job, created = self.upload()
+        self.assertTrue(created)
+        self.assertEqual(self.run_queued().rows_created, 1)
+
+        duplicate, created = self.upload()
+        self.assertFalse(created)
+        self.assertEqual(duplicate.pk, job.pk)
+        self.assertEqual(ImportJob.objects.count(), 1)
+
+    def test_jobs_that_wrote_nothing_do_not_block_an_upload(self):
+        first, _ = self.upload()
+        # Still queued
+        second, created = self.upload()
+        self.assertTrue(created)
+        ImportJob.objects.filter(pk=first.pk).update(status='failed')
+        ImportJob.objects.filter(pk=second.pk).update(status='completed')
+        _, created = self.upload()
+        self.assertTrue(created)
+
+    def test_import_again_re_imports_edited_rows(self):
+        self.upload()
+        self.run_queued()
+        EFTData.objects.update(inbound=Decimal('1.00'))
+
+        job, created = self.upload(force=True)
+        self.assertTrue(created)
+        job = self.run_queued()
+        self.assertEqual((job.status, job.rows_created, job.rows_updated), ('completed', 0, 1))
+        self.assertEqual(EFTData.objects.get().inbound, Decimal('500.00'))
+
+
+class LocationNameIndexTests(TestCase):
+    def setUp(self):
+        self.spanish_town = Location.objects.create(name='Spanish Town', eft_system_name='GK SPANISH TOWN')
+        self.half_way_tree = Location.objects.create(name='Half Way Tree', eft_system_name='GK HALF WAY TREE')
+
+    def test_alias_resolves_whatever_the_case_and_spacing(self):
+        with self.assertNumQueries(1):
+            index = LocationNameIndex('eft')
+        with self.assertNumQueries(0):
+            self.assertEqual(index.resolve('  gk spanish   Town '), self.spanish_town.id)
+        # Renaming the location rewrites its aliases
+        self.spanish_town.eft_system_name = 'GK ST JAGO'
+        self.spanish_town.save()
+        index = LocationNameIndex('eft')
+        self.assertEqual(index.resolve('GK St Jago'), self.spanish_town.id)
+        with self.assertRaises(RowError):
+            index.resolve('GK SPANISH TOWN')
+
+    def test_unknown_name_gets_trigram_suggestions(self):
+        index = LocationNameIndex('eft')
+        with self.assertRaisesMessage(RowError, "Location with name 'GK SPANISHTOWN' not found. Did you mean: Spanish Town?"):
+            index.resolve('GK SPANISHTOWN')
+        self.assertEqual(index.suggest('Half Way'), ['Half Way Tree'])
+        self.assertEqual(index.suggest('Montego Bay'), [])
+        with self.assertRaisesMessage(RowError, "Location with name 'Montego Bay' not found."):
+            index.resolve('Montego Bay')
+        # The alias trigrams are loaded once, on the first miss
+        with self.assertNumQueries(0):
+            index.suggest('GK HALFWAY TREE')
+
+    def test_name_of_two_locations_is_ambiguous(self):
+        Location.objects.create(name='Spanish Town 2', eft_system_name='gk spanish town')
+        with self.assertRaisesMessage(RowError, "Multiple locations found with name 'GK SPANISH TOWN'"):
+            LocationNameIndex('eft').resolve('GK SPANISH TOWN')
+
+
+class RemoteServicesImportTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name='Spanish Town', remote_services_name='SPT')
+        self.day = date(2024, 3, 6)
+
+    def row(self, parish_id, pay_principal):
+        return {
+            'location_name': 'SPT', 'parish_name': f'Parish {parish_id}', 'parish_id': parish_id, 'currency': 'JMD',
+            'pay_principal': Decimal(pay_principal), 'send_principal': Decimal('0.00'),
+            'total_principal': Decimal(pay_principal), 'pay_count': 1, 'send_count': 0, 'total_num_trans': 1,
+        }
+
+    def test_re_upload_deletes_rows_it_no_longer_has(self):
+        result = import_remote_services_rows(
+            enumerate([self.row(1, '100.00'), self.row(2, '200.00'), self.row(None, '50.00')], start=2), self.day,
+        )
+        self.assertEqual(result.created, 3)
+
+        result = import_remote_services_rows([(2, self.row(1, '100.00'))], self.day)
+        # The location's upload total changed
+        self.assertEqual((result.updated, result.deleted), (1, 2))
+        self.assertEqual(list(RemoteServicesData.objects.values_list('parish_id', 'total_payout_for_location_in_upload')), [
+            (1, Decimal('100.00')),
+        ])
+
+
+class SaveEODReportTests(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user('agent', password='x')
+        self.location = Location.objects.create(name='Portmore')
+        self.day = date(2024, 3, 6)
+
+    def cleaned_data(self, closing_balance):
+        return {
+            'processing_date': self.day, 'closing_balance': closing_balance, 'funds_from_bxp_webex': None,
+            'cash_sent_to_courier': False, 'all_tellers_balanced': True, 'notes': '', 'confirmation': True,
+        }
+
+    def test_rejects_non_finite_amounts(self):
+        for value in ['NaN', 'sNaN', 'Infinity', '-inf', 'abc']:
+            with self.assertRaises(ValueError):
+                to_amount(value)
+        self.assertEqual(to_amount(' 12.50 '), Decimal('12.50'))
+        self.assertEqual(to_amount(''), Decimal('0.00'))
+
+    def test_updates_daily_data_created_since_it_was_looked_up(self):
+        DailyAgentData.objects.create(location=self.location, date=self.day, closing_balance=Decimal('10.00'))
+        save_eod_report(
+            self.agent, self.location, self.cleaned_data(Decimal('2500.00')), [], [],
+            daily_data=DailyAgentData(location=self.location, date=self.day),
+        )
+        self.assertEqual(DailyAgentData.objects.get().closing_balance, Decimal('2500.00'))
+
+    def test_updates_report_created_since_it_was_looked_up(self):
+        save_eod_report(self.agent, self.location, self.cleaned_data(Decimal('100.00')), [], [])
+        existing = EODReport.objects.get()
+        # A concurrent submission inserts the report between the lookup and the create
+        with mock.patch('core.eod._locked_report', side_effect=[None, existing]):
+            report, created = save_eod_report(self.agent, self.location, self.cleaned_data(Decimal('2500.00')), [], [])
+        self.assertFalse(created)
+        self.assertEqual(report.pk, existing.pk)
+        self.assertEqual(EODReport.objects.get().closing_balance, Decimal('2500.00'))
+
+
+class ApproveCashRequestTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+        self.cash_request = CashRequest(location=Location.objects.create(name='Ocho Rios'), jmd_5000=10)
+        self.cash_request.save()
+
+    def test_rejects_non_finite_amounts(self):
+        url = f'/approve-cash-request/{self.cash_request.id}/'
+        for value in ['NaN', 'sNaN', 'Infinity', '-Infinity']:
+            response = self.client.post(url, {'action': 'approve', 'approved_jmd_amount': value})
+            self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.cash_request.refresh_from_db()
+        self.assertEqual(self.cash_request.status, 'pending')
+        self.assertFalse(CashDelivery.objects.exists())
+
+
+class CashRequestDecisionTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('approver', password='x', is_staff=True)
+        self.location = Location.objects.create(name='Montego Bay')
+        self.requests = []
+        for packets in (10, 20, 30):
+            cash_request = CashRequest(location=self.location, jmd_5000=packets)
+            cash_request.save()
+            self.requests.append(cash_request)
+        self.ids = [cash_request.id for cash_request in self.requests]
+
+    def test_approving_creates_one_delivery_per_request_with_exact_amounts(self):
+        delivery_date = date(2026, 3, 12)
+        result = approvals.approve_requests(
+            self.ids[:2], self.admin, delivery_date=delivery_date,
+            amounts={self.ids[0]: (Decimal('12345.67'), Decimal('89.10'))},
+        )
+        self.assertEqual((sorted(result.decided), result.skipped), (self.ids[:2], []))
+        self.assertEqual(
+            list(CashDelivery.objects.order_by('cash_request_id').values_list('cash_request_id', 'date', 'jmd_amount', 'usd_amount')),
+            [
+                (self.ids[0], delivery_date, Decimal('12345.67'), Decimal('89.10')),
+                (self.ids[1], delivery_date, Decimal('100000.00'), Decimal('0.00')),
+            ],
+        )
+        self.assertEqual(
+            list(CashRequest.objects.order_by('id').values_list('status', 'approved_by')),
+            [('approved', self.admin.id), ('approved', self.admin.id), ('pending', None)],
+        )
+
+    def test_approving_twice_creates_no_second_delivery(self):
+        approvals.approve_requests([self.ids[0]], self.admin)
+        result = approvals.approve_requests(self.ids, self.admin)
+        self.assertEqual((sorted(result.decided), result.skipped), (self.ids[1:], [self.ids[0]]))
+        self.assertEqual(CashDelivery.objects.filter(cash_request_id=self.ids[0]).count(), 1)
+
+    def test_rejecting_reports_requests_no_longer_pending(self):
+        approvals.approve_requests([self.ids[0]], self.admin)
+        missing = max(self.ids) + 1
+        result = approvals.reject_requests([self.ids[0], self.ids[1], missing], self.admin)
+        self.assertEqual((result.decided, result.skipped), ([self.ids[1]], [self.ids[0], missing]))
+        self.assertEqual(CashRequest.objects.get(id=self.ids[1]).status, 'rejected')
+        self.assertFalse(CashDelivery.objects.filter(cash_request_id=self.ids[1]).exists())
+
+    def test_bulk_endpoint_decides_and_reports_skipped_requests(self):
+        approvals.reject_requests([self.ids[2]], self.admin)
+        self.client.force_login(self.admin)
+        response = self.client.post('/cash-requests/bulk-decision/', {'request_ids': self.ids, 'action': 'approve'}, follow=True)
+        self.assertEqual([str(message) for message in response.context['messages']], [
+            "2 cash requests approved.",
+            "1 request was skipped because another user is handling them or they are no longer pending.",
+        ])
+        self.assertEqual(CashDelivery.objects.count(), 2)
+
+    def test_bulk_endpoint_needs_a_selection_and_an_action(self):
+        self.client.force_login(self.admin)
+        response = self.client.post('/cash-requests/bulk-decision/', {'request_ids': self.ids, 'action': 'delete'})
+        self.assertRedirects(response, '/admin-dashboard/', fetch_redirect_response=False)
+        self.assertEqual(set(CashRequest.objects.values_list('status', flat=True)), {'pending'})
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class CashRequestLockingTests(TransactionTestCase):
+    def test_requests_locked_by_another_approver_are_skipped(self):
+        admin = User.objects.create_user('approver', password='x', is_staff=True)
+        location = Location.objects.create(name='Negril')
+        locked, free = CashRequest(location=location, jmd_5000=1), CashRequest(location=location, jmd_5000=2)
+        locked.save()
+        free.save()
+
+        holding, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with transaction.atomic():
+                CashRequest.objects.select_for_update().get(id=locked.id)
+                holding.set()
+                release.wait(10)
+            connection.close()
+
+        other_approver = threading.Thread(target=hold_lock)
+        other_approver.start()
+        try:
+            holding.wait(10)
+            result = approvals.approve_requests([locked.id, free.id], admin)
+        finally:
+            release.set()
+            other_approver.join()
+        self.assertEqual((result.decided, result.skipped), ([free.id], [locked.id]))
+        self.assertEqual(list(CashDelivery.objects.values_list('cash_request_id', flat=True)), [free.id])
+
+
+class SpreadsheetTests(TestCase):
+    def test_to_decimal_rejects_non_finite_values(self):
+        self.assertEqual(to_decimal('12.50'), Decimal('12.50'))
+        self.assertEqual(to_decimal(None), Decimal('0.00'))
+        for value in ['NaN', 'Infinity', '-inf', float('nan'), 'twelve']:
+            with self.assertRaises(RowError):
+                to_decimal(value)
+
+    def test_to_int_rejects_non_integral_values(self):
+        self.assertEqual(to_int('3.00'), 3)
+        self.assertEqual(to_int(4.0), 4)
+        self.assertIsNone(to_int(' '))
+        for value in ['1.5', 2.25, 'NaN', 'Infinity', 'x']:
+            with self.assertRaises(RowError):
+                to_int(value)
+
+    def test_rows_with_any_key_value_are_data(self):
+        workbook = openpyxl.Workbook()
+        workbook.active.append(EFT_SCHEMA.headers)
+        workbook.active.append(['HWT', '2024-03-06', 100])
+        workbook.active.append([None, '2024-03-06', 100])
+        workbook.active.append(['  ', None, None])
+        workbook.active.append(['HWT', '2024-03-07', 'NaN'])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+
+        rows = list(read_rows(io.BytesIO(buffer.getvalue()), EFT_SCHEMA))
+        self.assertEqual([row_number for row_number, _ in rows], [2, 3, 5])
+        self.assertEqual(rows[0][1]['balance_bf'], Decimal('100'))
+        self.assertEqual(str(rows[1][1]), 'Missing Location.')
+        self.assertEqual(str(rows[2][1]), "Balance B/F: Invalid decimal value 'NaN'.")
+
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        # Runs of equal names straddle the page boundaries
+        for name in ['Alpha'] * 4 + ['Bravo'] * 5 + ['Charlie']:
+            Location.objects.create(name=name)
+        self.expected = list(Location.objects.order_by('name', 'id').values_list('id', flat=True))
+
+    def paginator(self, per_page=3):
+        return KeysetPaginator(Location.objects.all(), per_page, ['name', 'id'])
+
+    def test_pages_cover_every_row_once_in_both_directions(self):
+        pages, page = [], self.paginator().page()
+        self.assertFalse(page.has_previous())
+        while True:
+            pages.append([location.id for location in page])
+            if not page.has_next():
+                break
+            page = self.paginator().page(page.next_cursor)
+        self.assertEqual([row for rows in pages for row in rows], self.expected)
+        self.assertEqual([len(rows) for rows in pages], [3, 3, 3, 1])
+
+        backwards = []
+        while page.has_previous():
+            page = self.paginator().page(page.previous_cursor)
+            backwards.insert(0, [location.id for location in page])
+        self.assertEqual(backwards, pages[:-1])
+        self.assertFalse(page.has_previous())
+
+    def test_descending_order_with_duplicate_keys(self):
+        paginator = KeysetPaginator(Location.objects.all(), 4, ['-name', 'id'])
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        expected = list(Location.objects.order_by('-name', 'id').values_list('id', flat=True))
+        self.assertEqual([location.id for page in (first, second, third) for location in page], expected)
+        self.assertFalse(third.has_next())
+
+    def test_invalid_or_tampered_cursor_gives_the_first_page(self):
+        first_page = self.expected[:3]
+        for cursor in [
+            'not a cursor',
+            '!!!',
+            encode_cursor(['Alpha'], 'next'),  # wrong number of values
+            encode_cursor(['Alpha', 1], 'sideways'),
+            encode_cursor(['Alpha', 'one'], 'next'),  # not an id
+            encode_cursor({'name': 'Alpha'}, 'next'),
+        ]:
+            page = self.paginator().page(cursor)
+            self.assertEqual([location.id for location in page], first_page, cursor)
+            self.assertFalse(page.has_previous())
+
+        entry = EFTData.objects.create(location_id=self.expected[0], statement_date=date(2024, 3, 6))
+        dated = KeysetPaginator(EFTData.objects.all(), 3, ['-statement_date', 'id'])
+        self.assertEqual(list(dated.page(encode_cursor(['not a date', entry.id], 'next'))), [entry])
+
+
+class LiveEventTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('live_admin', password='x', is_staff=True)
+
+    def test_publish_writes_events_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            live.publish('cash_request', {'id': 1, 'status': 'approved'}, {'id': 2, 'status': 'rejected'})
+            live.publish('cash_request')
+            self.assertFalse(LiveEvent.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            list(LiveEvent.objects.order_by('id').values_list('kind', 'payload')),
+            [('cash_request', {'id': 1, 'status': 'approved'}), ('cash_request', {'id': 2, 'status': 'rejected'})],
+        )
+
+    async def test_broadcaster_hands_each_batch_to_every_stream(self):
+        broadcaster = live.Broadcaster()
+        broadcaster.last_id = 0
+        first, second = asyncio.Queue(), asyncio.Queue()
+        # Already full: closed rather than left behind
+        slow = asyncio.Queue(maxsize=1)
+        slow.put_nowait([])
+        broadcaster.queues = {first, second, slow}
+        event = await LiveEvent.objects.acreate(kind='eod_report', payload={'id': 7})
+
+        await broadcaster.poll()
+        batch = [(event.id, 'eod_report', {'id': 7})]
+        self.assertEqual((first.get_nowait(), second.get_nowait()), (batch, batch))
+        self.assertIsNone(slow.get_nowait())
+        self.assertEqual(broadcaster.queues, {first, second})
+        self.assertEqual(broadcaster.last_id, event.id)
+
+        await broadcaster.poll()
+        self.assertTrue(first.empty())
+
+    async def test_broadcaster_drops_stale_connections_before_each_poll(self):
+        broadcaster = live.Broadcaster()
+        broadcaster.queues = {asyncio.Queue()}
+        polls = []
+
+        async def poll():
+            polls.append(close.call_count)
+            if len(polls) == 2:
+                broadcaster.queues.clear()
+            raise ConnectionError('server closed the connection')
+
+        with mock.patch.object(live, 'close_old_connections') as close, \
+                mock.patch.object(live, 'POLL_INTERVAL', 0), mock.patch.object(broadcaster, 'poll', poll), \
+                self.assertLogs('core.live', 'ERROR'):
+            await broadcaster.run()
+        # A failed poll does not stop the loop
+        self.assertEqual(polls, [1, 2])
+
+    async def test_stream_resumes_after_the_last_event_id(self):
+        seen, missed = [await LiveEvent.objects.acreate(kind='cash_request', payload={'id': n}) for n in (1, 2)]
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get('/admin-dashboard/live/', headers={'Last-Event-ID': str(seen.id)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), f'retry: {live.RETRY_MS}\n\n'.encode())
+        self.assertEqual(await anext(chunks), live.format_event(missed.id, 'cash_request', {'id': 2}).encode())
+        await chunks.aclose()
+        live.get_broadcaster().task.cancel()
+
+    async def test_stream_rejects_a_bad_event_id(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get('/admin-dashboard/live/', headers={'Last-Event-ID': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_wsgi_request_is_told_not_to_retry(self):
+        self.client.force_login(self.admin)
+        with self.assertLogs('core.views', 'WARNING'):
+            self.assertEqual(self.client.get('/admin-dashboard/live/').status_code, 204)
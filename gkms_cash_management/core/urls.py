@@ -9,19 +9,23 @@ urlpatterns = [
     
     # Agent URLs
     path('agent-dashboard/', views.agent_dashboard, name='agent_dashboard'),
+    path('notifications/read/', views.mark_notifications_read, name='mark_notifications_read'),
     path('request-cash/', views.request_cash, name='request_cash'),
     path('verify-cash-delivery/<int:delivery_id>/', views.verify_cash_delivery, name='verify_cash_delivery'),
     path('submit-eod-report/', views.submit_eod_report, name='submit_eod_report'),
     
     # Admin URLs
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/live/', views.admin_live_events, name='admin_live_events'),
     path('location/<int:location_id>/', views.location_details, name='location_details'),
     path('approve-cash-request/<int:request_id>/', views.approve_cash_request, name='approve_cash_request'),
+    path('cash-requests/bulk-decision/', views.bulk_decide_cash_requests, name='bulk_decide_cash_requests'),
     path('generate-report/', views.generate_report, name='generate_report'),
     path('system-admin/upload-eft-statement/', views.upload_eft_statement, name='upload_eft_statement'),
     path('system-admin/view-eft-statements/', views.view_eft_statements, name='view_eft_statements'),
     path('system-admin/edit-eft-entry/<int:entry_id>/', views.edit_eft_statement_entry, name='edit_eft_statement_entry'),
     path('system-admin/upload-remote-services-statement/', views.upload_remote_services_statement, name='upload_remote_services_statement'),
+    path('system-admin/import-jobs/<int:job_id>/', views.import_job_status, name='import_job_status'),
     path('system-admin/view-remote-services-statements/', views.view_remote_services_statements, name='view_remote_services_statements'),
     path('system-admin/select-upload-type/', views.select_upload_type, name='select_upload_type'),
     path('system-admin/select-view-type/', views.select_view_type, name='select_view_type'),
@@ -39,6 +43,12 @@ urlpatterns = [
     path('reset-password/<int:user_id>/', views.reset_password, name='reset_password'),
     path('deactivate-user/<int:user_id>/', views.deactivate_user, name='deactivate_user'),
     path('system-admin/settings/', views.manage_system_settings, name='manage_system_settings'),
+    path('system-admin/request-metrics/', views.request_metrics, name='request_metrics'),
+    path('system-admin/analytics/', views.cash_analytics, name='cash_analytics'),
+    path('system-admin/analytics/cash-position/', views.analytics_cash_position, name='analytics_cash_position'),
+    path('system-admin/analytics/composition/', views.analytics_composition, name='analytics_composition'),
+    path('system-admin/analytics/payouts/', views.analytics_payouts, name='analytics_payouts'),
+    path('system-admin/cash-plan/', views.cash_order_plan, name='cash_order_plan'),
     path('system-admin/locations/', views.manage_locations, name='manage_locations'),
     path('system-admin/location/<int:location_id>/', views.location_detail, name='location_detail'),
     path('system-admin/upload-eft-statement/', views.upload_eft_statement, name='upload_eft_statement'),
@@ -1,27 +1,44 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q, Sum, Avg
-from django.http import HttpResponse, JsonResponse
+from django.db.models import Q, Sum, Avg, Max
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 from .models import (
     AgentProfile, Location, LocationLimit, CashDelivery, 
-    CashRequest, EODReport, TellerBalance, Adjustment, DailyAgentData, DenominationBreakdown, TellerVariance, EmergencyAccessRequest, SystemSettings, EFTData, RemoteServicesData
+    CashRequest, EODReport, TellerBalance, Adjustment, DailyAgentData, DenominationBreakdown, TellerVariance, EmergencyAccessRequest, SystemSettings, EFTData, RemoteServicesData, ImportJob,
+    CashRollup, CashPosition, CashLedgerEntry
 )
-from .forms import CashRequestForm, EODReportForm, CashVerificationForm, SignupForm, EmergencyAccessRequestForm, LocationUpdateForm, UploadEFTStatementForm, EFTDataEditForm, UploadRemoteServicesStatementForm
+from .forms import CashRequestForm, EODReportForm, CashVerificationForm, SignupForm, EmergencyAccessRequestForm, LocationUpdateForm, UploadEFTStatementForm, EFTDataEditForm, UploadRemoteServicesStatementForm, ReportExportForm, CashPlanForm
+from . import metrics
+from .dashboard import emergency_access_state, location_dashboard_data
+from .eod import parse_tellers, parse_variances, save_eod_report
+from .jobs import enqueue_import
+from .limits import get_limit_breaches
+from .notifications import (
+    cash_request_event, delivery_verified_event, emergency_access_decided_event, emergency_access_event, enqueue,
+    mark_all_read, recent_notifications,
+)
+from .pagination import CURSOR_PARAM, KeysetPaginator
+from . import approvals, cash_plan, live, queries, reports, rollups
+from .spreadsheets import SheetError
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.models import User
 import logging
 from django.db import transaction
 from django.db import connection
 from django.db import reset_queries
+import hashlib
 import json
 from django.contrib.auth.views import LoginView
 from datetime import datetime, timedelta
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 from decimal import Decimal, InvalidOperation
 import pytz
-import openpyxl # For reading Excel files
 from django.template.loader import render_to_string
 
 logger = logging.getLogger(__name__)
@@ -48,82 +65,17 @@ def home(request):
 @user_passes_test(lambda u: u.is_staff)
 def admin_dashboard(request):
     # Get pending cash requests
-    pending_requests = CashRequest.objects.filter(status='pending')
+    pending_requests = queries.pending_cash_requests()
     
     # Get locations data for the dashboard
     locations = Location.objects.all()
     
-    # Get daily data for all locations
-    today = timezone.now().date()
-    daily_data = DailyAgentData.objects.filter(date=today)
-    
     # Additional data for dashboard stats
     locations_count = locations.count()
     pending_requests_count = pending_requests.count()
     
-    # Prepare warnings based on thresholds and update the flags
-    warnings = []
-    for data in daily_data:
-        # Get location limits (if they exist)
-        try:
-            limits = LocationLimit.objects.get(location=data.location)
-            
-            # Check if any limits are exceeded and update flags
-            data.exceeds_insurance_limit = data.closing_balance > limits.insurance_limit
-            data.exceeds_eod_limit = data.closing_balance > limits.eod_vault_limit
-            data.exceeds_working_day_limit = data.closing_balance > limits.working_day_limit
-            data.save(update_fields=['exceeds_insurance_limit', 'exceeds_eod_limit', 'exceeds_working_day_limit'])
-            
-            # Add to warnings list if any limit is exceeded
-            if data.exceeds_insurance_limit:
-                warnings.append({
-                    'location': data.location,
-                    'type': 'Insurance Limit Exceeded',
-                    'amount': data.closing_balance,
-                    'limit': limits.insurance_limit
-                })
-            
-            if data.exceeds_eod_limit:
-                warnings.append({
-                    'location': data.location,
-                    'type': 'EOD Vault Limit Exceeded',
-                    'amount': data.closing_balance,
-                    'limit': limits.eod_vault_limit
-                })
-                
-            if data.exceeds_working_day_limit:
-                warnings.append({
-                    'location': data.location,
-                    'type': 'Working Day Limit Exceeded',
-                    'amount': data.closing_balance,
-                    'limit': limits.working_day_limit
-                })
-        except LocationLimit.DoesNotExist:
-            # Skip if no limits defined
-            pass
-    
-    # For compatibility with both old and new code, we'll also try to query based on flags
-    try:
-        # This will only work after migration is applied
-        warnings_from_flags = DailyAgentData.objects.filter(
-            Q(exceeds_insurance_limit=True) | 
-            Q(exceeds_eod_limit=True) | 
-            Q(exceeds_working_day_limit=True)
-        ).distinct()
-        
-        # Add any warnings not already in the list
-        for data in warnings_from_flags:
-            existing = any(w['location'] == data.location for w in warnings)
-            if not existing:
-                warnings.append({
-                    'location': data.location,
-                    'type': 'Limit Exceeded',
-                    'amount': data.closing_balance,
-                    'limit': 'Unknown'
-                })
-    except:
-        # If the fields don't exist yet, this will silently fail
-        pass
+    # Today's limit breaches, kept up to date as daily data and limits change
+    warnings = get_limit_breaches(timezone.now().date())
     
     context = {
         'pending_requests': pending_requests,
@@ -131,16 +83,45 @@ def admin_dashboard(request):
         'locations_count': locations_count,
         'pending_requests_count': pending_requests_count,
         'warnings_count': len(warnings),
+        'today': timezone.now().date(),
+        'notifications': recent_notifications(request.user),
+        # Live updates pick up from here
+        'live_event_id': live.latest_event_id(),
     }
     
     return render(request, 'core/admin_dashboard.html', context)
 
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+async def admin_live_events(request):
+    """Server-Sent Events stream of dashboard changes (see core.live)."""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker cannot hold the stream open; 204 tells the browser not to retry
+        logger.warning("Live dashboard updates need the ASGI server; this request was served over WSGI")
+        return HttpResponse(status=204)
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    if last_event_id is not None and not last_event_id.isdigit():
+        return HttpResponseBadRequest("Invalid event id.")
+    response = StreamingHttpResponse(
+        live.stream(int(last_event_id) if last_event_id else None), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+@require_POST
+def mark_notifications_read(request):
+    mark_all_read(request.user)
+    return redirect('home')
+
 @login_required
 def agent_dashboard(request):
     """Dashboard view for agent users."""
     try:
         # Get the agent profile
-        agent = AgentProfile.objects.get(user=request.user)
+        agent = AgentProfile.objects.select_related('user', 'location').get(user=request.user)
         
         # Get today's date and current time in EST (Eastern Standard Time)
         today = timezone.now().date()
@@ -180,16 +161,10 @@ def agent_dashboard(request):
             minutes_to_cutoff = 0
         
         # Check for active emergency access
-        has_emergency_access = False
-        active_emergency_request = EmergencyAccessRequest.objects.filter(
-            agent=request.user,
-            status='approved',
-            access_granted_until__gt=current_time
-        ).first()
-        
-        if active_emergency_request:
-            has_emergency_access = True
-            emergency_access_remaining = active_emergency_request.access_granted_until - current_time
+        access_granted_until, pending_emergency_request = emergency_access_state(request.user)
+        has_emergency_access = access_granted_until is not None and access_granted_until > current_time
+        if has_emergency_access:
+            emergency_access_remaining = access_granted_until - current_time
             emergency_minutes_remaining = emergency_access_remaining.seconds // 60
         else:
             emergency_minutes_remaining = 0
@@ -202,6 +177,7 @@ def agent_dashboard(request):
                 emergency_request.agent = request.user
                 emergency_request.location = agent.location
                 emergency_request.save()
+                enqueue(emergency_access_event(emergency_request))
                 messages.success(request, "Emergency access request submitted. An administrator will review your request shortly.")
                 return redirect('agent_dashboard')
         else:
@@ -211,47 +187,16 @@ def agent_dashboard(request):
         if has_emergency_access:
             is_business_hours = True
         
-        # Get or create daily data
-        daily_data, created = DailyAgentData.objects.get_or_create(
-            location=agent.location,
-            date=today,
-            defaults={
-                'previous_day_balance': 0,
-                'cash_delivered_today': 0,
-                'payout_at_3pm': 0,
-                'cash_position_at_3pm': 0,
-                'projected_ending_position': 0,
-                'projected_next_day_amount': 0
-            }
-        )
-        
-        # Check if EOD report exists for today
-        has_eod_report = False
-        eod_report = None
-        
-        try:
-            eod_report = EODReport.objects.get(
-                location=agent.location,
-                processing_date=today
-            )
-            has_eod_report = True
-        except EODReport.DoesNotExist:
-            pass
-        
-        # Get recent EOD reports
-        recent_reports = EODReport.objects.filter(
-            location=agent.location
-        ).order_by('-processing_date')[:5]  # Last 5 reports
-        
-        # Get notifications (placeholder - to be implemented)
-        notifications = []
-
-        # Get pending emergency requests
-        pending_emergency_request = EmergencyAccessRequest.objects.filter(
-            agent=request.user,
-            status='pending'
-        ).exists()
+        # Today's daily data and EOD reports for the location (cached; nothing is written on GET)
+        location_data = location_dashboard_data(agent.location, today)
+        daily_data = location_data['daily_data']
+        eod_report = location_data['eod_report']
+        has_eod_report = eod_report is not None
+        recent_reports = location_data['recent_reports']
         
+        # Digests of decisions on the location's requests (see core.notifications)
+        notifications = recent_notifications(request.user)
+
         context = {
             'agent': agent,
             'today': today,
@@ -294,6 +239,7 @@ def request_cash(request):
                 cash_request.total_usd = form.cleaned_data.get('total_usd', 0)
                 
                 cash_request.save()
+                enqueue(cash_request_event(cash_request, request.user))
                 messages.success(request, "Cash request submitted successfully")
                 return redirect('agent_dashboard')
             else:
@@ -351,124 +297,50 @@ def approve_cash_request(request, request_id):
     
     # Handle form submission
     if request.method == 'POST':
-        # Log all POST data for debugging
-        print(f"POST data: {request.POST}")
-        
-        # Get the decision from the form
-        decision = request.POST.get('decision', '')
-        action = request.POST.get('action', decision)  # Fallback to decision if action is not present
-        
-        print(f"Decision: {decision}, Action: {action}")
-        
-        if action == 'approve' or decision == 'approve':
+        action = request.POST.get('action') or request.POST.get('decision', '')
+
+        if action == 'approve':
             try:
-                print("Processing approval...")
-                
-                # Get form data
-                approved_jmd = request.POST.get('approved_jmd_amount', '0') or '0'
-                approved_usd = request.POST.get('approved_usd_amount', '0') or '0'
-                delivery_date_str = request.POST.get('delivery_date')
-                notes = request.POST.get('approval_notes', '')
-                
-                # Parse delivery date
-                try:
-                    if delivery_date_str:
-                        delivery_date = datetime.strptime(delivery_date_str, '%Y-%m-%d').date()
-                    else:
-                        delivery_date = datetime.now().date()
-                except ValueError:
-                    print(f"Invalid date format: {delivery_date_str}")
-                    delivery_date = datetime.now().date()
-                
-                print(f"Data for approval: JMD={approved_jmd}, USD={approved_usd}, date={delivery_date}")
-                
-                # Update cash request
-                cash_request.status = 'approved'
-                cash_request.delivery_date = delivery_date
-                
-                if hasattr(cash_request, 'notes'):
-                    cash_request.notes = notes
-                
-                if hasattr(cash_request, 'approved_by'):
-                    cash_request.approved_by = request.user
-                
-                if hasattr(cash_request, 'approved_at'):
-                    cash_request.approved_at = timezone.now()
-                
-                cash_request.save()
-                print(f"Cash request saved: {cash_request.id}, status={cash_request.status}")
-                
-                # Create delivery record
-                try:
-                    jmd_amount = float(approved_jmd)
-                    usd_amount = float(approved_usd)
-                    
-                    delivery = CashDelivery.objects.create(
-                        location=cash_request.location,
-                        cash_request=cash_request,
-                        date=delivery_date,
-                        jmd_amount=jmd_amount,
-                        usd_amount=usd_amount
-                    )
-                    
-                    print(f"Created delivery: {delivery}")
-                    messages.success(request, f"Cash request #{cash_request.id} has been approved and delivery has been scheduled.")
-                
-                except Exception as e:
-                    print(f"Error creating delivery: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    messages.warning(request, f"Request approved but error creating delivery: {e}")
-                
-                return redirect('admin_dashboard')
-                
-            except Exception as e:
-                print(f"Error in approval process: {e}")
-                import traceback
-                traceback.print_exc()
-                messages.error(request, f"Error approving request: {e}")
-                return redirect('admin_dashboard')
-        
-        elif action == 'reject' or decision == 'reject':
+                approved_jmd = Decimal(request.POST.get('approved_jmd_amount') or cash_request.total_jmd)
+                approved_usd = Decimal(request.POST.get('approved_usd_amount') or cash_request.total_usd)
+                # Decimal() accepts "NaN" and "Infinity"
+                if not (approved_jmd.is_finite() and approved_usd.is_finite()):
+                    raise InvalidOperation
+            except InvalidOperation:
+                messages.error(request, "Approved amounts must be numbers.")
+                return redirect('approve_cash_request', request_id=cash_request.id)
+            if approved_jmd < 0 or approved_usd < 0:
+                messages.error(request, "Approved amounts cannot be negative.")
+                return redirect('approve_cash_request', request_id=cash_request.id)
+
+            delivery_date_str = request.POST.get('delivery_date')
             try:
-                print("Processing rejection...")
-                
-                # Get rejection reason
-                rejection_reason = request.POST.get('rejection_reason', '')
-                
-                # Update request
-                cash_request.status = 'rejected'
-                
-                # Add rejection reason
-                if hasattr(cash_request, 'rejection_reason'):
-                    cash_request.rejection_reason = rejection_reason
-                elif hasattr(cash_request, 'notes'):
-                    cash_request.notes = f"REJECTED: {rejection_reason}"
-                
-                # Set rejection metadata
-                if hasattr(cash_request, 'rejected_by'):
-                    cash_request.rejected_by = request.user
-                if hasattr(cash_request, 'rejected_at'):
-                    cash_request.rejected_at = timezone.now()
-                
-                cash_request.save()
-                print(f"Cash request rejected: {cash_request.id}")
+                delivery_date = datetime.strptime(delivery_date_str, '%Y-%m-%d').date() if delivery_date_str else None
+            except ValueError:
+                messages.error(request, "Delivery date must be in YYYY-MM-DD format.")
+                return redirect('approve_cash_request', request_id=cash_request.id)
+
+            result = approvals.approve_requests(
+                [cash_request.id], request.user, delivery_date,
+                amounts={cash_request.id: (approved_jmd, approved_usd)},
+            )
+            if result.decided:
+                messages.success(request, f"Cash request #{cash_request.id} has been approved and delivery has been scheduled.")
+            else:
+                messages.warning(request, f"Cash request #{cash_request.id} is no longer pending or is being handled by another user.")
+            return redirect('admin_dashboard')
+
+        if action == 'reject':
+            result = approvals.reject_requests([cash_request.id], request.user)
+            if result.decided:
                 messages.success(request, f"Cash request #{cash_request.id} has been rejected.")
-                
-                return redirect('admin_dashboard')
-                
-            except Exception as e:
-                print(f"Error in rejection process: {e}")
-                import traceback
-                traceback.print_exc()
-                messages.error(request, f"Error rejecting request: {e}")
-                return redirect('admin_dashboard')
-        
-        else:
-            print(f"Unknown action or decision: action={action}, decision={decision}")
-            messages.warning(request, "No clear action specified. Please try again.")
+            else:
+                messages.warning(request, f"Cash request #{cash_request.id} is no longer pending or is being handled by another user.")
             return redirect('admin_dashboard')
-    
+
+        messages.warning(request, "No clear action specified. Please try again.")
+        return redirect('admin_dashboard')
+
     # Render the template
     context = {
         'cash_request': cash_request,
@@ -477,6 +349,33 @@ def approve_cash_request(request, request_id):
     
     return render(request, 'core/approve_cash_request.html', context)
 
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+@require_POST
+def bulk_decide_cash_requests(request):
+    """Approve or reject the selected pending cash requests in one go."""
+    request_ids = [int(request_id) for request_id in request.POST.getlist('request_ids') if request_id.isdigit()]
+    action = request.POST.get('action')
+    if not request_ids or action not in ('approve', 'reject'):
+        messages.warning(request, "Select at least one request and choose approve or reject.")
+        return redirect('admin_dashboard')
+
+    if action == 'approve':
+        result = approvals.approve_requests(request_ids, request.user)
+    else:
+        result = approvals.reject_requests(request_ids, request.user)
+
+    verb = 'approved' if action == 'approve' else 'rejected'
+    if result.decided:
+        messages.success(request, f"{len(result.decided)} cash request{'s' if len(result.decided) != 1 else ''} {verb}.")
+    if result.skipped:
+        messages.warning(
+            request,
+            f"{len(result.skipped)} request{'s were' if len(result.skipped) != 1 else ' was'} skipped because "
+            "another user is handling them or they are no longer pending.",
+        )
+    return redirect('admin_dashboard')
+
 @login_required
 def verify_cash_delivery(request, delivery_id):
     delivery = get_object_or_404(CashDelivery, id=delivery_id)
@@ -495,6 +394,7 @@ def verify_cash_delivery(request, delivery_id):
         form = CashVerificationForm(request.POST, instance=delivery)
         if form.is_valid():
             form.save(user=request.user)
+            enqueue(delivery_verified_event(delivery, request.user))
             messages.success(request, "Cash delivery verified successfully")
             return redirect('agent_dashboard')
     else:
@@ -539,6 +439,43 @@ def submit_eod_report(request):
         expected_balance = 0
         daily_data = None
     
+    form = None
+    if request.method == 'POST':
+        from .forms import EODReportForm
+        form = EODReportForm(request.POST)
+        
+        if form.is_valid():
+            processing_date = form.cleaned_data['processing_date']
+            
+            try:
+                tellers = parse_tellers(
+                    request.POST.getlist('teller_name[]'),
+                    request.POST.getlist('teller_jmd[]'),
+                    request.POST.getlist('teller_usd[]'),
+                )
+                variances = parse_variances(
+                    request.POST.getlist('teller_number[]'),
+                    request.POST.getlist('teller_variance[]'),
+                )
+            except ValueError as e:
+                messages.error(request, f"Please correct the teller amounts: {str(e)}")
+            else:
+                # Save the report, denominations, tellers and variances in one transaction;
+                # today's daily data gets the closing balance
+                report, created = save_eod_report(
+                    user, location, form.cleaned_data, tellers, variances,
+                    daily_data=(daily_data or DailyAgentData(location=location, date=today)) if processing_date == today else None,
+                )
+                
+                if created:
+                    messages.success(request, f"EOD Report for {processing_date.strftime('%d %b, %Y')} submitted successfully.")
+                else:
+                    messages.success(request, f"EOD Report for {processing_date.strftime('%d %b, %Y')} updated successfully.")
+                
+                return redirect('agent_dashboard')
+        else:
+            messages.error(request, "Please correct the errors in the form.")
+    
     # Check for existing report
     existing_report = None
     teller_balances = []
@@ -613,126 +550,12 @@ def submit_eod_report(request):
             })
             
         from .forms import EODReportForm
-        form = EODReportForm(initial=initial_data)
+        if form is None:
+            form = EODReportForm(initial=initial_data)
     except EODReport.DoesNotExist:
         from .forms import EODReportForm
-        form = EODReportForm(initial={'processing_date': process_date})
-    
-    if request.method == 'POST':
-        from .forms import EODReportForm
-        form = EODReportForm(request.POST)
-        
-        if form.is_valid():
-            processing_date = form.cleaned_data['processing_date']
-            
-            # Check if report exists for this date
-            report, created = EODReport.objects.update_or_create(
-                agent=user,
-                location=location,
-                processing_date=processing_date,
-                defaults={
-                    'closing_balance': form.cleaned_data['closing_balance'],
-                    'funds_from_bxp_webex': form.cleaned_data['funds_from_bxp_webex'] or 0,
-                    'cash_sent_to_courier': form.cleaned_data['cash_sent_to_courier'],
-                    'courier_usd_amount': form.cleaned_data['courier_usd_amount'] if form.cleaned_data['cash_sent_to_courier'] else None,
-                    'courier_usd_receipt': form.cleaned_data['courier_usd_receipt'] if form.cleaned_data['cash_sent_to_courier'] else None,
-                    'courier_jmd_amount': form.cleaned_data['courier_jmd_amount'] if form.cleaned_data['cash_sent_to_courier'] else None,
-                    'courier_jmd_receipt': form.cleaned_data['courier_jmd_receipt'] if form.cleaned_data['cash_sent_to_courier'] else None,
-                    'all_tellers_balanced': form.cleaned_data['all_tellers_balanced'],
-                    'notes': form.cleaned_data['notes'],
-                    'confirmation': form.cleaned_data['confirmation'],
-                    'submitted': True
-                }
-            )
-            
-            # Handle JMD Denomination Breakdown
-            jmd_denoms, _ = DenominationBreakdown.objects.update_or_create(
-                eod_report=report,
-                currency='JMD',
-                defaults={
-                    'denomination_5000_count': form.cleaned_data['jmd_5000_count'] or 0,
-                    'denomination_1000_count': form.cleaned_data['jmd_1000_count'] or 0,
-                    'denomination_500_count': form.cleaned_data['jmd_500_count'] or 0,
-                    'denomination_100_count': form.cleaned_data['jmd_100_count'] or 0,
-                    'denomination_50_count': form.cleaned_data['jmd_50_count'] or 0,
-                    'coins_amount': form.cleaned_data['jmd_coins_amount'] or 0,
-                }
-            )
-            
-            # Handle USD Denomination Breakdown
-            usd_denoms, _ = DenominationBreakdown.objects.update_or_create(
-                eod_report=report,
-                currency='USD',
-                defaults={
-                    'denomination_100_count': form.cleaned_data['usd_100_count'] or 0,
-                    'denomination_50_count': form.cleaned_data['usd_50_count'] or 0,
-                    'denomination_20_count': form.cleaned_data['usd_20_count'] or 0,
-                    'denomination_10_count': form.cleaned_data['usd_10_count'] or 0,
-                    'small_bills_coins_amount': form.cleaned_data['usd_small_amount'] or 0,
-                }
-            )
-            
-            # Process teller balances
-            teller_names = request.POST.getlist('teller_name[]')
-            teller_jmd_amounts = request.POST.getlist('teller_jmd[]')
-            teller_usd_amounts = request.POST.getlist('teller_usd[]')
-            
-            # First delete existing teller balances for this report
-            TellerBalance.objects.filter(eod_report=report).delete()
-            
-            # Then create new teller balances
-            for i in range(len(teller_names)):
-                if i < len(teller_jmd_amounts) and i < len(teller_usd_amounts) and teller_names[i].strip():
-                    TellerBalance.objects.create(
-                        eod_report=report,
-                        teller_name=teller_names[i],
-                        jmd_amount=teller_jmd_amounts[i] or 0,
-                        usd_amount=teller_usd_amounts[i] or 0
-                    )
-            
-            # Process teller variances if tellers were not all balanced
-            if not form.cleaned_data['all_tellers_balanced']:
-                teller_numbers = request.POST.getlist('teller_number[]')
-                teller_variances = request.POST.getlist('teller_variance[]')
-                
-                # Delete existing variances
-                TellerVariance.objects.filter(eod_report=report).delete()
-                
-                # Calculate total variance
-                total_variance = Decimal('0.00')
-                
-                # Create new variances
-                for i in range(len(teller_numbers)):
-                    if i < len(teller_variances) and teller_numbers[i].strip():
-                        variance_amount = Decimal(teller_variances[i] or 0)
-                        total_variance += variance_amount
-                        
-                        TellerVariance.objects.create(
-                            eod_report=report,
-                            teller_number=teller_numbers[i],
-                            variance=variance_amount
-                        )
-                
-                # Update total variance on the report
-                report.total_variance = total_variance
-                report.save()
-            
-            # Update daily data if this is today's report
-            if processing_date == today and daily_data:
-                # Create or update the daily data for today
-                # No 'agent' field here since it doesn't exist in the model
-                daily_data.closing_balance = form.cleaned_data['closing_balance']
-                # Don't set daily_data.eod_report if that field doesn't exist
-                daily_data.save()
-            
-            if created:
-                messages.success(request, f"EOD Report for {processing_date.strftime('%d %b, %Y')} submitted successfully.")
-            else:
-                messages.success(request, f"EOD Report for {processing_date.strftime('%d %b, %Y')} updated successfully.")
-            
-            return redirect('agent_dashboard')
-        else:
-            messages.error(request, "Please correct the errors in the form.")
+        if form is None:
+            form = EODReportForm(initial={'processing_date': process_date})
     
     context = {
         'form': form,
@@ -993,8 +816,35 @@ def deactivate_user(request, user_id):
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def generate_report(request):
-    # Placeholder for report generation logic
-    return render(request, 'core/generate_report.html')
+    """Export a report as CSV or Excel, streamed as it is generated."""
+    if 'dataset' in request.GET:
+        form = ReportExportForm(request.GET)
+        if form.is_valid():
+            dataset_key = form.cleaned_data['dataset']
+            dataset = reports.DATASETS[dataset_key]
+            start = form.cleaned_data['start_date']
+            end = form.cleaned_data['end_date']
+            locations = list(form.cleaned_data['locations'])
+            if form.cleaned_data['format'] == 'xlsx':
+                chunks = reports.xlsx_chunks(dataset, start, end, locations)
+                content_type, extension = reports.XLSX_CONTENT_TYPE, 'xlsx'
+            else:
+                chunks = reports.csv_lines(dataset, start, end, locations)
+                content_type, extension = 'text/csv; charset=utf-8', 'csv'
+            if isinstance(request, ASGIRequest):
+                # Otherwise Django would read the whole export into memory before sending it
+                chunks = reports.stream_in_thread(chunks)
+            response = StreamingHttpResponse(chunks, content_type=content_type)
+            filename = f"{dataset_key}_{start:%Y%m%d}_{end:%Y%m%d}.{extension}"
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            logger.info("Report %s (%s to %s, %s) exported by %s",
+                        dataset_key, start, end, extension, request.user.username)
+            return response
+    else:
+        today = timezone.now().date()
+        form = ReportExportForm(initial={'start_date': today - timedelta(days=1), 'end_date': today - timedelta(days=1)})
+
+    return render(request, 'core/generate_report.html', {'form': form})
 
 def signup(request):
     if request.method == 'POST':
@@ -1341,17 +1191,9 @@ def admin_view_eod_reports(request):
     # Get all locations for the filter dropdown
     locations = Location.objects.all().order_by('name')
     
-    # Pagination
-    paginator = Paginator(reports, 20)  # Show 20 reports per page
-    page = request.GET.get('page')
-    try:
-        reports_page = paginator.page(page)
-    except PageNotAnInteger:
-        # If page is not an integer, deliver first page
-        reports_page = paginator.page(1)
-    except EmptyPage:
-        # If page is out of range, deliver last page
-        reports_page = paginator.page(paginator.num_pages)
+    # Keyset pagination, 20 reports per page
+    paginator = KeysetPaginator(reports, 20, ['-processing_date', '-id'])
+    reports_page = paginator.page(request.GET.get(CURSOR_PARAM))
     
     context = {
         'reports': reports_page,
@@ -1414,7 +1256,7 @@ def admin_view_eod_report_detail(request, report_id):
 def review_emergency_requests(request):
     """View for admins to review emergency access requests."""
     # Get all pending emergency access requests
-    pending_requests = EmergencyAccessRequest.objects.filter(status='pending')
+    pending_requests = queries.pending_emergency_requests()
     
     # Get all recent requests (for history)
     recent_requests = EmergencyAccessRequest.objects.exclude(status='pending').order_by('-requested_at')[:10]
@@ -1444,6 +1286,7 @@ def handle_emergency_request(request, request_id):
             emergency_request.reviewed_at = timezone.now()
             emergency_request.access_granted_until = timezone.now() + timedelta(minutes=30)
             emergency_request.save()
+            enqueue(emergency_access_decided_event(emergency_request))
             
             messages.success(request, f"Emergency access granted to {emergency_request.agent.username} for 30 minutes.")
         
@@ -1452,6 +1295,7 @@ def handle_emergency_request(request, request_id):
             emergency_request.reviewed_by = request.user
             emergency_request.reviewed_at = timezone.now()
             emergency_request.save()
+            enqueue(emergency_access_decided_event(emergency_request))
             
             messages.warning(request, f"Emergency access request from {emergency_request.agent.username} has been denied.")
     
@@ -1483,6 +1327,185 @@ def manage_system_settings(request):
     
     return render(request, 'core/manage_system_settings.html', context)
 
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def request_metrics(request):
+    """Per-view latency and SQL query report from the request metrics middleware."""
+    source = request.GET.get('source', 'buffer')
+    try:
+        hours = max(1, int(request.GET.get('hours', 24)))
+    except ValueError:
+        hours = 24
+
+    if source == 'stored':
+        samples = metrics.stored_samples(timezone.now() - timedelta(hours=hours))
+    else:
+        source = 'buffer'
+        samples = metrics.buffered_samples()
+
+    context = {
+        'rows': metrics.rollup(samples),
+        'sample_count': len(samples),
+        'capped': source == 'stored' and len(samples) >= metrics.report_sample_limit(),
+        'source': source,
+        'hours': hours,
+    }
+    return render(request, 'core/request_metrics.html', context)
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def cash_analytics(request):
+    """Analytics dashboard; the charts load their data from the analytics endpoints below."""
+    latest = CashRollup.objects.filter(key=rollups.NETWORK_KEY, grain='day').aggregate(latest=Max('period_start'))['latest']
+    network = CashRollup.objects.filter(key=rollups.NETWORK_KEY, grain='day', period_start=latest).first()
+
+    locations = []
+    for rollup in CashRollup.objects.filter(
+        scope='location', grain='day', period_start=latest
+    ).select_related('location__locationlimit').order_by('location__name'):
+        limit = getattr(rollup.location, 'locationlimit', None)
+        working_day_limit = limit.working_day_limit if limit else Decimal('0.00')
+        percentage = int(rollup.closing_balance / working_day_limit * 100) if working_day_limit else 0
+        locations.append({
+            'id': rollup.location_id,
+            'name': rollup.location.name,
+            'current_cash_position': rollup.closing_balance,
+            'working_day_limit': working_day_limit,
+            'cash_position_percentage': max(0, min(percentage, 100)),
+        })
+
+    context = {
+        'as_of': latest,
+        'locations': locations,
+        'parishes': CashRollup.objects.filter(scope='parish').order_by('parish').values_list('parish', flat=True).distinct(),
+        'total_cash_position': network.closing_balance if network else 0,
+        'cash_delivered_today': network.deliveries_jmd if network else 0,
+        'cash_payouts_today': network.payouts if network else 0,
+        'locations_over_limit': len({warning['location'].id for warning in get_limit_breaches(latest)}) if latest else 0,
+    }
+    return render(request, 'core/cash_analytics.html', context)
+
+def _analytics_etag(request, *args, **kwargs):
+    # Rollups only change when refreshed, so the version stamp plus the query identifies the response
+    return hashlib.md5(f"{rollups.rollup_version()}?{request.GET.urlencode()}".encode()).hexdigest()
+
+def _analytics_scope(request):
+    """The rollup key and label for the scope in the query string (network, parish or location)."""
+    if request.GET.get('location'):
+        location = get_object_or_404(Location, id=request.GET['location'])
+        return rollups.location_key(location.id), location.name
+    if request.GET.get('parish'):
+        return rollups.parish_key(request.GET['parish']), request.GET['parish']
+    return rollups.NETWORK_KEY, 'All Locations'
+
+# Range shown when the query string has no start date, per grain
+ANALYTICS_DEFAULT_DAYS = {'day': 30, 'week': 26 * 7, 'month': 365}
+
+def _analytics_dates(request, key, default_days=30):
+    """Start and end dates from the query string; by default the last ``default_days`` days with rollups."""
+    end = request.GET.get('end')
+    end = datetime.strptime(end, '%Y-%m-%d').date() if end else (
+        CashRollup.objects.filter(key=key, grain='day').aggregate(latest=Max('period_start'))['latest']
+        or timezone.now().date()
+    )
+    start = request.GET.get('start')
+    start = datetime.strptime(start, '%Y-%m-%d').date() if start else end - timedelta(days=default_days - 1)
+    if start > end:
+        raise ValueError("start must not be after end")
+    return start, end
+
+def _analytics_series(request, fields):
+    grain = request.GET.get('grain') or 'day'
+    if grain not in dict(CashRollup.GRAIN_CHOICES):
+        return JsonResponse({'error': f"grain must be one of {', '.join(dict(CashRollup.GRAIN_CHOICES))}"}, status=400)
+    try:
+        key, label = _analytics_scope(request)
+        start, end = _analytics_dates(request, key, ANALYTICS_DEFAULT_DAYS[grain])
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    rows = rollups.series(key, start, end, grain)
+    data = {
+        'scope': label,
+        'grain': grain,
+        'start': start,
+        'end': end,
+        'labels': [row['period_start'] for row in rows],
+    }
+    for field in fields:
+        data[field] = [float(row[field]) for row in rows]
+    return JsonResponse(data)
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+@cache_control(private=True, max_age=300)
+@condition(etag_func=_analytics_etag)
+def analytics_cash_position(request):
+    """Closing balance of the network, a parish or a location per day, week or month (``grain``)."""
+    return _analytics_series(request, ['closing_balance', 'closing_balance_sum', 'closing_balance_count'])
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+@cache_control(private=True, max_age=300)
+@condition(etag_func=_analytics_etag)
+def analytics_payouts(request):
+    """Payouts, EFT inbound and deliveries of the network, a parish or a location per day, week or month."""
+    return _analytics_series(request, ['payouts', 'payout_count', 'eft_inbound', 'deliveries_jmd'])
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+@cache_control(private=True, max_age=300)
+@condition(etag_func=_analytics_etag)
+def analytics_composition(request):
+    """Closing balances on one day split by parish, or by location within a parish."""
+    parish = request.GET.get('parish') or None
+    try:
+        key = rollups.parish_key(parish) if parish else rollups.NETWORK_KEY
+        day = _analytics_dates(request, key)[1]
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    parts = rollups.composition(day, parish=parish)
+    return JsonResponse({
+        'scope': parish or 'All Locations',
+        'date': day,
+        'labels': [label for label, _ in parts],
+        'values': [float(amount) for _, amount in parts],
+    })
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def cash_order_plan(request):
+    """Recommended next-day orders for every location; creates pending cash requests for the selected ones."""
+    form = CashPlanForm(request.POST if request.method == 'POST' else request.GET or None)
+    if form.is_bound and form.is_valid():
+        delivery_date = form.cleaned_data['delivery_date']
+    else:
+        delivery_date = timezone.localdate() + timedelta(days=1)
+        if not form.is_bound:
+            form = CashPlanForm(initial={'delivery_date': delivery_date})
+
+    lines = cash_plan.plan_orders(delivery_date)
+
+    if request.method == 'POST' and form.is_valid():
+        selected = {int(location_id) for location_id in request.POST.getlist('location') if location_id.isdigit()}
+        created = cash_plan.create_requests(lines, delivery_date, selected)
+        if created:
+            messages.success(request, f"Created {len(created)} cash requests for {delivery_date:%d %b %Y}.")
+        else:
+            messages.info(request, "No cash requests were created; the selected locations already have one or need no cash.")
+        return redirect(f"{reverse('cash_order_plan')}?delivery_date={delivery_date.isoformat()}")
+
+    orders = [line for line in lines if line.has_order]
+    context = {
+        'form': form,
+        'delivery_date': delivery_date,
+        'lines': lines,
+        'total_jmd': sum((line.jmd_amount for line in orders), Decimal('0.00')),
+        'total_usd': sum((line.usd_amount for line in orders), Decimal('0.00')),
+        'order_count': len(orders),
+        'shortfall_count': sum(1 for line in lines if line.shortfall),
+    }
+    return render(request, 'core/cash_order_plan.html', context)
+
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def manage_locations(request):
@@ -1499,19 +1522,14 @@ def manage_locations(request):
             Q(insurance_limit_name__icontains=search_query)
         )
 
-    paginator = Paginator(locations_list, 25)  # Show 25 locations per page
-    page_number = request.GET.get('page')
-    try:
-        locations = paginator.page(page_number)
-    except PageNotAnInteger:
-        locations = paginator.page(1)
-    except EmptyPage:
-        locations = paginator.page(paginator.num_pages)
+    paginator = KeysetPaginator(locations_list, 25, ['name', 'id'])  # Show 25 locations per page
+    locations = paginator.page(request.GET.get(CURSOR_PARAM))
 
     context = {
         'locations': locations,
         'search_query': search_query,
-        'total_locations': paginator.count,
+        'total_locations': paginator.approximate_count,
+        'total_is_exact': paginator.count_is_exact,
     }
     return render(request, 'core/manage_locations.html', context)
 
@@ -1523,16 +1541,13 @@ def location_detail(request, location_id):
     latest_eft_data = EFTData.objects.filter(location=location).order_by('-statement_date', '-uploaded_at').first()
     
     # Fetch Remote Services Data
-    latest_remote_services_date_entry = RemoteServicesData.objects.filter(location=location).order_by('-statement_date').first()
+    latest_remote_services_date_entry = queries.latest_remote_services(location).first()
     latest_remote_services_data_list = []
     total_payout_for_latest_remote_upload = Decimal('0.00')
 
     if latest_remote_services_date_entry:
         latest_date = latest_remote_services_date_entry.statement_date
-        latest_remote_services_data_list = RemoteServicesData.objects.filter(
-            location=location,
-            statement_date=latest_date
-        ).order_by('currency', 'id') # Order by currency then by ID or another field for consistency
+        latest_remote_services_data_list = queries.location_remote_services(location, latest_date)
         
         # The total_payout_for_location_in_upload should be the same for all these entries,
         # as it was calculated at the time of upload for that location and statement_date batch.
@@ -1557,144 +1572,49 @@ def location_detail(request, location_id):
         'latest_remote_services_data_list': latest_remote_services_data_list,
         'latest_remote_services_statement_date': latest_remote_services_date_entry.statement_date if latest_remote_services_date_entry else None,
         'total_payout_for_latest_remote_upload': total_payout_for_latest_remote_upload,
+        'cash_position': CashPosition.objects.filter(location=location).first(),
+        'ledger_entries': CashLedgerEntry.objects.filter(location=location).order_by('-recorded_at', '-id')[:10],
         'title': f'{location.name} Details',
         'icon': 'fas fa-building',
     }
     return render(request, 'core/location_detail_page.html', context)
 
+def _import_job_queued_response(request, job, created, redirect_name):
+    """Answer an upload with the queued job: JSON for AJAX clients, otherwise a redirect that polls it."""
+    status_url = reverse('import_job_status', args=[job.id])
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest' or 'application/json' in request.headers.get('accept', ''):
+        return JsonResponse({'job_id': job.id, 'status_url': status_url, 'duplicate': not created}, status=202 if created else 200)
+    if created:
+        messages.info(request, f"File queued for import as job #{job.id}. Progress is shown below.")
+    else:
+        messages.info(
+            request,
+            f"This file was already imported as job #{job.id}; it has not been imported again. "
+            "Tick \"Import again\" to import it anyway.",
+        )
+    return redirect(f"{reverse(redirect_name)}?job={job.id}")
+
+def _import_job_context(request):
+    """Job to poll on the upload page, taken from the ?job= parameter."""
+    job_id = request.GET.get('job')
+    if not job_id or not job_id.isdigit():
+        return None
+    return ImportJob.objects.filter(id=job_id).first()
+
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def upload_eft_statement(request):
     if request.method == 'POST':
         form = UploadEFTStatementForm(request.POST, request.FILES)
         if form.is_valid():
-            excel_file = request.FILES['eft_file']
             try:
-                workbook = openpyxl.load_workbook(excel_file)
-                sheet = workbook.active  # Get the first sheet
-
-                header = [cell.value for cell in sheet[1]]
-                expected_headers = [
-                    "Location", "Date", "Balance B/F", "Inbound", "Intra-Sent", 
-                    "Outbound", "Loan", "Rec\'d Fr. GK", "Adjusted", "BX", "SC", 
-                    "FX", "Due To GK", "Due From GK"
-                ]
-                
-                # Basic header validation (can be made more robust)
-                if header[:len(expected_headers)] != expected_headers:
-                    messages.error(request, f"Invalid Excel header. Expected: {', '.join(expected_headers)}")
-                    return redirect('upload_eft_statement')
-
-                locations_processed = 0
-                rows_processed = 0
-                errors_found = 0
-
-                # Start from the second row (index 2) to skip header
-                for row_idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-                    if not any(row): # Skip empty rows
-                        continue
-                    
-                    rows_processed += 1
-                    try:
-                        eft_location_name = str(row[0]).strip() if row[0] else None
-                        statement_date_raw = row[1]
-                        
-                        if not eft_location_name or not statement_date_raw:
-                            messages.warning(request, f"Row {row_idx}: Missing Location Name or Date. Skipping.")
-                            errors_found +=1
-                            continue
-
-                        # Try to parse date (handles datetime objects from openpyxl or string dates)
-                        if isinstance(statement_date_raw, datetime):
-                            statement_date = statement_date_raw.date()
-                        else:
-                            try:
-                                # Attempt common date formats; adjust as needed
-                                statement_date = datetime.strptime(str(statement_date_raw).split(' ')[0], '%Y-%m-%d').date()
-                            except ValueError:
-                                try:
-                                    statement_date = datetime.strptime(str(statement_date_raw).split(' ')[0], '%m/%d/%Y').date()
-                                except ValueError:
-                                    messages.warning(request, f"Row {row_idx}: Invalid date format for '{statement_date_raw}'. Use YYYY-MM-DD or MM/DD/YYYY. Skipping.")
-                                    errors_found +=1
-                                    continue
-                        
-                        try:
-                            location_obj = Location.objects.get(eft_system_name__iexact=eft_location_name)
-                        except Location.DoesNotExist:
-                            messages.warning(request, f"Row {row_idx}: Location with EFT name '{eft_location_name}' not found. Skipping.")
-                            errors_found +=1
-                            continue
-                        except Location.MultipleObjectsReturned:
-                            messages.error(request, f"Row {row_idx}: Multiple locations found with EFT name '{eft_location_name}'. Please ensure EFT names are unique. Skipping.")
-                            errors_found +=1
-                            continue
-
-                        # Helper to convert to decimal, defaulting to 0.00 if None or empty
-                        def to_decimal(value):
-                            if value is None or str(value).strip() == "":
-                                return Decimal('0.00')
-                            try:
-                                return Decimal(str(value))
-                            except InvalidOperation:
-                                raise ValueError(f"Invalid decimal value: {value}")
-
-                        try:
-                            eft_data_values = {
-                                'balance_bf': to_decimal(row[2]),
-                                'inbound': to_decimal(row[3]),
-                                'intra_sent': to_decimal(row[4]),
-                                'outbound': to_decimal(row[5]),
-                                'loan': to_decimal(row[6]),
-                                'received_from_gk': to_decimal(row[7]),
-                                'adjusted': to_decimal(row[8]),
-                                'bx': to_decimal(row[9]),
-                                'sc': to_decimal(row[10]),
-                                'fx': to_decimal(row[11]),
-                                'due_to_gk': to_decimal(row[12]),
-                                'due_from_gk': to_decimal(row[13]),
-                            }
-                        except ValueError as ve:
-                            messages.warning(request, f"Row {row_idx} for location '{eft_location_name}': Invalid numeric data ({ve}). Skipping.")
-                            errors_found +=1
-                            continue
-
-
-                        eft_entry, created = EFTData.objects.update_or_create(
-                            location=location_obj,
-                            statement_date=statement_date,
-                            defaults=eft_data_values
-                        )
-                        
-                        if created:
-                            locations_processed += 1
-                        else:
-                            # If updated, still count as processed
-                            locations_processed += 1 
-                            messages.info(request, f"Row {row_idx}: Updated EFT data for {location_obj.name} on {statement_date}.")
-
-
-                    except Exception as e:
-                        messages.error(request, f"Error processing row {row_idx}: {str(e)}. Skipping.")
-                        errors_found += 1
-                        continue
-                
-                if locations_processed > 0:
-                    messages.success(request, f"Successfully processed {locations_processed} EFT data entries from {rows_processed} rows.")
-                if errors_found > 0:
-                    messages.warning(request, f"Encountered {errors_found} issues during import. Please review messages.")
-                if locations_processed == 0 and errors_found == 0 and rows_processed > 0:
-                     messages.info(request, "File processed, but no new or updated EFT data entries were made. Locations might not exist or data might be identical.")
-                elif rows_processed == 0:
-                    messages.info(request, "The uploaded file appears to be empty or has no data rows after the header.")
-
-
-            except openpyxl.utils.exceptions.InvalidFileException:
-                messages.error(request, "Invalid file format. Please upload a valid Excel file (.xlsx or .xls).")
-            except Exception as e:
-                messages.error(request, f"An unexpected error occurred: {str(e)}")
-            
-            return redirect('upload_eft_statement')
+                job, created = enqueue_import(
+                    'eft', request.FILES['eft_file'], user=request.user, force=form.cleaned_data['import_again'],
+                )
+            except SheetError as e:
+                messages.error(request, str(e))
+                return redirect('upload_eft_statement')
+            return _import_job_queued_response(request, job, created, 'upload_eft_statement')
     else:
         form = UploadEFTStatementForm()
     
@@ -1702,24 +1622,26 @@ def upload_eft_statement(request):
         'form': form,
         'title': 'Upload EFT Statement',
         'icon': 'fas fa-file-excel',
+        'import_job': _import_job_context(request),
     }
     return render(request, 'core/upload_file_form.html', context)
 
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def import_job_status(request, job_id):
+    """JSON progress of a queued statement import."""
+    job = get_object_or_404(ImportJob.objects.defer('payload'), id=job_id)
+    return JsonResponse(job.as_dict())
+
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def view_eft_statements(request):
     """View to display all imported EFT statements."""
     eft_statements = EFTData.objects.select_related('location').order_by('location__name', '-statement_date')
     
-    # Pagination (optional, but good for many entries)
-    paginator = Paginator(eft_statements, 50)  # Show 50 entries per page
-    page_number = request.GET.get('page')
-    try:
-        page_obj = paginator.page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    # Keyset pagination, 50 entries per page
+    paginator = KeysetPaginator(eft_statements, 50, ['location__name', '-statement_date', 'id'])
+    page_obj = paginator.page(request.GET.get(CURSOR_PARAM))
         
     context = {
         'eft_statements': page_obj,
@@ -1771,130 +1693,18 @@ def upload_remote_services_statement(request):
     if request.method == 'POST':
         form = UploadRemoteServicesStatementForm(request.POST, request.FILES)
         if form.is_valid():
-            excel_file = request.FILES['remote_services_file']
-            sheet_statement_date = form.cleaned_data['statement_date']
-            
             try:
-                workbook = openpyxl.load_workbook(excel_file)
-                sheet = workbook.active
-
-                # Headers are in row 3, data starts in row 4
-                header_row = 3
-                data_start_row = 4
-
-                header = [cell.value for cell in sheet[header_row]]
-                expected_headers = [
-                    "LOC NAME", "PARISH NAME", "PARISH ID", "Currency",
-                    "Pay Principal", "Send Principal", "Total Princial", None, # Column H is blank
-                    "PayCount", "SendCount", "Total Num Trans"
-                ]
-
-                # Validate headers (allow for more headers in file than expected)
-                if header[:len(expected_headers)] != expected_headers:
-                    messages.error(request, f"Invalid Excel header. Expected: {expected_headers}. Found: {header}")
-                    return redirect('upload_remote_services_statement')
-
-                rows_data = [] # To store raw data from sheet
-                for row_idx, row_values_only in enumerate(sheet.iter_rows(min_row=data_start_row, values_only=True), start=data_start_row):
-                    if not any(row_values_only[:7]): # Check if essential first few columns are empty
-                        continue
-                    rows_data.append(dict(zip(header, row_values_only)))
-                
-                if not rows_data:
-                    messages.info(request, "The uploaded file appears to have no data rows after the header.")
-                    return redirect('upload_remote_services_statement')
-
-                # Pre-calculate total payout for each location in this upload
-                location_total_payouts = {}
-                for row_dict in rows_data:
-                    loc_name_excel = str(row_dict.get("LOC NAME", "")).strip()
-                    pay_principal_raw = row_dict.get("Pay Principal")
-                    try:
-                        pay_principal = Decimal(str(pay_principal_raw)) if pay_principal_raw is not None else Decimal('0.00')
-                    except InvalidOperation:
-                        pay_principal = Decimal('0.00') # Handle non-decimal values gracefully
-                    
-                    if loc_name_excel:
-                        location_total_payouts[loc_name_excel] = location_total_payouts.get(loc_name_excel, Decimal('0.00')) + pay_principal
-
-                # Process and save each row
-                records_created = 0
-                errors_found = 0
-
-                for row_idx, row_dict in enumerate(rows_data, start=data_start_row):
-                    try:
-                        loc_name_excel = str(row_dict.get("LOC NAME", "")).strip()
-                        if not loc_name_excel:
-                            messages.warning(request, f"Row {row_idx}: Missing LOC NAME. Skipping.")
-                            errors_found += 1
-                            continue
-                        
-                        try:
-                            location_obj = Location.objects.get(remote_services_name__iexact=loc_name_excel)
-                        except Location.DoesNotExist:
-                            messages.warning(request, f"Row {row_idx}: Location with Remote Services name '{loc_name_excel}' not found. Skipping.")
-                            errors_found += 1
-                            continue
-                        except Location.MultipleObjectsReturned:
-                            messages.error(request, f"Row {row_idx}: Multiple locations found matching Remote Services name '{loc_name_excel}'. Please ensure these names are unique in the Location model or update the file. Skipping.")
-                            errors_found += 1
-                            continue
-                        
-                        def get_decimal_from_row(key, default=Decimal('0.00')):
-                            val = row_dict.get(key)
-                            if val is None or str(val).strip() == "":
-                                return default
-                            try:
-                                return Decimal(str(val))
-                            except InvalidOperation:
-                                messages.warning(request, f"Row {row_idx} for '{loc_name_excel}': Invalid decimal value '{val}' for '{key}'. Using default.")
-                                return default
-
-                        def get_int_from_row(key, default=0):
-                            val = row_dict.get(key)
-                            if val is None or str(val).strip() == "":
-                                return default
-                            try:
-                                return int(Decimal(str(val))) # Convert via Decimal to handle float strings like "1.00"
-                            except (ValueError, TypeError, InvalidOperation):
-                                messages.warning(request, f"Row {row_idx} for '{loc_name_excel}': Invalid integer value '{val}' for '{key}'. Using default.")
-                                return default
-
-                        RemoteServicesData.objects.create(
-                            location=location_obj,
-                            statement_date=sheet_statement_date,
-                            parish_name=str(row_dict.get("PARISH NAME", "")).strip(),
-                            parish_id=get_int_from_row("PARISH ID", None), # Allow null for parish_id
-                            currency=str(row_dict.get("Currency", "")).strip(),
-                            pay_principal=get_decimal_from_row("Pay Principal"),
-                            send_principal=get_decimal_from_row("Send Principal"),
-                            total_principal=get_decimal_from_row("Total Princial"), # Note: "Princial" typo matches your spec
-                            pay_count=get_int_from_row("PayCount"),
-                            send_count=get_int_from_row("SendCount"),
-                            total_num_trans=get_int_from_row("Total Num Trans"),
-                            total_payout_for_location_in_upload=location_total_payouts.get(loc_name_excel, Decimal('0.00'))
-                        )
-                        records_created += 1
-
-                    except Exception as e:
-                        messages.error(request, f"Error processing row {row_idx} ('{loc_name_excel}'): {str(e)}. Skipping.")
-                        errors_found += 1
-                        continue
-                
-                if records_created > 0:
-                    messages.success(request, f"Successfully imported {records_created} Remote Services data entries for statement date {sheet_statement_date}.")
-                if errors_found > 0:
-                    messages.warning(request, f"Encountered {errors_found} issues during import. Please review messages.")
-                if records_created == 0 and errors_found == 0 and len(rows_data) > 0:
-                     messages.info(request, "File processed, but no Remote Services data entries were made. Locations might not exist or data might be problematic.")
-
-            except openpyxl.utils.exceptions.InvalidFileException:
-                messages.error(request, "Invalid file format. Please upload a valid Excel file (.xlsx or .xls).")
-            except Exception as e:
-                logger.error(f"Unexpected error during Remote Services upload: {str(e)}", exc_info=True)
-                messages.error(request, f"An unexpected error occurred: {str(e)}")
-            
-            return redirect('upload_remote_services_statement') # Or to a view page if you create one
+                job, created = enqueue_import(
+                    'remote_services',
+                    request.FILES['remote_services_file'],
+                    user=request.user,
+                    statement_date=form.cleaned_data['statement_date'],
+                    force=form.cleaned_data['import_again'],
+                )
+            except SheetError as e:
+                messages.error(request, str(e))
+                return redirect('upload_remote_services_statement')
+            return _import_job_queued_response(request, job, created, 'upload_remote_services_statement')
     else:
         form = UploadRemoteServicesStatementForm()
     
@@ -1902,6 +1712,7 @@ def upload_remote_services_statement(request):
         'form': form,
         'title': 'Upload Remote Services Statement',
         'icon': 'fas fa-satellite-dish', # Example icon
+        'import_job': _import_job_context(request),
     }
     return render(request, 'core/upload_file_form.html', context) # Re-use existing upload form template
 
@@ -1913,14 +1724,9 @@ def view_remote_services_statements(request):
         '-statement_date', 'location__name', 'currency', 'id'
     )
     
-    paginator = Paginator(remote_services_entries, 50)  # Show 50 entries per page
-    page_number = request.GET.get('page')
-    try:
-        page_obj = paginator.page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+    # Keyset pagination, 50 entries per page
+    paginator = KeysetPaginator(remote_services_entries, 50, ['-statement_date', 'location__name', 'currency', 'id'])
+    page_obj = paginator.page(request.GET.get(CURSOR_PARAM))
         
     context = {
         'remote_services_entries': page_obj,
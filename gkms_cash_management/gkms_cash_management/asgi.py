@@ -2,6 +2,9 @@
 ASGI config for gkms_cash_management project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Production serves it with gunicorn and uvicorn workers (see the Procfile):
+the admin dashboard's live updates are a long-lived Server-Sent Events
+stream, and gunicorn keeps the worker count and the 120 s timeout.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -11,6 +14,6 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gkms_cash_management.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gkms_cash_management.settings.production')
 
 application = get_asgi_application()
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -92,6 +93,39 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Statement uploads (EFT / Remote Services) are streamed row by row; these cap
+# the size of a single upload
+STATEMENT_UPLOAD_MAX_BYTES = 20 * 1024 * 1024
+STATEMENT_UPLOAD_MAX_ROWS = 200000
+
+# Cache (per process in development)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gkms-cash-management',
+    }
+}
+
+# How often each process checks whether SystemSettings changed (seconds);
+# this bounds how long a worker can serve old cutoff times
+SYSTEM_SETTINGS_CHECK_SECONDS = 5
+
+# Request metrics (see core/metrics.py); persisted samples show every worker process in the report
+REQUEST_METRICS_ENABLED = True
+REQUEST_METRICS_BUFFER_SIZE = 500
+REQUEST_METRICS_PERSIST = False
+
+# Notification emails (see core/notifications.py) go to a local SMTP sink, e.g.
+# `python -m aiosmtpd -n -l localhost:1025`; the test runner keeps them in memory
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_HOST = 'localhost'
+EMAIL_PORT = 1025
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = 'GKMS Cash Management <noreply@localhost>'
+EMAIL_SUBJECT_PREFIX = '[GKMS] '
+# Links in emails point here
+SITE_URL = 'http://localhost:8000'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -30,8 +30,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -96,6 +97,46 @@ STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Statement uploads (EFT / Remote Services) are streamed row by row; these cap
+# the size of a single upload
+STATEMENT_UPLOAD_MAX_BYTES = 20 * 1024 * 1024
+STATEMENT_UPLOAD_MAX_ROWS = 200000
+
+# Cache shared by all web and worker processes; create the table with `manage.py createcachetable`.
+# Entries: one per location and one per agent (dashboards), one per recent date (limit breaches)
+# and a few version stamps, so a couple of thousand keys; past MAX_ENTRIES a third are culled.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'gkms_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# How often each process checks whether SystemSettings changed (seconds);
+# this bounds how long a worker can serve old cutoff times
+SYSTEM_SETTINGS_CHECK_SECONDS = 5
+
+# Request metrics (see core/metrics.py); persisted samples show every worker process in the report
+REQUEST_METRICS_ENABLED = True
+REQUEST_METRICS_BUFFER_SIZE = 500
+REQUEST_METRICS_PERSIST = os.environ.get('REQUEST_METRICS_PERSIST', 'True') == 'True'
+
+# Notification emails (see core/notifications.py), sent by the dispatch_notifications worker
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '587'))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True') == 'True'
+EMAIL_TIMEOUT = 30
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'GKMS Cash Management <noreply@gkms-cash-management.onrender.com>')
+EMAIL_SUBJECT_PREFIX = '[GKMS] '
+# Links in emails point here
+SITE_URL = os.environ.get('SITE_URL', 'https://gkms-cash-management.onrender.com')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 